@@ -0,0 +1,253 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+from flask import current_app, request, send_from_directory, abort, url_for
+from markupsafe import Markup, escape
+
+
+logger = logging.getLogger(__name__)
+
+DIST_FOLDER = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Per-page bundles, as paths under static/. Each template only asks for the
+# bundles it needs, so pages stop loading every vendor plugin in the theme.
+BUNDLES = {
+    'base.css': [
+        'css/style.css',
+        'css/custom-style.css',
+    ],
+    'auth.css': [
+        'css/style.css',
+    ],
+    'calendar.css': [
+        'vendor/fullcalendar/css/fullcalendar.min.css',
+    ],
+    'base.js': [
+        'vendor/global/global.min.js',
+        'js/deznav-init.js',
+        'js/custom.min.js',
+        'vendor/svganimation/vivus.min.js',
+        'vendor/svganimation/svg.animation.js',
+    ],
+    'auth.js': [
+        'vendor/global/global.min.js',
+        'js/deznav-init.js',
+        'js/custom.min.js',
+    ],
+    'tables.js': [
+        'vendor/datatables/js/jquery.dataTables.min.js',
+        'js/plugins-init/datatables.init.js',
+        'js/server-tables.js',
+    ],
+    'fees.js': [
+        'js/trainee-typeahead.js',
+    ],
+    'dashboard.js': [
+        'vendor/raphael/raphael.min.js',
+        'vendor/morris/morris.min.js',
+        'vendor/peity/jquery.peity.min.js',
+        'js/dashboard/dashboard-2.js',
+        'js/monthly-income-expense-chart.js',
+    ],
+    'calendar.js': [
+        'vendor/jqueryui/js/jquery-ui.min.js',
+        'vendor/moment/moment.min.js',
+        'vendor/fullcalendar/js/fullcalendar.min.js',
+        'js/plugins-init/fullcalendar-init.js',
+    ],
+}
+
+_CSS_IMPORT = re.compile(r'@import\s+(?:url\(\s*)?["\']?([^"\')\s;]+)["\']?\s*\)?\s*([^;]*);')
+_CSS_URL = re.compile(r'url\(\s*(["\']?)([^"\')]+)\1\s*\)')
+_CSS_CHARSET = re.compile(r'@charset\s+["\'][^"\']*["\']\s*;', re.IGNORECASE)
+_EXTERNAL = re.compile(r'^(?:[a-z][a-z0-9+.-]*:|//|/|#)', re.IGNORECASE)
+
+_manifest = {'mtime': None, 'bundles': {}, 'version': ''}
+
+
+def _dist_folder(app=None):
+    app = app or current_app
+    return os.path.join(app.static_folder, DIST_FOLDER)
+
+
+def _read(static_folder, path):
+    with open(os.path.join(static_folder, path), encoding='utf-8') as source:
+        return source.read()
+
+
+# url(../fonts/x.woff) inside static/icons/a/css/b.css -> url(/static/icons/a/fonts/x.woff)
+def _absolute_urls(css, path, static_url):
+    base = posixpath.dirname(path)
+
+    def rewrite(match):
+        quote, target = match.groups()
+        if _EXTERNAL.match(target):
+            return match.group(0)
+        resolved = posixpath.normpath(posixpath.join(base, target))
+        return f'url({quote}{static_url}/{resolved}{quote})'
+
+    return _CSS_URL.sub(rewrite, css)
+
+
+# Inline local @imports (recursively) so a stylesheet is one request.
+# Remote imports such as web fonts are returned separately; they must lead the bundle.
+def _flatten_css(static_folder, path, static_url, seen, remote_imports):
+    if path in seen:
+        return ''
+    seen.add(path)
+    css = _CSS_CHARSET.sub('', _read(static_folder, path))
+
+    def inline(match):
+        target, media = match.group(1), match.group(2).strip()
+        if _EXTERNAL.match(target):
+            remote_imports.append(match.group(0))
+            return ''
+        imported_path = posixpath.normpath(posixpath.join(posixpath.dirname(path), target))
+        imported = _flatten_css(static_folder, imported_path, static_url, seen, remote_imports)
+        return f'@media {media}{{{imported}}}' if media else imported
+
+    css = _CSS_IMPORT.sub(inline, css)
+    return _absolute_urls(css, path, static_url)
+
+
+def _build_css(static_folder, sources, static_url):
+    from rcssmin import cssmin
+
+    seen = set()
+    remote_imports = []
+    body = '\n'.join(_flatten_css(static_folder, path, static_url, seen, remote_imports) for path in sources)
+    return cssmin('\n'.join(remote_imports) + '\n' + body)
+
+
+def _build_js(static_folder, sources):
+    from rjsmin import jsmin
+
+    # ';' keeps a file without a trailing semicolon from running into the next one
+    return '\n;'.join(jsmin(_read(static_folder, path)) for path in sources)
+
+
+def _write(path, data):
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as target:
+        target.write(data)
+    os.replace(temporary, path)
+
+
+# Write the .gz (and .br when brotli is installed) siblings of a built file
+def _precompress(path, data):
+    _write(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        logger.warning('brotli is not installed, skipping %s.br', os.path.basename(path))
+        return
+    _write(path + '.br', brotli.compress(data, quality=11))
+
+
+# Build every bundle into static/dist as <name>.<hash>.<ext> plus precompressed
+# copies, then write the manifest the templates resolve names from.
+# Returns {bundle: built file name}.
+def build_assets(app=None):
+    app = app or current_app
+    static_folder = app.static_folder
+    dist_folder = _dist_folder(app)
+    os.makedirs(dist_folder, exist_ok=True)
+
+    manifest = {}
+    for bundle, sources in BUNDLES.items():
+        stem, extension = os.path.splitext(bundle)
+        if extension == '.css':
+            content = _build_css(static_folder, sources, app.static_url_path)
+        else:
+            content = _build_js(static_folder, sources)
+        data = content.encode('utf-8')
+        filename = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}'
+        path = os.path.join(dist_folder, filename)
+        if not os.path.exists(path):
+            _write(path, data)
+            _precompress(path, data)
+        manifest[bundle] = filename
+
+    _write(os.path.join(dist_folder, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+
+    # drop the files of earlier builds
+    current = set(manifest.values())
+    for name in os.listdir(dist_folder):
+        if name == MANIFEST_NAME:
+            continue
+        built = re.sub(r'\.(gz|br)$', '', name)
+        if built not in current:
+            os.remove(os.path.join(dist_folder, name))
+    return manifest
+
+
+# Bundle -> built file name, re-read whenever a new build replaces the manifest
+def load_manifest():
+    path = os.path.join(_dist_folder(), MANIFEST_NAME)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        _manifest.update(mtime=None, bundles={}, version='')
+        return _manifest['bundles']
+    if mtime != _manifest['mtime']:
+        with open(path, 'rb') as source:
+            data = source.read()
+        _manifest.update(mtime=mtime, bundles=json.loads(data.decode('utf-8')),
+                         version=hashlib.sha256(data).hexdigest()[:12])
+    return _manifest['bundles']
+
+
+# What a rendered page depends on besides the data: the deployed code (BUILD_ID,
+# e.g. the commit a deploy ships) and the asset bundles its tags point at, which
+# `flask build-assets` replaces and deletes
+def build_version():
+    load_manifest()
+    return f"{current_app.config.get('BUILD_ID') or ''}:{_manifest['version']}"
+
+
+def _tag(extension, url):
+    if extension == '.css':
+        return f'<link rel="stylesheet" href="{escape(url)}">'
+    return f'<script src="{escape(url)}"></script>'
+
+
+# Template helper: the <link>/<script> tags for a bundle. Uses the built,
+# fingerprinted file when `flask build-assets` has been run, and the individual
+# source files otherwise so development works without a build step.
+def asset_tags(bundle):
+    extension = os.path.splitext(bundle)[1]
+    built = load_manifest().get(bundle)
+    if built:
+        return Markup(_tag(extension, url_for('asset_file', filename=built)))
+    return Markup('\n'.join(_tag(extension, url_for('static', filename=path)) for path in BUNDLES[bundle]))
+
+
+# Serve a built bundle, picking the precompressed copy the client accepts
+def serve_asset(filename):
+    dist_folder = _dist_folder()
+    if filename == MANIFEST_NAME or not os.path.isfile(os.path.join(dist_folder, filename)):
+        abort(404)
+
+    accepted = request.headers.get('Accept-Encoding', '')
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if candidate in accepted and os.path.isfile(os.path.join(dist_folder, filename + suffix)):
+            encoding = candidate
+            break
+
+    if encoding:
+        suffix = '.br' if encoding == 'br' else '.gz'
+        mimetype = 'text/css' if filename.endswith('.css') else 'application/javascript'
+        response = send_from_directory(dist_folder, filename + suffix, mimetype=mimetype, conditional=True)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_from_directory(dist_folder, filename, conditional=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
@@ -0,0 +1,275 @@
+# Latency percentiles and queries per request for the main routes.
+#
+#   python benchmarks/bench_routes.py [--requests 100] [--database-uri URI] [--no-seed]
+#                                     [--gunicorn] [--output results.json] [--compare baseline.json]
+#
+# Seeds a throwaway SQLite file (or the database given with --database-uri) through
+# seed.seed_database, then replays every route through the Flask test client, or
+# over HTTP against a local single-worker gunicorn with --gunicorn. Save the JSON
+# with --output on one commit and pass it to --compare on another.
+import argparse
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCH_EMAIL = 'bench@example.com'
+BENCH_PASSWORD = 'bench'
+
+
+# (method, path) of every benchmarked request; the POST sends the fee form from prepare_database
+def bench_routes():
+    window_start = date.today().replace(day=1)
+    window_end = window_start + timedelta(days=42)
+    datatables = 'draw=1&start=0&length=25&order[0][column]=0&order[0][dir]=desc'
+    return [
+        ('GET', '/dashboard'),
+        ('GET', '/all-trainees'),
+        ('GET', '/fees-collection'),
+        ('GET', '/inventory'),
+        ('GET', '/staff'),
+        ('GET', '/all-facilitators'),
+        ('GET', '/departments'),
+        ('GET', '/all-courses'),
+        ('GET', f'/api/trainees?{datatables}'),
+        ('GET', f'/api/fees?{datatables}'),
+        ('GET', f'/api/inventory?{datatables}'),
+        ('GET', f'/api/staff?{datatables}'),
+        ('GET', '/add-fees'),
+        ('POST', '/add-fees'),
+        ('GET', f'/get_events?start={window_start.isoformat()}&end={window_end.isoformat()}'),
+    ]
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    # nearest rank
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(timings, queries, statuses):
+    milliseconds = [seconds * 1000 for seconds in timings]
+    return {
+        'requests': len(timings),
+        'p50_ms': round(percentile(milliseconds, 50), 2),
+        'p95_ms': round(percentile(milliseconds, 95), 2),
+        'p99_ms': round(percentile(milliseconds, 99), 2),
+        'mean_ms': round(sum(milliseconds) / len(milliseconds), 2),
+        'queries_per_request': round(queries / len(timings), 2) if queries is not None else None,
+        'statuses': sorted(set(statuses)),
+    }
+
+
+def prepare_database(app, args):
+    from models import db, User, Trainee
+    from seed import seed_database
+    from migrations import run_migrations
+
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+        if not args.no_seed:
+            seed_database(trainees=args.trainees, fees=args.fees, inventory=args.inventory, events=args.events,
+                          seed=args.seed)
+        if User.query.filter_by(email=BENCH_EMAIL).first() is None:
+            db.session.add(User(first_name='Bench', last_name='User', email=BENCH_EMAIL, password=BENCH_PASSWORD))
+            db.session.commit()
+        trainee = Trainee.query.order_by(Trainee.id).first()
+        if trainee is None:
+            sys.exit('No trainees to post fees for; seed the database or drop --no-seed')
+        return {
+            'trainee_name': f'{trainee.first_name} {trainee.last_name}',
+            'selected_trainee_id': str(trainee.id),
+            'department': trainee.department,
+            'course': trainee.course,
+            'amount': '5000',
+            'payment_date': date.today().isoformat(),
+            'payment_type': 'Cash',
+            'payment_status': 'Paid',
+        }
+
+
+# In process: time each request and count the statements it runs on the engine
+def run_test_client(app, routes, fee_form, args):
+    from sqlalchemy import event
+    from models import db
+
+    client = app.test_client()
+    client.post('/login', data={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+    counter = {'queries': 0}
+
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        counter['queries'] += 1
+
+    results = {}
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count_query)
+    try:
+        for method, path in routes:
+            send = client.post if method == 'POST' else client.get
+            data = fee_form if method == 'POST' else None
+            for _ in range(args.warmup):
+                send(path, data=data)
+            timings, statuses = [], []
+            counter['queries'] = 0
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                response = send(path, data=data)
+                timings.append(time.perf_counter() - started)
+                statuses.append(response.status_code)
+            results[f'{method} {path}'] = summarize(timings, counter['queries'], statuses)
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', count_query)
+    return results
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+# sql_queries_total by route, scraped from /metrics of the (only) worker
+def _sql_queries(session, base_url):
+    totals = {}
+    for line in session.get(f'{base_url}/metrics').text.splitlines():
+        if line.startswith('sql_queries_total{'):
+            route = line.split('route="', 1)[1].split('"', 1)[0]
+            totals[route] = int(float(line.rsplit(' ', 1)[1]))
+    return totals
+
+
+# Over HTTP against gunicorn; one worker so /metrics sees every request
+def run_gunicorn(routes, fee_form, args):
+    import requests
+
+    port = _free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    environment = dict(os.environ, database_uri=args.database_uri)
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--workers', '1', '--bind', f'127.0.0.1:{port}',
+                               'wsgi:app'], cwd=ROOT, env=environment)
+    try:
+        session = requests.Session()
+        for _ in range(100):
+            try:
+                session.get(f'{base_url}/login', timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        session.post(f'{base_url}/login', data={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+
+        results = {}
+        for method, path in routes:
+            route = path.split('?', 1)[0]
+            route = '/api/<entity>' if route.startswith('/api/') else route
+            send = session.post if method == 'POST' else session.get
+            data = fee_form if method == 'POST' else None
+            for _ in range(args.warmup):
+                send(f'{base_url}{path}', data=data, allow_redirects=False)
+            before = _sql_queries(session, base_url).get(route, 0)
+            timings, statuses = [], []
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                response = send(f'{base_url}{path}', data=data, allow_redirects=False)
+                timings.append(time.perf_counter() - started)
+                statuses.append(response.status_code)
+            queries = _sql_queries(session, base_url).get(route, 0) - before
+            results[f'{method} {path}'] = summarize(timings, queries, statuses)
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    print(f"{'route':<70} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8}")
+    for name, result in results.items():
+        line = (f"{name[:70]:<70} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+                f"{result['queries_per_request'] if result['queries_per_request'] is not None else '-':>8}")
+        previous = (baseline or {}).get(name)
+        if previous:
+            change = (result['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100 if previous['p95_ms'] else 0
+            line += f"  p95 {change:+.0f}% vs {previous['p95_ms']:.2f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency percentiles and queries per request per route.')
+    parser.add_argument('--requests', type=int, default=100, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=5, help='untimed requests per route first')
+    parser.add_argument('--database-uri', help='defaults to a throwaway SQLite file')
+    parser.add_argument('--no-seed', action='store_true', help='benchmark the data already in the database')
+    parser.add_argument('--trainees', type=int, default=5000)
+    parser.add_argument('--fees', type=int, default=10000)
+    parser.add_argument('--inventory', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--gunicorn', action='store_true', help='go over HTTP to a local gunicorn')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--compare', help='JSON from an earlier run to compare p95 against')
+    args = parser.parse_args()
+
+    scratch = None
+    if not args.database_uri:
+        scratch = tempfile.mkdtemp(prefix='bench-')
+        args.database_uri = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+    os.environ['database_uri'] = args.database_uri
+    os.environ.setdefault('secret_key', 'benchmark')
+
+    from app import create_app
+
+    app = create_app()
+
+    try:
+        fee_form = prepare_database(app, args)
+        routes = bench_routes()
+        if args.gunicorn:
+            results = run_gunicorn(routes, fee_form, args)
+        else:
+            results = run_test_client(app, routes, fee_form, args)
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['routes']
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            'commit': _git_commit(),
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'target': 'gunicorn' if args.gunicorn else 'test-client',
+            'database': args.database_uri.split(':', 1)[0],
+            'requests': args.requests,
+            'data': None if args.no_seed else {'trainees': args.trainees, 'fees': args.fees,
+                                               'inventory': args.inventory, 'events': args.events,
+                                               'seed': args.seed},
+            'routes': results,
+        }
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
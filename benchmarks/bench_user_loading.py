@@ -0,0 +1,65 @@
+# Queries per request with and without the user identity cache.
+#
+#   python benchmarks/bench_user_loading.py [requests]
+#
+# Runs against a throwaway in-memory SQLite database.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['database_uri'] = 'sqlite://'
+os.environ.setdefault('secret_key', 'benchmark')
+
+from sqlalchemy import event
+from app import create_app, load_user
+from models import db, User
+from user_cache import user_identities
+
+app = create_app()
+
+
+def count_queries(client, path, requests):
+    counter = {'queries': 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['queries'] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for _ in range(requests):
+            client.get(path)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return counter['queries'] / requests
+
+
+# a cheap authenticated route and a full page
+PATHS = ['/cache-stats', '/dashboard']
+
+
+def main(requests=200):
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(first_name='Bench', last_name='User', email='bench@example.com', password='bench'))
+        db.session.commit()
+
+        client = app.test_client()
+        client.post('/login', data={'email': 'bench@example.com', 'password': 'bench'})
+
+        for path in PATHS:
+            # uncached: the original loader, one users query per request
+            app.login_manager.user_loader(lambda user_id: User.query.get(int(user_id)))
+            uncached = count_queries(client, path, requests)
+
+            app.login_manager.user_loader(load_user)
+            user_identities.clear()
+            cached = count_queries(client, path, requests)
+
+            print(f'{path} over {requests} requests')
+            print(f'  without user cache: {uncached:.2f} queries/request')
+            print(f'  with user cache:    {cached:.2f} queries/request')
+    print(f'user cache stats: {user_identities.stats()}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,219 @@
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import and_, func, select
+from models import db, Facilitator, Trainee, Course, InventoryItem, Staff, Department, Fee
+from helpers import month_bounds
+from exports import EXPORT_SOURCES, export_conditions
+from enrollment import adjust_enrollments
+from rollups import remove_contributions
+from relations import reference_ids
+from reference_cache import reference_data, REFERENCE_MODELS
+from reports import FINANCE_HISTORY
+from site_search import index_records, unindex_records
+from table_versions import DERIVED_TABLES, bump_table_versions
+
+
+# What a bulk delete / update touches, by list entity:
+#   table       its version counter name
+#   search      its site search type, if indexed
+#   fields      what a bulk update may set: the column, the foreign key kept in step
+#               with it and the reference table the value must name, or fixed choices
+#   dependents  (foreign key, table) of rows pointing at a deleted row, cleared the way
+#               ON DELETE SET NULL would (SQLite only does that with foreign keys on)
+#   enrollment  the course key whose students_enrolled counters follow these rows
+#   rollup      ((total, count) rollup columns, date, department, course, amount) feeding
+#               the monthly rollup
+#   history     the date column that makes a write backdated for the finance reports
+BULK_SOURCES = {
+    'trainees': {
+        'model': Trainee, 'table': 'trainees', 'search': 'trainees', 'enrollment': Trainee.course_id,
+        'fields': {
+            'course': {'column': Trainee.course, 'key': Trainee.course_id, 'reference': 'courses'},
+            'department': {'column': Trainee.department, 'key': Trainee.department_id, 'reference': 'departments'},
+        },
+        'dependents': [(Fee.trainee_id, 'fees')],
+    },
+    'fees': {
+        'model': Fee, 'table': 'fees', 'search': None, 'history': Fee.payment_date,
+        'rollup': (('income', 'fee_count'), Fee.payment_date, Fee.department, Fee.course, Fee.amount),
+        'fields': {
+            'payment_status': {'column': Fee.payment_status, 'choices': ('Paid', 'Unpaid', 'Pending')},
+        },
+    },
+    'inventory': {
+        'model': InventoryItem, 'table': 'inventory_items', 'search': 'inventory_items',
+        'history': InventoryItem.purchase_date,
+        'rollup': (('expense', 'item_count'), InventoryItem.purchase_date, InventoryItem.department_for,
+                   InventoryItem.course_for, InventoryItem.price),
+        'fields': {
+            'status': {'column': InventoryItem.status, 'choices': ('In Stock', 'Out Of Stock')},
+        },
+    },
+    'staff': {
+        'model': Staff, 'table': 'staff', 'search': 'staff',
+        'fields': {
+            'department': {'column': Staff.department, 'reference': 'departments'},
+            'designation': {'column': Staff.designation},
+        },
+    },
+    'facilitators': {
+        'model': Facilitator, 'table': 'facilitators', 'search': 'facilitators',
+        'fields': {
+            'department': {'column': Facilitator.department, 'reference': 'departments'},
+            'course': {'column': Facilitator.course, 'reference': 'courses'},
+        },
+        'dependents': [(Course.facilitator_id, 'courses')],
+    },
+    'departments': {
+        'model': Department, 'table': 'departments', 'search': 'departments',
+        'fields': {
+            'department_head': {'column': Department.department_head},
+        },
+        'dependents': [(Trainee.department_id, 'trainees'), (Fee.department_id, 'fees'),
+                       (InventoryItem.department_id, 'inventory_items')],
+    },
+}
+
+
+# Record ids from a form: repeated ids fields, comma separated lists or both
+def selected_ids(values):
+    ids = []
+    for value in values:
+        for part in str(value).split(','):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                ids.append(int(part))
+            except ValueError:
+                raise ValueError(f'Invalid id {part}')
+    return ids
+
+
+# WHERE clause of the records a bulk operation acts on: the listed ids, and/or every
+# record matching the start/end/department/course filters. One of them is required,
+# so an empty form never reaches a whole table, and a filter the entity has no
+# column for is refused rather than dropped, which would widen the selection.
+def bulk_selection(entity, ids=None, start=None, end=None, department=None, course=None):
+    model = BULK_SOURCES[entity]['model']
+    source = EXPORT_SOURCES[entity]
+    given = {'start': start, 'end': end, 'department': department, 'course': course}
+    for name, value in given.items():
+        column = source['date'] if name in ('start', 'end') else source[name]
+        if value is not None and column is None:
+            raise ValueError(f'{entity} cannot be filtered by {name}')
+    conditions = export_conditions(entity, **given)
+    if ids:
+        conditions.append(model.id.in_(ids))
+    if not conditions:
+        raise ValueError('Select records by id or by a start, end, department or course filter')
+    return and_(*conditions)
+
+
+def _course_counts(connection, source, where):
+    key = source['enrollment']
+    return connection.execute(select([key, func.count()]).where(where).group_by(key)).fetchall()
+
+
+# whether any selected record is dated before the current month
+def _touches_history(connection, source, where):
+    column = source.get('history')
+    if column is None:
+        return False
+    earliest = connection.execute(select([func.min(column)]).where(where)).scalar()
+    return earliest is not None and earliest < month_bounds()[1]
+
+
+# Bump the versions of every written table (and what derives from them) in the
+# same transaction, commit, then drop the cached reference rows that changed
+def _commit(connection, tables, history):
+    tables = set(tables)
+    for name in list(tables):
+        tables.update(DERIVED_TABLES.get(name, ()))
+    if history:
+        tables.add(FINANCE_HISTORY)
+    bump_table_versions(connection, tables)
+    db.session.commit()
+    for name in tables & set(REFERENCE_MODELS):
+        reference_data.invalidate(name)
+
+
+# Delete the selected records with one DELETE, after clearing the foreign keys
+# that point at them and taking them out of the enrollment counters, the monthly
+# rollup and the search index, all in one transaction. Returns how many went.
+def bulk_delete(entity, ids=None, **filters):
+    source = BULK_SOURCES[entity]
+    model = source['model']
+    where = bulk_selection(entity, ids, **filters)
+    connection = db.session.connection()
+    tables = {source['table']}
+
+    if 'enrollment' in source:
+        adjust_enrollments(connection, {course_id: -count
+                                        for course_id, count in _course_counts(connection, source, where)})
+    if 'rollup' in source:
+        remove_contributions(connection, *source['rollup'], where)
+    history = _touches_history(connection, source, where)
+    for key, table_name in source.get('dependents', ()):
+        connection.execute(
+            key.class_.__table__.update().where(key.in_(select([model.id]).where(where))).values({key.key: None})
+        )
+        tables.add(table_name)
+    if source['search']:
+        unindex_records(connection, source['search'], where)
+
+    deleted = connection.execute(model.__table__.delete().where(where)).rowcount
+    if not deleted:
+        db.session.rollback()
+        return 0
+    _commit(connection, tables, history)
+    return deleted
+
+
+# Set one field of the selected records with one UPDATE, moving enrollment
+# counters and reindexing them in the same transaction. Returns how many changed.
+def bulk_update(entity, field, value, ids=None, **filters):
+    source = BULK_SOURCES[entity]
+    model = source['model']
+    spec = source['fields'].get(field)
+    if spec is None:
+        raise ValueError(f'{field} cannot be changed in bulk')
+    value = (value or '').strip()
+    if not value:
+        raise ValueError(f'{field} is required')
+    if 'choices' in spec and value not in spec['choices']:
+        raise ValueError(f"{field} must be one of {', '.join(spec['choices'])}")
+
+    values = {spec['column'].key: value}
+    reference_id = None
+    if 'reference' in spec:
+        reference_id = reference_ids(spec['reference']).get(value)
+        if reference_id is None:
+            raise ValueError(f'Unknown {field} {value}')
+        if 'key' in spec:
+            values[spec['key'].key] = reference_id
+
+    where = bulk_selection(entity, ids, **filters)
+    connection = db.session.connection()
+    tables = {source['table']}
+
+    if spec.get('key') is not None and spec['key'] is source.get('enrollment'):
+        deltas = Counter()
+        for course_id, count in _course_counts(connection, source, where):
+            deltas[course_id] -= count
+            deltas[reference_id] += count
+        adjust_enrollments(connection, deltas)
+    history = _touches_history(connection, source, where)
+
+    # one timestamp for the whole statement marks the changed rows for reindexing,
+    # even when the change moves them out of the filter that selected them
+    now = datetime.utcnow()
+    values['updated_at'] = now
+    updated = connection.execute(model.__table__.update().where(where).values(values)).rowcount
+    if not updated:
+        db.session.rollback()
+        return 0
+    if source['search']:
+        index_records(connection, source['search'], where=model.updated_at == now)
+    _commit(connection, tables, history)
+    return updated
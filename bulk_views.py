@@ -0,0 +1,44 @@
+from flask import request, jsonify
+from decorators import login_is_required
+from exports import export_filters
+from bulk_ops import BULK_SOURCES, bulk_delete, bulk_update, selected_ids
+
+
+# What a bulk form may send besides the fields of its action
+SELECTION_FIELDS = ('ids', 'start', 'end', 'department', 'course')
+
+
+# The records a bulk form selects: ids fields and/or start/end/department/course
+# filters. Any other field is refused, since ignoring a filter would select more.
+def _selection(form, *fields):
+    unknown = sorted(set(form) - set(SELECTION_FIELDS) - set(fields))
+    if unknown:
+        raise ValueError(f"Unsupported filter {', '.join(unknown)}")
+    filters = export_filters(form)
+    filters['ids'] = selected_ids(form.getlist('ids'))
+    return filters
+
+
+# Delete the selected records in one transaction; answers how many went
+@login_is_required
+def bulk_delete_records(entity):
+    if entity not in BULK_SOURCES:
+        return jsonify({'error': f'Unknown list {entity}'}), 404
+    try:
+        deleted = bulk_delete(entity, **_selection(request.form))
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    return jsonify({'deleted': deleted})
+
+
+# Set field to value on the selected records in one transaction; answers how many changed
+@login_is_required
+def bulk_update_records(entity):
+    if entity not in BULK_SOURCES:
+        return jsonify({'error': f'Unknown list {entity}'}), 404
+    try:
+        updated = bulk_update(entity, request.form.get('field'), request.form.get('value'),
+                              **_selection(request.form, 'field', 'value'))
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    return jsonify({'updated': updated})
@@ -0,0 +1,232 @@
+import csv
+import json
+import sys
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from models import db, Course
+from migrations import run_migrations, hot_queries, explain_query
+from rollups import rebuild_rollups
+from trainee_import import import_trainees
+from course_images import generate_variants
+from exports import EXPORT_SOURCES, EXPORT_FORMATS, export_filters, generate_export
+from assets import build_assets
+from receipts import RECEIPT_FORMATS, select_receipts, write_receipts
+from enrollment import reconcile_enrollment
+from seed import SEED_USER_PASSWORD, seed_database
+from jobs import JobWorker
+from site_search import rebuild_site_search
+from reports import REPORT_DIMENSIONS, REPORT_MEASURES, report_options, finance_report, report_table
+
+
+@click.command('migrate')
+@with_appcontext
+def migrate_command():
+    """Create missing tables and apply pending schema migrations."""
+    db.create_all()
+    applied = run_migrations()
+    for name in applied:
+        click.echo(f'Applied {name}')
+    click.echo('Database is up to date')
+
+
+@click.command('explain-hot-queries')
+@with_appcontext
+def explain_hot_queries_command():
+    """Print the query plan of the hot date range and lookup filters."""
+    for name, query in hot_queries().items():
+        click.echo(f'-- {name}')
+        for line in explain_query(query):
+            click.echo(f'   {line}')
+
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    """Recompute monthly_finance_rollup from fees and inventory items."""
+    groups = rebuild_rollups()
+    click.echo(f'Rebuilt {groups} monthly finance rollup rows')
+
+
+@click.command('import-trainees')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@with_appcontext
+def import_trainees_command(path):
+    """Import trainees from a CSV or XLSX file."""
+    with open(path, 'rb') as trainees_file:
+        report = import_trainees(trainees_file, path)
+    for rejected in report['errors']:
+        click.echo(f"Row {rejected['row']}: {', '.join(rejected['errors'])}", err=True)
+    click.echo(f"Imported {report['imported']} trainees, rejected {len(report['errors'])} rows")
+
+
+@click.command('export')
+@click.argument('entity', type=click.Choice(sorted(EXPORT_SOURCES)))
+@click.option('--format', 'export_format', type=click.Choice(EXPORT_FORMATS), default='csv')
+@click.option('--start', help='First date to include (YYYY-MM-DD).')
+@click.option('--end', help='Last date to include (YYYY-MM-DD).')
+@click.option('--department')
+@click.option('--course')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--output', type=click.Path(dir_okay=False), help='File to write instead of stdout.')
+@with_appcontext
+def export_command(entity, export_format, start, end, department, course, compress, output):
+    """Stream one table out as CSV or JSON lines."""
+    filters = export_filters({'start': start, 'end': end, 'department': department, 'course': course})
+    chunks = generate_export(entity, export_format, compress, **filters)
+    if output:
+        export_file = open(output, 'wb') if compress else open(output, 'w', newline='')
+        with export_file:
+            for chunk in chunks:
+                export_file.write(chunk)
+    else:
+        stream = sys.stdout.buffer if compress else sys.stdout
+        for chunk in chunks:
+            stream.write(chunk)
+
+
+@click.command('build-image-variants')
+@with_appcontext
+def build_image_variants_command():
+    """Create the resized variants of every course image that lacks them."""
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    image_names = {image_name for image_name, in db.session.query(Course.image_name) if image_name}
+    for image_name in sorted(image_names):
+        generate_variants(upload_folder, image_name)
+    click.echo(f'Checked variants of {len(image_names)} course images')
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Build the fingerprinted, minified and precompressed page bundles."""
+    manifest = build_assets()
+    for bundle, filename in sorted(manifest.items()):
+        click.echo(f'{bundle} -> {filename}')
+
+
+@click.command('batch-receipts')
+@click.option('--format', 'output_format', type=click.Choice(RECEIPT_FORMATS), default='pdf')
+@click.option('--start', help='First payment date to include (YYYY-MM-DD).')
+@click.option('--end', help='Last payment date to include (YYYY-MM-DD).')
+@click.option('--department')
+@click.option('--course')
+@click.option('--workers', type=int, help='Worker processes (defaults to the CPU count).')
+@click.option('--output', type=click.Path(dir_okay=False), required=True, help='PDF or ZIP file to write.')
+@with_appcontext
+def batch_receipts_command(output_format, start, end, department, course, workers, output):
+    """Reissue fee receipts in bulk as one PDF or a ZIP of HTML receipts."""
+    filters = export_filters({'start': start, 'end': end, 'department': department, 'course': course})
+    receipts = select_receipts(**filters)
+    if not receipts:
+        click.echo('No fees match these filters')
+        return
+    # the workers only render, so give back the database connection first
+    db.session.remove()
+    with click.progressbar(length=len(receipts), label='Rendering receipts') as progress:
+        failed = write_receipts(receipts, output_format, output, workers=workers, on_progress=progress.update)
+    for label, error in sorted(failed.items()):
+        click.echo(f'Receipt {label} left out: {error}', err=True)
+    click.echo(f'Wrote {len(receipts) - len(failed)} receipts to {output}')
+
+
+@click.command('reconcile-enrollment')
+@with_appcontext
+def reconcile_enrollment_command():
+    """Recount students_enrolled for every course and fix any drift."""
+    drifted = reconcile_enrollment()
+    for course_name, (stored, actual) in sorted(drifted.items()):
+        click.echo(f'{course_name}: {stored} -> {actual}')
+    click.echo(f'Corrected {len(drifted)} courses')
+
+
+@click.command('seed')
+@click.option('--users', type=int, default=1, show_default=True)
+@click.option('--departments', type=int, help='How many of the sample departments to use (default: all).')
+@click.option('--facilitators', type=int, default=20, show_default=True)
+@click.option('--trainees', type=int, default=1000, show_default=True)
+@click.option('--fees', type=int, default=2000, show_default=True)
+@click.option('--inventory', type=int, default=300, show_default=True)
+@click.option('--staff', type=int, default=30, show_default=True)
+@click.option('--events', type=int, default=50, show_default=True)
+@click.option('--years', type=int, default=2, show_default=True, help='How far back dates go.')
+@click.option('--seed', 'random_seed', type=int, default=0, show_default=True, help='Random seed.')
+@with_appcontext
+def seed_command(users, departments, facilitators, trainees, fees, inventory, staff, events, years, random_seed):
+    """Fill the database with generated, consistent sample data."""
+    db.create_all()
+    run_migrations()
+    added = seed_database(users=users, departments=departments, facilitators=facilitators, trainees=trainees,
+                          fees=fees, inventory=inventory, staff=staff, events=events, seed=random_seed, years=years)
+    for table, count in added.items():
+        click.echo(f'{table}: {count}')
+    click.echo(f'Seed users log in with password "{SEED_USER_PASSWORD}"')
+
+
+@click.command('worker')
+@click.option('--threads', type=int, default=1, show_default=True, help='Jobs to run at the same time.')
+@click.option('--once', is_flag=True, help='Run the jobs that are due, then exit.')
+@with_appcontext
+def worker_command(threads, once):
+    """Run queued background jobs from the jobs table."""
+    db.create_all()
+    worker = JobWorker(current_app._get_current_object(), threads=threads)
+    if once:
+        click.echo(f'Ran {worker.run_pending()} jobs')
+        return
+    click.echo(f'Worker {worker.name} waiting for jobs with {threads} threads')
+    worker.run_forever()
+
+
+@click.command('finance-report')
+@click.option('--rows', default='month', show_default=True,
+              help=f"Comma separated dimensions for the rows: {', '.join(REPORT_DIMENSIONS)}.")
+@click.option('--columns', default='', help='Comma separated dimensions for the columns.')
+@click.option('--measures', default='income,expense', show_default=True,
+              help=f"Comma separated measures: {', '.join(REPORT_MEASURES)}.")
+@click.option('--start', help='First date to include (YYYY-MM-DD).')
+@click.option('--end', help='Last date to include (YYYY-MM-DD).')
+@click.option('--department')
+@click.option('--course')
+@click.option('--payment-type')
+@click.option('--payment-status')
+@click.option('--format', 'output_format', type=click.Choice(['table', 'csv', 'json']), default='table')
+@with_appcontext
+def finance_report_command(rows, columns, measures, start, end, department, course, payment_type, payment_status,
+                           output_format):
+    """Print income vs expense broken down by the given dimensions."""
+    try:
+        report = finance_report(**report_options({
+            'rows': rows, 'columns': columns, 'measures': measures, 'start': start, 'end': end,
+            'department': department, 'course': course, 'payment_type': payment_type,
+            'payment_status': payment_status,
+        }))
+    except ValueError as error:
+        raise click.BadParameter(str(error))
+
+    if output_format == 'json':
+        click.echo(json.dumps(report, indent=2))
+        return
+    header, lines = report_table(report)
+    if output_format == 'csv':
+        writer = csv.writer(sys.stdout)
+        writer.writerow(header)
+        writer.writerows(lines)
+        return
+    widths = [max(len(str(value)) for value in column) for column in zip(header, *lines)]
+    click.echo('  '.join(name.ljust(width) for name, width in zip(header, widths)).rstrip())
+    for line in lines:
+        click.echo('  '.join(str(value).rjust(width) if isinstance(value, int) else str(value).ljust(width)
+                             for value, width in zip(line, widths)).rstrip())
+
+
+@click.command('reindex-search')
+@with_appcontext
+def reindex_search_command():
+    """Rebuild the global search index from every searchable table."""
+    counts = rebuild_site_search()
+    if not counts:
+        click.echo('No search index in this database, run `flask migrate` first.')
+        return
+    for name, count in counts.items():
+        click.echo(f'{name}: {count}')
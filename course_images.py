@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, send_from_directory, make_response, abort
+from werkzeug.security import safe_join
+
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+VARIANTS_FOLDER = 'variants'
+# longest side of each generated variant
+IMAGE_VARIANTS = {
+    'thumb': (320, 320),
+    'card': (800, 800),
+}
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+LEGACY_MAX_AGE = 24 * 60 * 60
+# a variant asked for before it is built is answered with the original for this long
+PENDING_VARIANT_MAX_AGE = 60
+# "<sha256>.<ext>" names never change content, so they may be cached forever
+_CONTENT_ADDRESSED = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]+$')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _variant_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='course-image-variants')
+        return _executor
+
+
+# worker threads do not survive a fork
+def _reset_executor():
+    global _executor
+    _executor = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_executor)
+
+
+def _extension(filename):
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    return re.sub(r'[^a-z0-9]', '', extension) or 'bin'
+
+
+def variant_path(upload_folder, image_name, variant):
+    stem, extension = os.path.splitext(image_name)
+    return os.path.join(upload_folder, VARIANTS_FOLDER, f'{stem}-{variant}{extension}')
+
+
+# Resize an original into every variant; runs on the background worker
+def generate_variants(upload_folder, image_name):
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning('Pillow is not installed, serving %s without resized variants', image_name)
+        return
+
+    os.makedirs(os.path.join(upload_folder, VARIANTS_FOLDER), exist_ok=True)
+    source = os.path.join(upload_folder, image_name)
+    for variant, size in IMAGE_VARIANTS.items():
+        target = variant_path(upload_folder, image_name, variant)
+        if os.path.exists(target):
+            continue
+        try:
+            with Image.open(source) as image:
+                image.thumbnail(size)
+                handle, temporary = tempfile.mkstemp(dir=os.path.dirname(target), suffix=os.path.splitext(target)[1])
+                os.close(handle)
+                image.save(temporary, format=image.format)
+            os.replace(temporary, target)
+        except (OSError, ValueError):
+            logger.exception('Could not build %s variant of %s', variant, image_name)
+
+
+# Stream an upload to disk in chunks and store it under its content hash.
+# Returns the stored name; a file already uploaded before is kept only once.
+def store_course_image(upload_folder, file_storage):
+    os.makedirs(upload_folder, exist_ok=True)
+    digest = hashlib.sha256()
+    handle, temporary = tempfile.mkstemp(dir=upload_folder, prefix='.upload-')
+    try:
+        with os.fdopen(handle, 'wb') as temporary_file:
+            while True:
+                chunk = file_storage.stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                temporary_file.write(chunk)
+
+        image_name = f'{digest.hexdigest()}.{_extension(file_storage.filename)}'
+        target = os.path.join(upload_folder, image_name)
+        if os.path.exists(target):
+            os.remove(temporary)
+        else:
+            os.replace(temporary, target)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+    _variant_executor().submit(generate_variants, upload_folder, image_name)
+    return image_name
+
+
+# Serve an original or a resized variant with long-lived caching, Range support
+# and optional X-Sendfile / X-Accel-Redirect offload to the front web server
+def serve_course_image(upload_folder, image_name, variant=None):
+    directory = os.path.abspath(upload_folder)
+    filename = image_name
+    # variants are built in the background after an upload; until then the original stands in
+    pending_variant = variant in IMAGE_VARIANTS
+    if pending_variant and os.path.exists(variant_path(directory, image_name, variant)):
+        filename = os.path.relpath(variant_path(directory, image_name, variant), directory)
+        pending_variant = False
+
+    accel_prefix = current_app.config.get('MEDIA_X_ACCEL_PREFIX')
+    if accel_prefix:
+        if safe_join(directory, filename) is None:
+            abort(404)
+        response = make_response('')
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + filename.replace(os.sep, '/')
+        # let nginx work out the content type from the file it serves
+        del response.headers['Content-Type']
+    else:
+        # send_from_directory honours Range / If-None-Match and USE_X_SENDFILE
+        response = send_from_directory(directory, filename, conditional=True)
+
+    if pending_variant:
+        # the variant URL must not keep the full size original once the variant exists
+        response.headers['Cache-Control'] = f'public, max-age={PENDING_VARIANT_MAX_AGE}'
+    elif _CONTENT_ADDRESSED.match(image_name):
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = f'public, max-age={LEGACY_MAX_AGE}'
+    return response
@@ -0,0 +1,50 @@
+from flask import request, render_template, redirect, url_for, current_app
+from sqlalchemy.orm import joinedload
+from models import User, Facilitator, Course
+from decorators import login_is_required
+from db_helpers import add_a_course, edit_a_course
+from reference_cache import reference_data
+from course_images import serve_course_image
+from render_cache import cached_page
+from timestamps import conditional_list, conditional_record
+
+
+@login_is_required
+@conditional_list(Course, Facilitator, User)
+@cached_page('courses', 'facilitators')
+def all_courses():
+    courses = Course.query.options(joinedload(Course.facilitator_ref)).all()
+    return render_template('all-courses.html', courses=courses)
+
+
+@login_is_required
+def add_course():
+    facilitators = reference_data.get('facilitators')
+    if request.method == 'POST':
+        config_folder = current_app.config['UPLOAD_FOLDER']
+        add_a_course(config_folder, request.files, request.form)
+        return redirect(url_for('all_courses'))
+    return render_template('add-courses.html', facilitators=facilitators)
+
+
+@login_is_required
+@conditional_record(Course, 'course_id', Facilitator, User)
+def edit_course():
+    facilitators = reference_data.get('facilitators')
+    course_to_edit = Course.query.get(request.args.get('course_id'))
+    if request.method == 'POST':
+        edit_a_course(request.args, request.form)
+        return redirect(url_for('all_courses'))
+    return render_template('edit-courses.html', course_to_edit=course_to_edit, facilitators=facilitators)
+
+
+@login_is_required
+@conditional_record(Course, 'course_id', Facilitator, User)
+@cached_page('courses', 'facilitators')
+def about_course():
+    course_to_display = Course.query.options(joinedload(Course.facilitator_ref)).get(request.args.get('course_id'))
+    return render_template('about-courses.html', course_to_display=course_to_display)
+
+
+def course_image(image_name):
+    return serve_course_image(current_app.config['UPLOAD_FOLDER'], image_name, request.args.get('variant'))
@@ -0,0 +1,78 @@
+from datetime import date
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from models import db, Trainee, Course, Facilitator, MonthlyFinanceRollup
+from helpers import month_bounds, format_trainees_increase, format_fees_increase
+
+
+# number of rows shown in the dashboard "recent" cards
+RECENT_TRAINEES_LIMIT = 4
+RECENT_FACILITATORS_LIMIT = 5
+
+
+# Count rows of a model, optionally restricted to a date range on a column
+def _count_subquery(model, date_column=None, start=None, end=None):
+    query = db.session.query(func.count(model.id))
+    if date_column is not None:
+        query = query.filter(date_column >= start, date_column < end)
+    return query.as_scalar()
+
+
+# Sum fee income from the monthly rollup, optionally for a single month
+def _income_subquery(month_start=None):
+    query = db.session.query(func.coalesce(func.sum(MonthlyFinanceRollup.income), 0))
+    if month_start is not None:
+        query = query.filter(MonthlyFinanceRollup.year == month_start.year,
+                             MonthlyFinanceRollup.month == month_start.month)
+    return query.as_scalar()
+
+
+# Fetch every dashboard KPI in a single round trip
+def get_dashboard_counts(day=None):
+    last_month_start, current_month_start, next_month_start = month_bounds(day)
+
+    row = db.session.query(
+        _count_subquery(Trainee).label('trainees_length'),
+        _count_subquery(Course).label('course_length'),
+        _income_subquery().label('fees_collected'),
+        _count_subquery(Trainee, Trainee.registration_date,
+                        current_month_start, next_month_start).label('new_trainees'),
+        _count_subquery(Trainee, Trainee.registration_date,
+                        last_month_start, current_month_start).label('last_month_trainees'),
+        _income_subquery(current_month_start).label('current_month_fees'),
+        _income_subquery(last_month_start).label('last_month_fees'),
+    ).one()
+
+    return {
+        'trainees_length': row.trainees_length,
+        'course_length': row.course_length,
+        'fees_collected': row.fees_collected,
+        'new_trainees': row.new_trainees,
+        'percentage_increase': format_trainees_increase(row.new_trainees, row.last_month_trainees),
+        'fee_percentage_increase': format_fees_increase(row.current_month_fees, row.last_month_fees),
+    }
+
+
+# Everything the dashboard template needs, without loading whole tables
+def get_dashboard_stats(day=None):
+    stats = get_dashboard_counts(day)
+
+    stats['all_trainees'] = (
+        Trainee.query
+        .options(joinedload(Trainee.course_ref))
+        .order_by(Trainee.id.desc())
+        .limit(RECENT_TRAINEES_LIMIT)
+        .all()
+    )
+    stats['all_facilitators'] = (
+        Facilitator.query
+        .order_by(Facilitator.id.desc())
+        .limit(RECENT_FACILITATORS_LIMIT)
+        .all()
+    )
+
+    # the income / expense chart loads its figures from /reports/finance
+    year = (day or date.today()).year
+    stats['chart_start'] = date(year, 1, 1).isoformat()
+    stats['chart_end'] = date(year, 12, 31).isoformat()
+    return stats
@@ -0,0 +1,58 @@
+import os
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+DEFAULT_POOL_TIMEOUT = 30
+# seconds; recycle before the server or a proxy closes idle connections
+DEFAULT_POOL_RECYCLE = 1800
+# milliseconds; 0 leaves the server default (gunicorn.conf.py sets one for web workers)
+DEFAULT_STATEMENT_TIMEOUT_MS = 0
+
+
+# SQLALCHEMY_ENGINE_OPTIONS for the configured database. SQLite gets no
+# pool sizing (it does not use a QueuePool) and a busy timeout instead of
+# a statement timeout.
+def engine_options(config):
+    database_uri = config.get('SQLALCHEMY_DATABASE_URI')
+    if not database_uri:
+        return {}
+    options = {'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)}
+    statement_timeout = config.get('DB_STATEMENT_TIMEOUT_MS', DEFAULT_STATEMENT_TIMEOUT_MS)
+    backend = make_url(database_uri).get_backend_name()
+
+    if backend == 'sqlite':
+        if statement_timeout:
+            options['connect_args'] = {'timeout': statement_timeout / 1000}
+        return options
+
+    options.update(
+        pool_size=config.get('DB_POOL_SIZE', DEFAULT_POOL_SIZE),
+        max_overflow=config.get('DB_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW),
+        pool_timeout=config.get('DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT),
+        pool_recycle=config.get('DB_POOL_RECYCLE', DEFAULT_POOL_RECYCLE),
+    )
+    if backend == 'postgresql' and statement_timeout:
+        options['connect_args'] = {'options': f'-c statement_timeout={int(statement_timeout)}'}
+    return options
+
+
+# A pooled connection opened before a fork (gunicorn preload_app, the receipt
+# workers) shares its socket with the parent; never hand it out in the child.
+@event.listens_for(Engine, 'connect')
+def _remember_connection_pid(dbapi_connection, connection_record):
+    connection_record.info['pid'] = os.getpid()
+
+
+@event.listens_for(Engine, 'checkout')
+def _refuse_connection_from_parent(dbapi_connection, connection_record, connection_proxy):
+    pid = os.getpid()
+    if connection_record.info['pid'] != pid:
+        # drop the reference without closing it, the parent still owns the socket
+        connection_record.connection = connection_proxy.connection = None
+        raise exc.DisconnectionError(
+            f"Connection record belongs to pid {connection_record.info['pid']}, checked out in pid {pid}"
+        )
@@ -10,6 +10,7 @@ from datetime import datetime
 from functools import wraps
 from models import db, User, Facilitator, Trainee, Course, InventoryItem, Staff, Department, Fee, Event
 from helpers import to_date_obj
+from course_images import store_course_image
 
 
 # Create New User
@@ -79,12 +80,8 @@ def delete_a_facilitator(request_args):
 
 
 def add_a_trainee(request_form):
-    course_to_increment = Course.query.filter_by(course_name=request_form.get('course')).first()
-
     date = to_date_obj(request_form.get('registration_date'))
 
-    print(course_to_increment)
-    print(request_form.get('course'))
     new_trainee = Trainee(first_name=request_form.get('first_name'),
                           last_name=request_form.get('last_name'),
                           email=request_form.get('email'),
@@ -95,7 +92,7 @@ def add_a_trainee(request_form):
                           mobile_number=request_form.get('mobile_number'),
                           address=request_form.get('address')
                           )
-    course_to_increment.students_enrolled += 1
+    # courses.students_enrolled is kept by the Trainee listeners
     db.session.add(new_trainee)
     db.session.commit()
     flash('Trainee Added Successfully', 'success')
@@ -125,13 +122,7 @@ def delete_a_trainee(request_args):
     
 
 def add_a_course(config_folder, request_files, request_form):
-    image_file = request_files['image']
-    image_file_name = image_file.filename
-    if os.path.exists(os.path.join(config_folder, image_file.filename)):
-        image_file_name = f"{uuid.uuid4()}-{image_file.filename}"
-        image_file.save(os.path.join(config_folder, image_file_name))
-    else:
-        image_file.save(os.path.join(config_folder, image_file_name))
+    image_file_name = store_course_image(config_folder, request_files['image'])
     new_course = Course(course_name=request_form.get('course_name'),
                         course_code=request_form.get('course_code'),
                         course_details=request_form.get('course_details'),
@@ -265,7 +256,7 @@ def delete_a_staff(request_args):
 def add_a_fee(request_form):
     date = to_date_obj(request_form.get('payment_date'))
     new_fee = Fee(trainee_name=request_form.get('trainee_name'),
-                  trainee_id=request_form['selected_trainee_id'],
+                  trainee_id=request_form.get('selected_trainee_id', type=int),
                   department=request_form.get('department'),
                   course=request_form.get('course'),
                   amount=request_form.get('amount'),
@@ -282,6 +273,8 @@ def edit_a_fee(fee_to_edit, request_form):
     date = to_date_obj(request_form.get('payment_date'))
 
     fee_to_edit.trainee_name = request_form.get('trainee_name')
+    if request_form.get('selected_trainee_id', type=int):
+        fee_to_edit.trainee_id = request_form.get('selected_trainee_id', type=int)
     fee_to_edit.department = request_form.get('department')
     fee_to_edit.course = request_form.get('course')
     fee_to_edit.amount = request_form.get('amount')
@@ -0,0 +1,37 @@
+from flask import request, render_template, redirect, url_for
+from models import User, Department
+from decorators import login_is_required
+from db_helpers import add_a_department, edit_a_department, delete_a_department
+from render_cache import cached_page
+from timestamps import conditional_list, conditional_record
+
+
+@login_is_required
+@conditional_list(Department, User)
+@cached_page('departments')
+def departments():
+    return render_template('all-departments.html')
+
+
+@login_is_required
+def add_department():
+    if request.method == 'POST':
+        add_a_department(request.form)
+        return redirect(url_for('departments'))
+    return render_template('add-departments.html')
+
+
+@login_is_required
+@conditional_record(Department, 'department_id', User)
+def edit_department():
+    department_to_edit = Department.query.get(request.args.get('department_id'))
+    if request.method == 'POST':
+        edit_a_department(department_to_edit, request.form)
+        return redirect(url_for('departments'))
+    return render_template('edit-departments.html', department_to_edit=department_to_edit)
+
+
+@login_is_required
+def delete_department():
+    delete_a_department(request.args)
+    return redirect(url_for('departments'))
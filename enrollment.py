@@ -0,0 +1,52 @@
+from datetime import datetime
+from sqlalchemy import func, text
+from models import db, Course, Trainee
+from table_versions import bump_table_version
+
+
+_ADJUST_ENROLLMENT = text(
+    'UPDATE courses SET students_enrolled = COALESCE(students_enrolled, 0) + :delta, updated_at = :now '
+    'WHERE id = :course_id'
+)
+
+
+# Move a course's students_enrolled by delta in one atomic UPDATE, so
+# concurrent registrations never overwrite each other's increments
+def adjust_enrollment(connection, course_id, delta):
+    if course_id is None or not delta:
+        return
+    connection.execute(_ADJUST_ENROLLMENT, {'delta': delta, 'course_id': course_id, 'now': datetime.utcnow()})
+
+
+# Same for many courses at once: {course_id: delta}
+def adjust_enrollments(connection, deltas):
+    now = datetime.utcnow()
+    params = [{'delta': delta, 'course_id': course_id, 'now': now}
+              for course_id, delta in deltas.items() if course_id is not None and delta]
+    if params:
+        connection.execute(_ADJUST_ENROLLMENT, params)
+
+
+# Recount every course from trainees in one grouped query and fix the counters
+# that drifted. Returns {course_name: (stored, actual)} for the corrected courses.
+def reconcile_enrollment():
+    counts = dict(
+        db.session.query(Trainee.course_id, func.count(Trainee.id))
+        .filter(Trainee.course_id.isnot(None))
+        .group_by(Trainee.course_id)
+    )
+    drifted = {}
+    corrections = []
+    for course_id, course_name, stored in db.session.query(Course.id, Course.course_name, Course.students_enrolled):
+        actual = counts.get(course_id, 0)
+        if stored != actual:
+            drifted[course_name] = (stored, actual)
+            corrections.append({'delta': actual - (stored or 0), 'course_id': course_id, 'now': datetime.utcnow()})
+
+    # apply the difference rather than the count, so registrations that land
+    # while this runs are not written over
+    if corrections:
+        db.session.execute(_ADJUST_ENROLLMENT, corrections)
+        bump_table_version(db.session.connection(), 'courses')
+    db.session.commit()
+    return drifted
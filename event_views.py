@@ -0,0 +1,23 @@
+from flask import request, render_template, redirect, url_for
+from models import User, Event
+from decorators import login_is_required
+from db_helpers import add_an_event
+from events_feed import events_feed_response
+from render_cache import cached_page
+from timestamps import conditional_list
+
+
+@login_is_required
+@conditional_list(Event, User)
+@cached_page('events')
+def event_management():
+    events = Event.query.all()
+    if request.method == 'POST':
+        add_an_event(request.form)
+        return redirect(url_for('event_management'))
+    return render_template('event-management.html', events=events)
+
+
+@login_is_required
+def get_events():
+    return events_feed_response(request)
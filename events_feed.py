@@ -0,0 +1,54 @@
+from flask import jsonify, make_response
+from werkzeug.http import is_resource_modified
+from models import db, Event
+from helpers import to_date_obj
+from table_versions import table_version
+
+
+# FullCalendar sends "2026-10-01" or "2026-10-01T00:00:00"; None when missing or malformed
+def _window_bound(value):
+    if not value:
+        return None
+    try:
+        return to_date_obj(value[:10])
+    except ValueError:
+        return None
+
+
+# Events inside FullCalendar's [start, end) window, served from the event_date index
+def events_in_range(start=None, end=None):
+    query = db.session.query(Event.id, Event.event_name, Event.event_date)
+    if start is not None:
+        query = query.filter(Event.event_date >= start)
+    if end is not None:
+        query = query.filter(Event.event_date < end)
+    return [
+        {
+            'id': event_id,
+            'title': event_name,
+            'start': event_date.isoformat() if event_date else None,
+            'end': event_date.isoformat() if event_date else None,
+            'description': event_name,
+        }
+        for event_id, event_name, event_date in query.order_by(Event.event_date, Event.id)
+    ]
+
+
+# JSON calendar feed with ETag / Last-Modified taken from the events version
+# counter; a browser that already has the current window gets a 304
+def events_feed_response(request):
+    start = _window_bound(request.args.get('start'))
+    end = _window_bound(request.args.get('end'))
+    version, updated_at = table_version('events')
+    etag = f'events-{version}-{start}-{end}'
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=updated_at):
+        response = make_response('', 304)
+    else:
+        response = jsonify(events_in_range(start, end))
+    response.set_etag(etag)
+    if updated_at is not None:
+        response.last_modified = updated_at
+    # the feed is per user session, and must be revalidated before reuse
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
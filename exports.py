@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import zlib
+from helpers import to_date_obj
+from models import db, Facilitator, Trainee, Course, InventoryItem, Staff, Department, Fee, Event
+
+
+# rows fetched from the database cursor at a time
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+# Exportable tables and the columns their date range / department / course filters use.
+# Users are left out on purpose: that table holds passwords.
+EXPORT_SOURCES = {
+    'fees': {'model': Fee, 'date': Fee.payment_date, 'department': Fee.department, 'course': Fee.course},
+    'trainees': {'model': Trainee, 'date': Trainee.registration_date,
+                 'department': Trainee.department, 'course': Trainee.course},
+    'staff': {'model': Staff, 'date': Staff.joining_date, 'department': Staff.department, 'course': None},
+    'inventory': {'model': InventoryItem, 'date': InventoryItem.purchase_date,
+                  'department': InventoryItem.department_for, 'course': InventoryItem.course_for},
+    'facilitators': {'model': Facilitator, 'date': Facilitator.joining_date,
+                     'department': Facilitator.department, 'course': Facilitator.course},
+    'departments': {'model': Department, 'date': None, 'department': Department.department_name, 'course': None},
+    'courses': {'model': Course, 'date': None, 'department': None, 'course': Course.course_name},
+    'events': {'model': Event, 'date': Event.event_date, 'department': None, 'course': None},
+}
+
+
+# Read the optional start/end/department/course filters from request args or CLI options
+def export_filters(args):
+    return {
+        'start': to_date_obj(args['start']) if args.get('start') else None,
+        'end': to_date_obj(args['end']) if args.get('end') else None,
+        'department': args.get('department') or None,
+        'course': args.get('course') or None,
+    }
+
+
+# WHERE clauses of the filters that apply to an entity; filters it has no column for are ignored
+def export_conditions(entity, start=None, end=None, department=None, course=None):
+    source = EXPORT_SOURCES[entity]
+    conditions = []
+    if source['date'] is not None:
+        if start is not None:
+            conditions.append(source['date'] >= start)
+        if end is not None:
+            conditions.append(source['date'] <= end)
+    if department and source['department'] is not None:
+        conditions.append(source['department'] == department)
+    if course and source['course'] is not None:
+        conditions.append(source['course'] == course)
+    return conditions
+
+
+# Plain column query for an export, streamed from a server-side cursor where supported
+def export_query(entity, start=None, end=None, department=None, course=None):
+    source = EXPORT_SOURCES[entity]
+    columns = list(source['model'].__table__.columns)
+    query = (
+        db.session.query(*columns)
+        .filter(*export_conditions(entity, start, end, department, course))
+        .order_by(source['model'].id)
+        .execution_options(stream_results=True)
+        .yield_per(EXPORT_BATCH_SIZE)
+    )
+    return [column.name for column in columns], query
+
+
+def _csv_chunks(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _jsonl_chunks(header, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(header, row)), default=str))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+# Compress a stream of text chunks into a gzip stream on the fly
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Generator of export chunks (str, or bytes when gzipped) for one entity
+def generate_export(entity, export_format='csv', compress=False, **filters):
+    header, rows = export_query(entity, **filters)
+    chunks = _jsonl_chunks(header, rows) if export_format == 'jsonl' else _csv_chunks(header, rows)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+# File name offered to the browser / written by the CLI
+def export_filename(entity, export_format='csv', compress=False):
+    return f"{entity}.{export_format}{'.gz' if compress else ''}"
@@ -0,0 +1,45 @@
+from flask import request, render_template, redirect, url_for
+from models import User, Facilitator, Department
+from decorators import login_is_required
+from db_helpers import create_facilitator, facilitator_edit, delete_a_facilitator
+from reference_cache import reference_data
+from render_cache import cached_page
+from timestamps import conditional_list, conditional_record
+
+
+@login_is_required
+@conditional_list(Facilitator, User)
+@cached_page('facilitators')
+def all_facilitators():
+    return render_template("all-professors.html")
+
+
+@login_is_required
+def add_facilitator():
+    departments = reference_data.get('departments')
+    if request.method == 'POST':
+        create_facilitator(request.form)
+        return redirect(url_for('all_facilitators'))
+    return render_template('add-professor.html', departments=departments)
+
+
+@login_is_required
+@conditional_record(Facilitator, 'facilitator_id', Department, User)
+def edit_facilitator():
+    facilitator_to_edit = Facilitator.query.get(request.args.get('facilitator_id'))
+    departments = reference_data.get('departments')
+    if request.method == 'POST':
+        facilitator_edit(facilitator_to_edit, request.form)
+        return redirect(url_for('all_facilitators'))
+    return render_template('edit-professor.html', facilitator_to_edit=facilitator_to_edit, departments=departments)
+
+
+@login_is_required
+def delete_facilitator():
+    delete_a_facilitator(request.args)
+    return redirect(url_for('all_facilitators'))
+
+
+@login_is_required
+def facilitator_profile():
+    return render_template('professor-profile.html')
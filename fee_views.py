@@ -0,0 +1,48 @@
+from datetime import datetime
+from flask import request, render_template, redirect, url_for
+from models import User, Trainee, Course, Department, Fee
+from decorators import login_is_required
+from db_helpers import add_a_fee, edit_a_fee
+from reference_cache import reference_data
+from receipts import receipt_for
+from render_cache import cached_page
+from timestamps import conditional_list, conditional_record
+
+
+@login_is_required
+@conditional_list(Fee, User)
+@cached_page('fees')
+def fees_collection():
+    return render_template('fees-collection.html')
+
+
+@login_is_required
+def add_fees():
+    departments = reference_data.get('departments')
+    courses = reference_data.get('courses')
+    if request.method == 'POST':
+        add_a_fee(request.form)
+        return redirect(url_for('fees_collection'))
+    return render_template('add-fees.html', departments=departments, courses=courses)
+
+
+@login_is_required
+@conditional_record(Fee, 'fee_id', Trainee, Course, Department, User, daily=True)
+def fees_receipt():
+    receipt = receipt_for(request.args.get('fee_id'))
+    if receipt is None:
+        return render_template('page-error-404.html'), 404
+    current_date = datetime.now().strftime("%d/%m/%Y")
+    return render_template('fees-receipt.html', receipt=receipt, current_date=current_date)
+
+
+@login_is_required
+@conditional_record(Fee, 'fee_id', Department, Course, User)
+def edit_fee():
+    departments = reference_data.get('departments')
+    courses = reference_data.get('courses')
+    fee_to_edit = Fee.query.get(request.args.get('fee_id'))
+    if request.method == 'POST':
+        edit_a_fee(fee_to_edit, request.form)
+        return redirect(url_for('fees_collection'))
+    return render_template('edit-fees.html', fee_to_edit=fee_to_edit, departments=departments, courses=courses)
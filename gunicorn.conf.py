@@ -0,0 +1,57 @@
+# gunicorn settings, sized from the CPU count; every value can be overridden
+# from the environment (web_workers, web_threads, port, ...).
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('port', '8000')}"
+
+# threads cover requests waiting on the database, workers cover the CPUs
+workers = int(os.environ.get('web_workers', multiprocessing.cpu_count() + 1))
+threads = int(os.environ.get('web_threads', 4))
+worker_class = 'gthread'
+
+# import the app once in the master and fork it into the workers
+preload_app = True
+
+timeout = int(os.environ.get('web_timeout', 30))
+graceful_timeout = 30
+keepalive = 5
+# recycle workers now and then to bound memory growth
+max_requests = int(os.environ.get('web_max_requests', 2000))
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
+
+# one pooled connection per thread; overflow absorbs bursts
+os.environ.setdefault('db_pool_size', str(threads))
+# cut off runaway queries in requests, but not in CLI commands like migrate
+os.environ.setdefault('db_statement_timeout_ms', str(timeout * 1000))
+# each worker writes its request metrics here and /metrics sums them
+os.environ.setdefault('metrics_dir', os.path.join(tempfile.gettempdir(),
+                                                  f"ced-erp-metrics-{os.environ.get('port', '8000')}"))
+
+
+# Counters of the previous server run would be summed in with this one's
+def on_starting(server):
+    for path in glob.glob(os.path.join(os.environ['metrics_dir'], '*.json*')):
+        os.remove(path)
+
+
+# The master loaded the app (and may have opened connections doing so);
+# close its pool so the workers start with empty ones
+def when_ready(server):
+    from wsgi import app
+    from models import db
+
+    with app.app_context():
+        db.engine.dispose()
+
+
+# Write the counts of the last requests a recycled worker served before it goes
+def worker_exit(server, worker):
+    from instrumentation import request_metrics
+
+    request_metrics.flush()
@@ -6,9 +6,10 @@ from sqlalchemy import Column, String, LargeBinary, event, func, cast, Date
 import os
 import calendar
 import uuid
-from datetime import datetime
+from datetime import datetime, date
 from functools import wraps
-from models import db, User, Facilitator, Trainee, Course, InventoryItem, Staff, Department, Fee, Event
+from models import db, User, Facilitator, Trainee, Course, InventoryItem, Staff, Department, Fee, Event, MonthlyFinanceRollup
+from rollups import rollup_totals
 
 
 # covert string date to date ob
@@ -23,42 +24,56 @@ def calculate_total_amount():
 
 
 
-# claculate Students Increase Percentage
-def calculate_percentage_increased(trainees):
-    current_month = datetime.now().month
-    last_month_trainees = Trainee.query.filter(func.extract('month', Trainee.registration_date) == current_month - 1).count()
-    current_month_trainees = Trainee.query.filter(func.extract('month', Trainee.registration_date) == current_month).count()
-    if last_month_trainees == 0:
+# First day of the current, previous and next month for a given day
+def month_bounds(day=None):
+    day = day or date.today()
+    current_month_start = day.replace(day=1)
+    if current_month_start.month == 1:
+        last_month_start = current_month_start.replace(year=current_month_start.year - 1, month=12)
+    else:
+        last_month_start = current_month_start.replace(month=current_month_start.month - 1)
+    if current_month_start.month == 12:
+        next_month_start = current_month_start.replace(year=current_month_start.year + 1, month=1)
+    else:
+        next_month_start = current_month_start.replace(month=current_month_start.month + 1)
+    return last_month_start, current_month_start, next_month_start
+
+
+# Format the month over month trainees change
+def format_trainees_increase(current_month_trainees, last_month_trainees):
+    if not last_month_trainees:
         return "No Trainees Registered last month"
 
     percentage_increase = ((current_month_trainees - last_month_trainees) / last_month_trainees) * 100
     return f"{percentage_increase:.2f}% increase from last month"
 
 
-# claculate Fees Increase Percentage
-def calculate_fees_percentage_increased():
-    current_month = datetime.now().month
-    last_month_total = (
-        Fee.query
-        .with_entities(func.sum(Fee.amount))
-        .filter(func.extract('month', Fee.payment_date) == current_month - 1)
-        .scalar()
-    )
-
-    current_month_total = (
-        Fee.query
-        .with_entities(func.sum(Fee.amount))
-        .filter(func.extract('month', Fee.payment_date) == current_month)
-        .scalar()
-    )
-
-    if last_month_total is None:
+# Format the month over month fees change
+def format_fees_increase(current_month_total, last_month_total):
+    if not last_month_total:
         return "No records last month"
 
-    percentage_increase = ((current_month_total - last_month_total) / last_month_total) * 100
+    percentage_increase = (((current_month_total or 0) - last_month_total) / last_month_total) * 100
     return f"{percentage_increase:.2f}% increase from last month"
 
 
+# claculate Students Increase Percentage
+def calculate_percentage_increased(trainees=None):
+    last_month_start, current_month_start, next_month_start = month_bounds()
+    last_month_trainees = Trainee.query.filter(Trainee.registration_date >= last_month_start,
+                                               Trainee.registration_date < current_month_start).count()
+    current_month_trainees = Trainee.query.filter(Trainee.registration_date >= current_month_start,
+                                                  Trainee.registration_date < next_month_start).count()
+    return format_trainees_increase(current_month_trainees, last_month_trainees)
+
+
+# claculate Fees Increase Percentage
+def calculate_fees_percentage_increased():
+    last_month_start, current_month_start, next_month_start = month_bounds()
+    last_month_total, _ = rollup_totals(last_month_start, current_month_start)
+    current_month_total, _ = rollup_totals(current_month_start, next_month_start)
+    return format_fees_increase(current_month_total, last_month_total)
+
 
 # Function to convert number to month name
 def number_to_month_name(month_number):
@@ -66,22 +81,3 @@ def number_to_month_name(month_number):
         return calendar.month_name[month_number]
     except (IndexError, ValueError):
         return 'Invalid Month Number'
-
-
-# get income expense data for moris chart by month
-def get_monthly_income_expense_data():
-    # calculate total income by month
-    income_data = db.session.query(func.extract('month', Fee.payment_date).label('month'),
-                                   func.sum(Fee.amount).label('total_income')
-                                   ).group_by(func.extract('month', Fee.payment_date)).all()
-
-    # calculate total expenses by month
-    expense_data = db.session.query(func.extract('month', InventoryItem.purchase_date).label('month'),
-                                    func.sum(InventoryItem.price).label('total_expenses')
-                                    ).group_by(func.extract('month', InventoryItem.purchase_date)).all()
-
-    # Convert the result to a list of dictionaries
-    income_data = [{'month': number_to_month_name(int(month)), 'total_income': int(total_income)} for month, total_income in income_data]
-    expense_data = [{'month': number_to_month_name(int(month)), 'total_expenses': int(total_expenses)} for month, total_expenses in expense_data]
-
-    return income_data, expense_data
\ No newline at end of file
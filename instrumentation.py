@@ -0,0 +1,255 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from flask import g, has_request_context, request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY_MS = 200
+# the same statement run this many times in one request is reported as N+1
+DEFAULT_REPEATED_QUERY_THRESHOLD = 10
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# how often a worker writes its counters to the shared metrics directory
+DEFAULT_METRICS_FLUSH_SECONDS = 1.0
+# counters keyed by route alone
+ROUTE_COUNTERS = ('latency_sum', 'sql_queries', 'sql_seconds', 'slow_queries', 'repeated_queries')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+# Sum the counter snapshots of several processes
+def _merge(snapshots):
+    merged = {'requests': Counter(), 'latency_buckets': {}}
+    merged.update({name: Counter() for name in ROUTE_COUNTERS})
+    for snapshot in snapshots:
+        for route, method, status, count in snapshot['requests']:
+            merged['requests'][(route, method, status)] += count
+        for route, buckets in snapshot['latency_buckets'].items():
+            total = merged['latency_buckets'].setdefault(route, [0] * len(buckets))
+            for index, count in enumerate(buckets):
+                total[index] += count
+        for name in ROUTE_COUNTERS:
+            merged[name].update(snapshot[name])
+    return merged
+
+
+# Per route request latency, SQL counts and SQL time, rendered in the Prometheus
+# text exposition format. Counters live in each process; with a metrics_dir
+# (gunicorn sets one) every worker writes them to its own file there and /metrics
+# sums the files, so a scrape sees the whole server whichever worker answers it.
+# Files of exited workers stay, keeping the totals from going backwards.
+class RequestMetrics:
+    def __init__(self, slow_query_ms=DEFAULT_SLOW_QUERY_MS, repeated_query_threshold=DEFAULT_REPEATED_QUERY_THRESHOLD,
+                 server_timing=False, metrics_dir=None, flush_seconds=DEFAULT_METRICS_FLUSH_SECONDS):
+        self.slow_query_ms = slow_query_ms
+        self.repeated_query_threshold = repeated_query_threshold
+        self.server_timing = server_timing
+        self.metrics_dir = metrics_dir
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        # (pid, path) of this process's file in metrics_dir, and the pid running the flusher
+        self._file = None
+        self._flusher_pid = None
+        self.reset()
+
+    def init_app(self, app):
+        self.slow_query_ms = app.config.get('SLOW_QUERY_MS', self.slow_query_ms)
+        self.repeated_query_threshold = app.config.get('REPEATED_QUERY_THRESHOLD', self.repeated_query_threshold)
+        self.server_timing = app.config.get('SERVER_TIMING', self.server_timing)
+        self.metrics_dir = app.config.get('METRICS_DIR', self.metrics_dir)
+        if self.metrics_dir:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def reset(self):
+        with self._lock:
+            # (route, method, status) -> count
+            self.requests = Counter()
+            # route -> [count per bucket..., +Inf count], sum
+            self.latency_buckets = {}
+            self.latency_sum = Counter()
+            self.sql_queries = Counter()
+            self.sql_seconds = Counter()
+            self.slow_queries = Counter()
+            self.repeated_queries = Counter()
+            self._dirty = False
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+        g.sql_queries = 0
+        g.sql_seconds = 0.0
+        g.sql_statements = Counter()
+
+    def _finish_request(self, response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+
+        repeated = {statement: count for statement, count in g.sql_statements.items()
+                    if count >= self.repeated_query_threshold}
+        for statement, count in repeated.items():
+            logger.warning('Possible N+1 on %s %s: statement ran %d times: %s',
+                           request.method, route, count, statement)
+
+        with self._lock:
+            self.requests[(route, request.method, response.status_code)] += 1
+            buckets = self.latency_buckets.setdefault(route, [0] * (len(LATENCY_BUCKETS) + 1))
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if elapsed <= bound:
+                    buckets[index] += 1
+            buckets[-1] += 1
+            self.latency_sum[route] += elapsed
+            self.sql_queries[route] += g.sql_queries
+            self.sql_seconds[route] += g.sql_seconds
+            self.repeated_queries[route] += len(repeated)
+            self._dirty = True
+        self._start_flusher()
+
+        if self.server_timing:
+            response.headers.add('Server-Timing', f'sql;desc="{g.sql_queries} queries";dur={g.sql_seconds * 1000:.1f}')
+            response.headers.add('Server-Timing', f'total;dur={elapsed * 1000:.1f}')
+        return response
+
+    # called for every statement run on any engine
+    def record_query(self, statement, seconds):
+        if seconds * 1000 >= self.slow_query_ms:
+            route = request.url_rule.rule if has_request_context() and request.url_rule else None
+            logger.warning('Slow query (%.1f ms)%s: %s', seconds * 1000, f' on {route}' if route else '', statement)
+            with self._lock:
+                self.slow_queries[route or 'none'] += 1
+                self._dirty = True
+
+        if has_request_context() and 'sql_statements' in g:
+            g.sql_queries += 1
+            g.sql_seconds += seconds
+            g.sql_statements[statement] += 1
+
+    def _snapshot(self):
+        with self._lock:
+            self._dirty = False
+            snapshot = {'requests': [[route, method, status, count]
+                                     for (route, method, status), count in self.requests.items()],
+                        'latency_buckets': {route: list(buckets) for route, buckets in self.latency_buckets.items()}}
+            snapshot.update({name: dict(getattr(self, name)) for name in ROUTE_COUNTERS})
+        return snapshot
+
+    # Write this process's counters to its file in metrics_dir, if they changed.
+    # The file is replaced whole, so readers never see half of one.
+    def flush(self):
+        if not self.metrics_dir or not self._dirty:
+            return
+        pid = os.getpid()
+        if self._file is None or self._file[0] != pid:
+            # the start time keeps a reused pid from overwriting a dead worker's file
+            self._file = (pid, os.path.join(self.metrics_dir, f'{pid}-{time.time_ns()}.json'))
+        path = self._file[1]
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(self._snapshot(), f)
+        os.replace(f'{path}.tmp', path)
+
+    # Start the thread flushing this process's counters every flush_seconds, once
+    # per process: a forked worker does not inherit its parent's thread
+    def _start_flusher(self):
+        if not self.metrics_dir or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(self.flush_seconds)
+                try:
+                    self.flush()
+                except OSError:
+                    logger.exception('Could not write metrics to %s', self.metrics_dir)
+
+        threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+    # Counters of every worker writing to metrics_dir, or of this process alone
+    def collect(self):
+        if not self.metrics_dir:
+            return _merge([self._snapshot()])
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.metrics_dir, '*.json')):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                # removed or replaced while reading; its counts are in the next scrape
+                continue
+        return _merge(snapshots)
+
+    def render(self):
+        data = self.collect()
+        lines = []
+        lines.append('# HELP http_requests_total Requests handled, by route, method and status.')
+        lines.append('# TYPE http_requests_total counter')
+        for (route, method, status), count in sorted(data['requests'].items()):
+            lines.append(f'http_requests_total{_labels(route=route, method=method, status=status)} {count}')
+
+        lines.append('# HELP http_request_duration_seconds Request latency, by route.')
+        lines.append('# TYPE http_request_duration_seconds histogram')
+        latency_sum = data['latency_sum']
+        for route, buckets in sorted(data['latency_buckets'].items()):
+            for bound, count in zip(LATENCY_BUCKETS, buckets):
+                lines.append(f'http_request_duration_seconds_bucket{_labels(route=route, le=bound)} {count}')
+            lines.append(f'http_request_duration_seconds_bucket{_labels(route=route, le="+Inf")} {buckets[-1]}')
+            lines.append(f'http_request_duration_seconds_sum{_labels(route=route)} {latency_sum[route]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{_labels(route=route)} {buckets[-1]}')
+
+        for name, help_text, values, kind in (
+            ('sql_queries_total', 'SQL statements run while serving requests, by route.',
+             data['sql_queries'], 'counter'),
+            ('sql_duration_seconds_total', 'Time spent in SQL while serving requests, by route.',
+             data['sql_seconds'], 'counter'),
+            ('sql_slow_queries_total', 'Statements slower than the slow query threshold, by route.',
+             data['slow_queries'], 'counter'),
+            ('sql_repeated_statements_total', 'Statements repeated past the N+1 threshold in one request, by route.',
+             data['repeated_queries'], 'counter'),
+        ):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for route, value in sorted(values.items()):
+                lines.append(f'{name}{_labels(route=route)} {value:.6f}' if isinstance(value, float)
+                             else f'{name}{_labels(route=route)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def response(self):
+        return Response(self.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+request_metrics = RequestMetrics()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=request_metrics.reset)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(connection, cursor, statement, parameters, context, executemany):
+    started = connection.info['query_started'].pop()
+    request_metrics.record_query(statement, time.perf_counter() - started)
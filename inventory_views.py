@@ -0,0 +1,42 @@
+from flask import request, render_template, redirect, url_for
+from models import User, Course, InventoryItem, Department
+from decorators import login_is_required
+from db_helpers import add_an_inventory, edit_an_inventory, delete_an_inventory
+from reference_cache import reference_data
+from render_cache import cached_page
+from timestamps import conditional_list, conditional_record
+
+
+@login_is_required
+@conditional_list(InventoryItem, User)
+@cached_page('inventory_items')
+def inventory():
+    return render_template('all-library.html')
+
+
+@login_is_required
+def add_to_inventory():
+    courses = reference_data.get('courses')
+    departments = reference_data.get('departments')
+    if request.method == 'POST':
+        add_an_inventory(request.form)
+        return redirect(url_for('inventory'))
+    return render_template('add-library.html', departments=departments, courses=courses)
+
+
+@login_is_required
+@conditional_record(InventoryItem, 'item_id', Course, Department, User)
+def edit_inventory_item():
+    courses = reference_data.get('courses')
+    departments = reference_data.get('departments')
+    item_to_edit = InventoryItem.query.get(request.args.get('item_id'))
+    if request.method == 'POST':
+        edit_an_inventory(item_to_edit, request.form)
+        return redirect(url_for('inventory'))
+    return render_template('edit-library.html', item_to_edit=item_to_edit, departments=departments, courses=courses)
+
+
+@login_is_required
+def delete_inventory_item():
+    delete_an_inventory(request.args)
+    return redirect(url_for('inventory'))
@@ -0,0 +1,105 @@
+import os
+import threading
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+
+FIRST_INVOICE_NUMBER = 45778
+# invoice numbers reserved per database round trip
+INVOICE_BLOCK_SIZE = 50
+INVOICE_SEQUENCE = 'fee_invoice_number_seq'
+INVOICE_COUNTER = 'fees'
+# key of the SQLite per-transaction block in connection.info
+_SQLITE_BLOCK_KEY = 'invoice_number_block'
+
+
+# Next number to hand out when nothing has been reserved yet
+def _initial_value(connection):
+    last_invoice = connection.execute(text('SELECT MAX(invoice_number) FROM fees')).scalar()
+    return last_invoice + 1 if last_invoice else FIRST_INVOICE_NUMBER
+
+
+# Hands out fee invoice numbers in blocks of INVOICE_BLOCK_SIZE.
+# Postgres: a sequence stepping by the block size; a block lives for the whole process.
+# SQLite: a counter row bumped inside the writing transaction; SQLite has one writer at a
+# time, so the unused tail of the block is handed back just before commit and a rollback
+# undoes the reservation together with the fees that used it.
+class InvoiceNumberAllocator:
+    def __init__(self, block_size=INVOICE_BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    # forget the current block, e.g. in a freshly forked worker
+    def reset(self):
+        self._next = 0
+        self._end = 0
+        self._sequence_ready = False
+
+    def next_number(self, connection):
+        if connection.dialect.name == 'postgresql':
+            return self._next_from_sequence(connection)
+        return self._next_from_counter(connection)
+
+    def _next_from_sequence(self, connection):
+        with self._lock:
+            if self._next >= self._end:
+                if not self._sequence_ready:
+                    connection.execute(text(
+                        f'CREATE SEQUENCE IF NOT EXISTS {INVOICE_SEQUENCE} '
+                        f'INCREMENT BY {self.block_size} START WITH {_initial_value(connection)}'
+                    ))
+                    self._sequence_ready = True
+                start = connection.execute(text(f"SELECT nextval('{INVOICE_SEQUENCE}')")).scalar()
+                self._next, self._end = start, start + self.block_size
+            number = self._next
+            self._next += 1
+            return number
+
+    def _next_from_counter(self, connection):
+        block = connection.info.get(_SQLITE_BLOCK_KEY)
+        if block is None or block[0] >= block[1]:
+            block = self._reserve_counter_block(connection)
+        number = block[0]
+        connection.info[_SQLITE_BLOCK_KEY] = (number + 1, block[1])
+        return number
+
+    def _reserve_counter_block(self, connection):
+        result = connection.execute(
+            text('UPDATE invoice_counters SET next_value = next_value + :block WHERE name = :name'),
+            {'block': self.block_size, 'name': INVOICE_COUNTER},
+        )
+        if result.rowcount == 0:
+            start = _initial_value(connection)
+            connection.execute(
+                text('INSERT INTO invoice_counters (name, next_value) VALUES (:name, :next_value)'),
+                {'name': INVOICE_COUNTER, 'next_value': start + self.block_size},
+            )
+            return start, start + self.block_size
+        end = connection.execute(
+            text('SELECT next_value FROM invoice_counters WHERE name = :name'),
+            {'name': INVOICE_COUNTER},
+        ).scalar()
+        return end - self.block_size, end
+
+
+invoice_allocator = InvoiceNumberAllocator()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=invoice_allocator.reset)
+
+
+# SQLite blocks only live as long as the transaction that reserved them
+@event.listens_for(Engine, 'commit')
+def release_sqlite_invoice_block(connection):
+    block = connection.info.pop(_SQLITE_BLOCK_KEY, None)
+    if block is not None and block[0] < block[1]:
+        connection.execute(
+            text('UPDATE invoice_counters SET next_value = :next_value WHERE name = :name AND next_value = :end'),
+            {'next_value': block[0], 'name': INVOICE_COUNTER, 'end': block[1]},
+        )
+
+
+@event.listens_for(Engine, 'rollback')
+def drop_sqlite_invoice_block(connection):
+    connection.info.pop(_SQLITE_BLOCK_KEY, None)
@@ -0,0 +1,78 @@
+import os
+from models import db
+from exports import EXPORT_SOURCES, EXPORT_FORMATS, export_filters, generate_export, export_filename
+from receipts import RECEIPT_FORMATS, select_receipts, write_receipts
+from rollups import rebuild_rollups
+from enrollment import reconcile_enrollment
+from trainee_import import import_trainees
+
+
+# rejected rows kept in an import job's result
+IMPORT_ERRORS_KEPT = 200
+
+
+# Every saved chunk records the last row it holds in the job, in the chunk's own
+# transaction, so a retry or a requeued stale job resumes after it
+def run_import_trainees(job, path, filename, resume_after_row=0, imported=0):
+    def checkpoint(last_row, saved):
+        job.checkpoint(resume_after_row=last_row, imported=saved)
+
+    with open(path, 'rb') as trainees_file:
+        report = import_trainees(trainees_file, filename, on_progress=job.progress, checkpoint=checkpoint,
+                                 resume_after_row=resume_after_row, imported=imported)
+    os.remove(path)
+    return {'imported': report['imported'], 'rejected': len(report['errors']),
+            'errors': report['errors'][:IMPORT_ERRORS_KEPT]}
+
+
+def run_export(job, entity, export_format='csv', compress=False, **filters):
+    if entity not in EXPORT_SOURCES or export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Cannot export {entity} as {export_format}')
+    filename = export_filename(entity, export_format, compress)
+    chunks = generate_export(entity, export_format, compress, **export_filters(filters))
+    with open(job.output_path(filename), 'wb' if compress else 'w', newline=None if compress else '') as output:
+        for chunk in chunks:
+            output.write(chunk)
+    return {'filename': filename}
+
+
+def run_batch_receipts(job, output_format='pdf', workers=None, **filters):
+    if output_format not in RECEIPT_FORMATS:
+        raise ValueError(f'Unknown receipt format {output_format}')
+    receipts = select_receipts(**export_filters(filters))
+    filename = f'receipts.{output_format}'
+    if not receipts:
+        return {'count': 0, 'filename': None}
+    progress = {'done': 0}
+    job.progress(0, len(receipts))
+    # the render processes are forked from here; give back the database connection first
+    db.session.remove()
+
+    def on_progress(count):
+        progress['done'] += count
+        job.progress(progress['done'])
+
+    failed = write_receipts(receipts, output_format, job.output_path(filename), workers=workers,
+                            on_progress=on_progress)
+    return {'count': len(receipts) - len(failed), 'filename': filename, 'failed': failed}
+
+
+def run_rebuild_rollups(job):
+    return {'groups': rebuild_rollups()}
+
+
+def run_reconcile_enrollment(job):
+    drifted = reconcile_enrollment()
+    return {'corrected': {course: {'stored': stored, 'actual': actual}
+                          for course, (stored, actual) in drifted.items()}}
+
+
+# Job kind -> handler(job, **payload) returning a JSON-able result;
+# job is a jobs.JobContext for progress reports and output files
+JOB_HANDLERS = {
+    'import_trainees': run_import_trainees,
+    'export': run_export,
+    'batch_receipts': run_batch_receipts,
+    'rebuild_rollups': run_rebuild_rollups,
+    'reconcile_enrollment': run_reconcile_enrollment,
+}
@@ -0,0 +1,68 @@
+import json
+import os
+from flask import request, jsonify, url_for, current_app, send_from_directory, abort
+from models import Job
+from decorators import login_is_required
+from jobs import enqueue, job_status, save_job_upload
+from job_handlers import JOB_HANDLERS
+
+
+# Form fields each kind of job accepts, as payload keys
+JOB_PARAMETERS = {
+    'export': ('entity', 'export_format', 'compress', 'start', 'end', 'department', 'course'),
+    'batch_receipts': ('output_format', 'start', 'end', 'department', 'course'),
+    'rebuild_rollups': (),
+    'reconcile_enrollment': (),
+}
+
+
+def _job_payload(kind, form, files):
+    if kind == 'import_trainees':
+        trainees_file = files.get('trainees_file')
+        if not trainees_file or not trainees_file.filename:
+            raise ValueError('trainees_file is required')
+        return {'path': save_job_upload(current_app.config['JOB_OUTPUT_FOLDER'], trainees_file),
+                'filename': trainees_file.filename}
+    payload = {name: form.get(name) for name in JOB_PARAMETERS[kind] if form.get(name)}
+    if 'compress' in payload:
+        payload['compress'] = payload['compress'] == '1'
+    return payload
+
+
+def job_json(job):
+    status = job_status(job)
+    status['status_url'] = url_for('job_detail', job_id=job.id)
+    if status['result'] and status['result'].get('filename'):
+        status['download_url'] = url_for('job_download', job_id=job.id)
+    return status
+
+
+# Queue a job; answers 202 with the job id and where to poll it
+@login_is_required
+def create_job(kind):
+    if kind not in JOB_HANDLERS:
+        return jsonify({'error': f'Unknown job {kind}'}), 404
+    try:
+        payload = _job_payload(kind, request.form, request.files)
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    job_id = enqueue(kind, payload)
+    return jsonify({'id': job_id, 'status_url': url_for('job_detail', job_id=job_id)}), 202
+
+
+@login_is_required
+def job_detail(job_id):
+    job = Job.query.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    return jsonify(job_json(job))
+
+
+@login_is_required
+def job_download(job_id):
+    job = Job.query.get(job_id)
+    result = json.loads(job.result) if job is not None and job.result else {}
+    if job is None or job.status != 'succeeded' or not result.get('filename'):
+        abort(404)
+    folder = os.path.join(os.path.abspath(current_app.config['JOB_OUTPUT_FOLDER']), str(job.id))
+    return send_from_directory(folder, result['filename'], as_attachment=True)
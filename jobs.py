@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import and_, select
+from sqlalchemy.exc import OperationalError
+from models import db, Job
+from job_handlers import JOB_HANDLERS
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+# seconds to wait for new jobs when the queue is empty
+DEFAULT_POLL_INTERVAL = 2
+# a running job whose worker has not reported for this long is handed out again
+DEFAULT_STALE_AFTER = 600
+# first retry after this many seconds, doubling on every further attempt
+RETRY_BACKOFF = 30
+# seconds between "still running" marks while a job runs
+HEARTBEAT_INTERVAL = 30
+
+
+# Add a job to the queue and return its id
+def enqueue(kind, payload=None, max_attempts=DEFAULT_MAX_ATTEMPTS, run_after=None):
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind {kind}')
+    now = datetime.utcnow()
+    job = Job(kind=kind, status='queued', payload=json.dumps(payload or {}), max_attempts=max_attempts,
+              run_after=run_after or now, created_at=now)
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+# Keep an uploaded file where a worker (possibly another process) can read it
+def save_job_upload(output_folder, file_storage):
+    folder = os.path.join(output_folder, 'uploads')
+    os.makedirs(folder, exist_ok=True)
+    extension = os.path.splitext(file_storage.filename)[1].lower()
+    path = os.path.join(folder, f'{uuid.uuid4().hex}{extension}')
+    file_storage.save(path)
+    return path
+
+
+# What the status endpoint reports about a job
+def job_status(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+# Handed to the handler: progress reports go straight to the jobs table on their
+# own connection, so pollers see them while the handler's transaction is open
+class JobContext:
+    def __init__(self, job_id, output_folder):
+        self.job_id = job_id
+        self.output_folder = output_folder
+
+    # best effort: a locked SQLite database must not fail the job itself
+    def progress(self, done, total=None):
+        values = {'progress': done, 'heartbeat_at': datetime.utcnow()}
+        if total is not None:
+            values['total'] = total
+        try:
+            _update_job(db.engine, self.job_id, **values)
+        except OperationalError:
+            logger.warning('Could not record progress of job %s', self.job_id)
+
+    # Merge values into the job's payload inside the handler's open transaction, so
+    # they commit together with the work they describe; a rerun gets them as arguments
+    def checkpoint(self, **values):
+        table = Job.__table__
+        connection = db.session.connection()
+        payload = connection.execute(select([table.c.payload]).where(table.c.id == self.job_id)).scalar()
+        payload = dict(json.loads(payload or '{}'), **values)
+        connection.execute(table.update().where(table.c.id == self.job_id).values(payload=json.dumps(payload)))
+
+    # Path for a file the job produces; the download endpoint serves it by name
+    def output_path(self, filename):
+        folder = os.path.join(self.output_folder, str(self.job_id))
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, filename)
+
+
+def _update_job(engine, job_id, **values):
+    table = Job.__table__
+    with engine.begin() as connection:
+        connection.execute(table.update().where(table.c.id == job_id).values(**values))
+
+
+# Put jobs whose worker died mid-run back in the queue
+def requeue_stale_jobs(stale_after=DEFAULT_STALE_AFTER):
+    table = Job.__table__
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+    with db.engine.begin() as connection:
+        return connection.execute(
+            table.update()
+            .where(and_(table.c.status == 'running', table.c.heartbeat_at < cutoff))
+            .values(status='queued', worker=None)
+        ).rowcount
+
+
+# Take the oldest due job. The conditional UPDATE only succeeds for one
+# worker, so several threads and processes can poll the same table.
+def claim_job(worker_name):
+    table = Job.__table__
+    while True:
+        now = datetime.utcnow()
+        with db.engine.begin() as connection:
+            job_id = connection.execute(
+                select([table.c.id])
+                .where(and_(table.c.status == 'queued', table.c.run_after <= now))
+                .order_by(table.c.run_after, table.c.id)
+                .limit(1)
+            ).scalar()
+            if job_id is None:
+                return None
+            claimed = connection.execute(
+                table.update()
+                .where(and_(table.c.id == job_id, table.c.status == 'queued'))
+                .values(status='running', worker=worker_name, attempts=table.c.attempts + 1,
+                        started_at=now, heartbeat_at=now, error=None)
+            ).rowcount
+        if claimed:
+            return job_id
+
+
+# Run one claimed job and record its outcome; failures are retried with backoff
+def run_job(job_id, output_folder):
+    job = Job.query.get(job_id)
+    kind, attempts, max_attempts = job.kind, job.attempts, job.max_attempts
+    payload = json.loads(job.payload or '{}')
+    db.session.commit()
+
+    # keep heartbeat_at fresh so the job is not taken for stale while it runs
+    engine = db.engine
+    running = threading.Event()
+
+    def heartbeat():
+        while not running.wait(HEARTBEAT_INTERVAL):
+            try:
+                _update_job(engine, job_id, heartbeat_at=datetime.utcnow())
+            except OperationalError:
+                pass
+
+    threading.Thread(target=heartbeat, name=f'job-{job_id}-heartbeat', daemon=True).start()
+    try:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f'No handler for job kind {kind}')
+        handler = JOB_HANDLERS[kind]
+        result = handler(JobContext(job_id, output_folder), **payload)
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc()
+        logger.warning('Job %s (%s) failed on attempt %d/%d', job_id, kind, attempts, max_attempts)
+        if attempts < max_attempts:
+            retry_at = datetime.utcnow() + timedelta(seconds=RETRY_BACKOFF * 2 ** (attempts - 1))
+            _update_job(db.engine, job_id, status='queued', run_after=retry_at, worker=None, error=error)
+        else:
+            _update_job(db.engine, job_id, status='failed', finished_at=datetime.utcnow(), error=error)
+        return False
+    finally:
+        running.set()
+        db.session.remove()
+
+    _update_job(db.engine, job_id, status='succeeded', finished_at=datetime.utcnow(), result=json.dumps(result))
+    return True
+
+
+# Threads polling the jobs table, either inside a web worker or under `flask worker`
+class JobWorker:
+    def __init__(self, app, threads=1, poll_interval=DEFAULT_POLL_INTERVAL, stale_after=DEFAULT_STALE_AFTER):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.output_folder = app.config['JOB_OUTPUT_FOLDER']
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self._stop = threading.Event()
+        self._threads = []
+
+    # Claim and run jobs until the queue is empty; returns how many ran
+    def run_pending(self, thread_name=None):
+        ran = 0
+        with self.app.app_context():
+            requeue_stale_jobs(self.stale_after)
+            while not self._stop.is_set():
+                job_id = claim_job(thread_name or self.name)
+                if job_id is None:
+                    break
+                run_job(job_id, self.output_folder)
+                ran += 1
+        return ran
+
+    def _loop(self, thread_name):
+        while not self._stop.is_set():
+            try:
+                ran = self.run_pending(thread_name)
+            except Exception:
+                logger.exception('Job worker %s crashed while polling', thread_name)
+                ran = 0
+            if not ran:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        for number in range(self.threads):
+            thread = threading.Thread(target=self._loop, args=(f'{self.name}/{number}',),
+                                      name=f'job-worker-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    # Block in the foreground until interrupted
+    def run_forever(self):
+        self.start()
+        try:
+            while any(thread.is_alive() for thread in self._threads):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            self.stop()
+
+
+# Start JOB_WORKER_THREADS worker threads in this process on its first request,
+# i.e. after gunicorn has forked it
+def init_job_worker(app):
+    threads = app.config.get('JOB_WORKER_THREADS', 0)
+    if not threads:
+        return
+
+    @app.before_first_request
+    def start_job_worker():
+        app.extensions['job_worker'] = worker = JobWorker(app, threads=threads)
+        worker.start()
@@ -1,14 +1,99 @@
-from sqlalchemy import event
-from models import db, Fee
+from sqlalchemy import event, inspect
+from models import db, Fee, InventoryItem, Trainee
+from rollups import fee_contribution, item_contribution, apply_contribution
+from invoice_numbers import invoice_allocator
+from enrollment import adjust_enrollment
 
 
-# setting default starting value for fee.invoice_number and incrementing it by 1
+# giving every new fee the next invoice number from the reserved block
 @event.listens_for(Fee, 'before_insert')
 def generate_invoice_number(mapper, connection, target):
     if not target.invoice_number:
-        last_invoice = (
-            db.session.query(Fee)
-            .order_by(Fee.id.desc())
-            .first()
-        )
-        target.invoice_number = last_invoice.invoice_number + 1 if last_invoice else 45778
\ No newline at end of file
+        target.invoice_number = invoice_allocator.next_number(connection)
+
+
+# value an attribute had before the pending flush
+def _previous_value(target, name):
+    history = inspect(target).attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, name)
+
+
+# whether a flush changed any of the attributes a rollup depends on
+def _changed(target, names):
+    state = inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+
+FEE_ROLLUP_FIELDS = ('payment_date', 'department', 'course', 'amount')
+ITEM_ROLLUP_FIELDS = ('purchase_date', 'department_for', 'course_for', 'price')
+
+
+def _fee_contribution(target, previous=False):
+    value = _previous_value if previous else getattr
+    return fee_contribution(value(target, 'payment_date'), value(target, 'department'),
+                            value(target, 'course'), value(target, 'amount'))
+
+
+def _item_contribution(target, previous=False):
+    value = _previous_value if previous else getattr
+    return item_contribution(value(target, 'purchase_date'), value(target, 'department_for'),
+                             value(target, 'course_for'), value(target, 'price'))
+
+
+# keep monthly_finance_rollup in step with fees
+@event.listens_for(Fee, 'after_insert')
+def add_fee_to_rollup(mapper, connection, target):
+    apply_contribution(connection, _fee_contribution(target))
+
+
+@event.listens_for(Fee, 'after_update')
+def move_fee_in_rollup(mapper, connection, target):
+    if not _changed(target, FEE_ROLLUP_FIELDS):
+        return
+    apply_contribution(connection, _fee_contribution(target, previous=True), sign=-1)
+    apply_contribution(connection, _fee_contribution(target))
+
+
+@event.listens_for(Fee, 'after_delete')
+def remove_fee_from_rollup(mapper, connection, target):
+    apply_contribution(connection, _fee_contribution(target), sign=-1)
+
+
+# keep monthly_finance_rollup in step with inventory_items
+@event.listens_for(InventoryItem, 'after_insert')
+def add_item_to_rollup(mapper, connection, target):
+    apply_contribution(connection, _item_contribution(target))
+
+
+@event.listens_for(InventoryItem, 'after_update')
+def move_item_in_rollup(mapper, connection, target):
+    if not _changed(target, ITEM_ROLLUP_FIELDS):
+        return
+    apply_contribution(connection, _item_contribution(target, previous=True), sign=-1)
+    apply_contribution(connection, _item_contribution(target))
+
+
+@event.listens_for(InventoryItem, 'after_delete')
+def remove_item_from_rollup(mapper, connection, target):
+    apply_contribution(connection, _item_contribution(target), sign=-1)
+
+
+# keep courses.students_enrolled in step with trainees
+@event.listens_for(Trainee, 'after_insert')
+def count_new_trainee(mapper, connection, target):
+    adjust_enrollment(connection, target.course_id, 1)
+
+
+@event.listens_for(Trainee, 'after_update')
+def move_trainee_enrollment(mapper, connection, target):
+    if not _changed(target, ('course_id',)):
+        return
+    adjust_enrollment(connection, _previous_value(target, 'course_id'), -1)
+    adjust_enrollment(connection, target.course_id, 1)
+
+
+@event.listens_for(Trainee, 'after_delete')
+def uncount_deleted_trainee(mapper, connection, target):
+    adjust_enrollment(connection, target.course_id, -1)
@@ -0,0 +1,104 @@
+from sqlalchemy import text
+from models import db, User, Trainee, InventoryItem, Fee, Event
+from helpers import month_bounds
+from rollups import rebuild_rollups
+from trainee_search import create_trainee_search_index
+from relations import normalize_foreign_keys
+from timestamps import add_row_timestamps
+from site_search import create_site_search_index
+
+
+# Ordered schema changes for databases created before the matching model change.
+# New databases get the same schema from db.create_all(), so every statement must be idempotent.
+# A step is either an SQL string or a callable for data backfills.
+MIGRATIONS = [
+    ('0001_hot_filter_indexes', [
+        'CREATE INDEX IF NOT EXISTS ix_trainees_registration_date ON trainees (registration_date)',
+        'CREATE INDEX IF NOT EXISTS ix_trainees_course ON trainees (course)',
+        'CREATE INDEX IF NOT EXISTS ix_fees_payment_date ON fees (payment_date)',
+        'CREATE INDEX IF NOT EXISTS ix_fees_trainee_id ON fees (trainee_id)',
+        'CREATE INDEX IF NOT EXISTS ix_inventory_items_purchase_date ON inventory_items (purchase_date)',
+        'CREATE INDEX IF NOT EXISTS ix_events_event_date ON events (event_date)',
+        'CREATE INDEX IF NOT EXISTS ix_users_email ON users (email)',
+    ]),
+    ('0002_monthly_finance_rollup', [
+        rebuild_rollups,
+    ]),
+    ('0003_trainee_search_index', [
+        create_trainee_search_index,
+    ]),
+    ('0004_integer_foreign_keys', [
+        normalize_foreign_keys,
+    ]),
+    ('0005_row_timestamps', [
+        add_row_timestamps,
+    ]),
+    ('0006_site_search', [
+        create_site_search_index,
+    ]),
+]
+
+
+# Names of the migrations already recorded in the database
+def applied_migrations():
+    db.session.execute(text('CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR(255) PRIMARY KEY)'))
+    return {row[0] for row in db.session.execute(text('SELECT name FROM schema_migrations'))}
+
+
+# Apply every pending migration, each one in its own transaction
+def run_migrations():
+    done = applied_migrations()
+    db.session.commit()
+
+    newly_applied = []
+    for name, statements in MIGRATIONS:
+        if name in done:
+            continue
+        for statement in statements:
+            if callable(statement):
+                statement()
+            else:
+                db.session.execute(text(statement))
+        db.session.execute(text('INSERT INTO schema_migrations (name) VALUES (:name)'), {'name': name})
+        db.session.commit()
+        newly_applied.append(name)
+    return newly_applied
+
+
+# The filters the dashboard and list pages run most often
+def hot_queries():
+    last_month_start, current_month_start, next_month_start = month_bounds()
+    return {
+        'new trainees this month': (
+            db.session.query(Trainee.id)
+            .filter(Trainee.registration_date >= current_month_start, Trainee.registration_date < next_month_start)
+        ),
+        'fees this month': (
+            db.session.query(Fee.id)
+            .filter(Fee.payment_date >= current_month_start, Fee.payment_date < next_month_start)
+        ),
+        'expenses this month': (
+            db.session.query(InventoryItem.id)
+            .filter(InventoryItem.purchase_date >= current_month_start, InventoryItem.purchase_date < next_month_start)
+        ),
+        'events this month': (
+            db.session.query(Event.id)
+            .filter(Event.event_date >= current_month_start, Event.event_date < next_month_start)
+        ),
+        'fees of a trainee': db.session.query(Fee.id).filter(Fee.trainee_id == 1),
+        'trainees of a course': db.session.query(Trainee.id).filter(Trainee.course_id == 1),
+        'user by email': db.session.query(User.id).filter(User.email == ''),
+    }
+
+
+# Return the database query plan for an ORM query as a list of lines
+def explain_query(query):
+    connection = db.session.connection()
+    compiled = query.statement.compile(dialect=connection.dialect)
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.dialect.name == 'sqlite' else 'EXPLAIN '
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    rows = connection.execute(prefix + str(compiled), params)
+    return [' '.join(str(value) for value in row) for row in rows]
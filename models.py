@@ -13,18 +13,25 @@ from functools import wraps
 db = SQLAlchemy()
 
 
+# When a row was added and last changed, kept up to date by SQLAlchemy on every
+# ORM or Core write; raw SQL UPDATEs have to set updated_at themselves
+class TimestampMixin:
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+
 ## User Table
-class User(db.Model, UserMixin):
+class User(TimestampMixin, db.Model, UserMixin):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(250), nullable=False)
     last_name = db.Column(db.String(250), nullable=False)
-    email = db.Column(db.String(250), nullable=False)
+    email = db.Column(db.String(250), nullable=False, index=True)
     password = db.Column(db.String(250), nullable=False)
     avatar_location = db.Column(db.String(250))
 
 
-class Facilitator(db.Model):
+class Facilitator(TimestampMixin, db.Model):
     __tablename__ = 'facilitators'
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(250), nullable=False)
@@ -37,21 +44,25 @@ class Facilitator(db.Model):
     department = db.Column(db.String(250), nullable=False)
 
 
-class Trainee(db.Model):
+class Trainee(TimestampMixin, db.Model):
     __tablename__ = 'trainees'
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(250), nullable=False)
     last_name = db.Column(db.String(250), nullable=False)
     email = db.Column(db.String(250), nullable=False)
-    registration_date = db.Column(db.Date, nullable=False)
+    registration_date = db.Column(db.Date, nullable=False, index=True)
     department = db.Column(db.String(250), nullable=False)
     gender = db.Column(db.String(250), nullable=False)
     mobile_number = db.Column(db.String(255))
-    course = db.Column(db.String(250), nullable=False)
+    course = db.Column(db.String(250), nullable=False, index=True)
     address = db.Column(db.String(250))
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='SET NULL'), index=True)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id', ondelete='SET NULL'), index=True)
+    course_ref = db.relationship('Course', foreign_keys=[course_id])
+    department_ref = db.relationship('Department', foreign_keys=[department_id])
 
 
-class Course(db.Model):
+class Course(TimestampMixin, db.Model):
     __tablename__ = 'courses'
     id = db.Column(db.Integer, primary_key=True)
     course_name = db.Column(db.String(250), nullable=False, unique=True)
@@ -62,30 +73,36 @@ class Course(db.Model):
     facilitator_name = db.Column(db.String(250), nullable=False)
     students_enrolled = db.Column(db.Integer)
     image_name = db.Column(db.String(255))
+    facilitator_id = db.Column(db.Integer, db.ForeignKey('facilitators.id', ondelete='SET NULL'), index=True)
+    facilitator_ref = db.relationship('Facilitator', foreign_keys=[facilitator_id])
 
 
-class InventoryItem(db.Model):
+class InventoryItem(TimestampMixin, db.Model):
     __tablename__ = 'inventory_items'
     id = db.Column(db.Integer, primary_key=True)
     item_name = db.Column(db.String(250), nullable=False)
     course_for = db.Column(db.String(250), nullable=False)
     department_for = db.Column(db.String(250), nullable=False)
     price = db.Column(db.Integer, nullable=False)
-    purchase_date = db.Column(db.Date, nullable=False)
+    purchase_date = db.Column(db.Date, nullable=False, index=True)
     status = db.Column(db.String(250), nullable=False)
     item_details = db.Column(db.Text, nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='SET NULL'), index=True)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id', ondelete='SET NULL'), index=True)
+    course_ref = db.relationship('Course', foreign_keys=[course_id])
+    department_ref = db.relationship('Department', foreign_keys=[department_id])
 
 
-class Department(db.Model):
+class Department(TimestampMixin, db.Model):
     __tablename__ = 'departments'
     id = db.Column(db.Integer, primary_key=True)
-    department_name = db.Column(db.String(250), nullable=False)
+    department_name = db.Column(db.String(250), nullable=False, index=True)
     department_head = db.Column(db.String(250))
     mobile_number = db.Column(db.String(255))
     email = db.Column(db.String(250))
 
 
-class Staff(db.Model):
+class Staff(TimestampMixin, db.Model):
     __tablename__ = 'staffs'
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(250), nullable=False)
@@ -99,22 +116,72 @@ class Staff(db.Model):
     address = db.Column(db.String(250))
 
 
-class Fee(db.Model):
+class Fee(TimestampMixin, db.Model):
     __tablename__ = 'fees'
     id = db.Column(db.Integer, primary_key=True)
     trainee_name = db.Column(db.String(255))
-    trainee_id = db.Column(db.String(255))
+    trainee_id = db.Column(db.Integer, db.ForeignKey('trainees.id', ondelete='SET NULL'), index=True)
     invoice_number = db.Column(db.Integer, unique=True)
     department = db.Column(db.String(255))
     course = db.Column(db.String(255))
     payment_type = db.Column(db.String(255))
     payment_status = db.Column(db.String(255))
-    payment_date = db.Column(db.Date)
+    payment_date = db.Column(db.Date, index=True)
     amount = db.Column(db.Integer)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='SET NULL'), index=True)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id', ondelete='SET NULL'), index=True)
+    trainee = db.relationship('Trainee', foreign_keys=[trainee_id])
+    course_ref = db.relationship('Course', foreign_keys=[course_id])
+    department_ref = db.relationship('Department', foreign_keys=[department_id])
 
 
-class Event(db.Model):
+class Event(TimestampMixin, db.Model):
     __tablename__ = 'events'
     id = db.Column(db.Integer, primary_key=True)
     event_name = db.Column(db.String(250))
-    event_date = db.Column(db.Date)
\ No newline at end of file
+    event_date = db.Column(db.Date, index=True)
+
+class MonthlyFinanceRollup(db.Model):
+    __tablename__ = 'monthly_finance_rollup'
+    __table_args__ = (db.UniqueConstraint('year', 'month', 'department', 'course', name='uq_monthly_finance_rollup_key'),)
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    department = db.Column(db.String(255), nullable=False, default='')
+    course = db.Column(db.String(255), nullable=False, default='')
+    income = db.Column(db.BigInteger, nullable=False, default=0)
+    expense = db.Column(db.BigInteger, nullable=False, default=0)
+    fee_count = db.Column(db.Integer, nullable=False, default=0)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class InvoiceCounter(db.Model):
+    __tablename__ = 'invoice_counters'
+    name = db.Column(db.String(50), primary_key=True)
+    next_value = db.Column(db.Integer, nullable=False)
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime)
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (db.Index('ix_jobs_status_run_after', 'status', 'run_after'),)
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    payload = db.Column(db.Text)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    worker = db.Column(db.String(100))
@@ -0,0 +1,290 @@
+from flask import url_for
+from sqlalchemy import func, or_, cast, String
+from sqlalchemy.orm import contains_eager
+from models import db, Facilitator, Trainee, InventoryItem, Staff, Department, Fee, Course
+from relations import related_name
+
+
+# largest page a client may ask for in one request
+MAX_PAGE_LENGTH = 100
+DEFAULT_PAGE_LENGTH = 10
+
+
+def _trainee_row(trainee):
+    return {
+        'id': trainee.id,
+        'name': f"{trainee.first_name} {trainee.last_name}",
+        'first_name': trainee.first_name,
+        'last_name': trainee.last_name,
+        'department': related_name(trainee, 'department_ref', 'department'),
+        'gender': trainee.gender,
+        'course': related_name(trainee, 'course_ref', 'course'),
+        'registration_date': str(trainee.registration_date),
+        'email': trainee.email,
+        'mobile_number': trainee.mobile_number,
+        'edit_url': url_for('edit_trainee', trainee_id=trainee.id),
+        'delete_url': url_for('delete_trainee', trainee_id=trainee.id),
+    }
+
+
+def _fee_row(fee):
+    return {
+        'id': fee.id,
+        'trainee_name': fee.trainee_name,
+        'invoice_number': fee.invoice_number,
+        'course': related_name(fee, 'course_ref', 'course'),
+        'payment_type': fee.payment_type,
+        'payment_date': str(fee.payment_date),
+        'amount': fee.amount,
+        'payment_status': fee.payment_status,
+        'receipt_url': url_for('fees_receipt', fee_id=fee.id),
+        'edit_url': url_for('edit_fee', fee_id=fee.id),
+    }
+
+
+def _staff_row(staff):
+    return {
+        'id': staff.id,
+        'name': f"{staff.first_name} {staff.last_name}",
+        'first_name': staff.first_name,
+        'last_name': staff.last_name,
+        'designation': staff.designation,
+        'mobile_number': staff.mobile_number,
+        'email': staff.email,
+        'gender': staff.gender,
+        'department': staff.department,
+        'edit_url': url_for('edit_staff', staff_id=staff.id),
+        'delete_url': url_for('delete_staff', staff_id=staff.id),
+    }
+
+
+def _inventory_row(item):
+    return {
+        'id': item.id,
+        'item_name': item.item_name,
+        'department_for': related_name(item, 'department_ref', 'department_for'),
+        'course_for': related_name(item, 'course_ref', 'course_for'),
+        'purchase_date': str(item.purchase_date),
+        'price': item.price,
+        'status': item.status,
+        'edit_url': url_for('edit_inventory_item', item_id=item.id),
+        'delete_url': url_for('delete_inventory_item', item_id=item.id),
+    }
+
+
+def _facilitator_row(facilitator):
+    return {
+        'id': facilitator.id,
+        'name': f"{facilitator.first_name} {facilitator.last_name}",
+        'first_name': facilitator.first_name,
+        'last_name': facilitator.last_name,
+        'department': facilitator.department,
+        'gender': facilitator.gender,
+        'mobile_number': facilitator.mobile_number,
+        'email': facilitator.email,
+        'joining_date': str(facilitator.joining_date),
+        'edit_url': url_for('edit_facilitator', facilitator_id=facilitator.id),
+        'delete_url': url_for('delete_facilitator', facilitator_id=facilitator.id),
+    }
+
+
+def _department_row(department):
+    return {
+        'id': department.id,
+        'department_name': department.department_name,
+        'department_head': department.department_head,
+        'mobile_number': department.mobile_number,
+        'email': department.email,
+        'edit_url': url_for('edit_department', department_id=department.id),
+        'delete_url': url_for('delete_department', department_id=department.id),
+    }
+
+
+# Every list page backed by the JSON list API.
+# "columns" maps a DataTables column name to the table columns it sorts and filters on.
+# "joins" are many-to-one relationships loaded in the same query as the page.
+LIST_SOURCES = {
+    'trainees': {
+        'model': Trainee,
+        'joins': [Trainee.course_ref, Trainee.department_ref],
+        'columns': {
+            'name': [Trainee.first_name, Trainee.last_name],
+            'department': [func.coalesce(Department.department_name, Trainee.department)],
+            'gender': [Trainee.gender],
+            'course': [func.coalesce(Course.course_name, Trainee.course)],
+            'registration_date': [Trainee.registration_date],
+            'email': [Trainee.email],
+        },
+        'row': _trainee_row,
+    },
+    'fees': {
+        'model': Fee,
+        'joins': [Fee.course_ref],
+        'columns': {
+            'trainee_name': [Fee.trainee_name],
+            'invoice_number': [Fee.invoice_number],
+            'course': [func.coalesce(Course.course_name, Fee.course)],
+            'payment_type': [Fee.payment_type],
+            'payment_date': [Fee.payment_date],
+            'amount': [Fee.amount],
+            'payment_status': [Fee.payment_status],
+        },
+        'row': _fee_row,
+    },
+    'staff': {
+        'model': Staff,
+        'columns': {
+            'name': [Staff.first_name, Staff.last_name],
+            'designation': [Staff.designation],
+            'mobile_number': [Staff.mobile_number],
+            'email': [Staff.email],
+            'gender': [Staff.gender],
+            'department': [Staff.department],
+        },
+        'row': _staff_row,
+    },
+    'inventory': {
+        'model': InventoryItem,
+        'joins': [InventoryItem.course_ref, InventoryItem.department_ref],
+        'columns': {
+            'item_name': [InventoryItem.item_name],
+            'department_for': [func.coalesce(Department.department_name, InventoryItem.department_for)],
+            'course_for': [func.coalesce(Course.course_name, InventoryItem.course_for)],
+            'purchase_date': [InventoryItem.purchase_date],
+            'price': [InventoryItem.price],
+            'status': [InventoryItem.status],
+        },
+        'row': _inventory_row,
+    },
+    'facilitators': {
+        'model': Facilitator,
+        'columns': {
+            'name': [Facilitator.first_name, Facilitator.last_name],
+            'department': [Facilitator.department],
+            'gender': [Facilitator.gender],
+            'mobile_number': [Facilitator.mobile_number],
+            'email': [Facilitator.email],
+        },
+        'row': _facilitator_row,
+    },
+    'departments': {
+        'model': Department,
+        'columns': {
+            'department_name': [Department.department_name],
+            'department_head': [Department.department_head],
+            'mobile_number': [Department.mobile_number],
+            'email': [Department.email],
+        },
+        'row': _department_row,
+    },
+}
+
+
+# Models a list reads rows from: its own plus the joined ones
+def list_source_models(entity):
+    source = LIST_SOURCES[entity]
+    return [source['model']] + [relationship.property.mapper.class_ for relationship in source.get('joins', ())]
+
+
+# read an int query arg, falling back to default on junk input
+def _int_arg(request_args, name, default):
+    try:
+        return int(request_args.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Match a search value against a column; numbers and dates are compared as text
+def _like(column, pattern):
+    if not isinstance(column.type, String):
+        column = cast(column, String)
+    return column.ilike(pattern, escape='\\')
+
+
+# Search text as a literal inside a LIKE pattern: "50%" must not match "500"
+def like_literal(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+# Collect the DataTables "columns[i][...]" and "order[i][...]" args
+def _parse_datatables_args(request_args, source):
+    columns = []
+    index = 0
+    while f'columns[{index}][data]' in request_args:
+        columns.append({
+            'data': request_args.get(f'columns[{index}][data]'),
+            'search': request_args.get(f'columns[{index}][search][value]', '').strip(),
+        })
+        index += 1
+
+    order = []
+    index = 0
+    while f'order[{index}][column]' in request_args:
+        column_index = _int_arg(request_args, f'order[{index}][column]', -1)
+        direction = request_args.get(f'order[{index}][dir]', 'asc')
+        if 0 <= column_index < len(columns) and columns[column_index]['data'] in source['columns']:
+            order.append((columns[column_index]['data'], direction == 'desc'))
+        index += 1
+
+    return columns, order
+
+
+# Answer a DataTables server-side processing request for one entity
+def datatables_response(entity, request_args):
+    source = LIST_SOURCES[entity]
+    model = source['model']
+    columns, order = _parse_datatables_args(request_args, source)
+
+    draw = _int_arg(request_args, 'draw', 0)
+    start = max(_int_arg(request_args, 'start', 0), 0)
+    length = _int_arg(request_args, 'length', DEFAULT_PAGE_LENGTH)
+    if length < 1 or length > MAX_PAGE_LENGTH:
+        length = MAX_PAGE_LENGTH
+
+    query = model.query
+    for relationship in source.get('joins', ()):
+        query = query.outerjoin(relationship).options(contains_eager(relationship))
+    filtered = False
+
+    # global search box: substring match on any listed column
+    search_value = request_args.get('search[value]', '').strip()
+    if search_value:
+        pattern = f"%{like_literal(search_value)}%"
+        query = query.filter(or_(*[_like(column, pattern)
+                                   for table_columns in source['columns'].values()
+                                   for column in table_columns]))
+        filtered = True
+
+    # per column filters: prefix match so plain indexes can be used
+    for column in columns:
+        if column['search'] and column['data'] in source['columns']:
+            pattern = f"{like_literal(column['search'])}%"
+            query = query.filter(or_(*[_like(table_column, pattern)
+                                       for table_column in source['columns'][column['data']]]))
+            filtered = True
+
+    records_total = db.session.query(func.count(model.id)).scalar()
+    records_filtered = query.order_by(None).count() if filtered else records_total
+
+    if order:
+        for name, descending in order:
+            for table_column in source['columns'][name]:
+                query = query.order_by(table_column.desc() if descending else table_column.asc())
+        query = query.order_by(model.id.desc()).offset(start)
+    else:
+        # default newest-first order pages by id, so deep pages skip the OFFSET scan
+        after_id = _int_arg(request_args, 'after_id', None)
+        query = query.order_by(model.id.desc())
+        if after_id is not None:
+            query = query.filter(model.id < after_id)
+        else:
+            query = query.offset(start)
+
+    rows = query.limit(length).all()
+
+    return {
+        'draw': draw,
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
+        'data': [source['row'](row) for row in rows],
+    }
@@ -0,0 +1,250 @@
+import base64
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sqlalchemy import func
+from models import db, Fee, Trainee, Course, Department
+from relations import name_filter
+
+
+RECEIPT_FORMATS = ('pdf', 'zip')
+# receipts handed to a worker process at a time
+RECEIPT_CHUNK_SIZE = 100
+RECEIPT_DISCOUNT = 200
+RECEIPT_VAT_RATE = 0.10
+TEMPLATES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+IMAGES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images')
+# DejaVu Sans ships in static/fonts: the core PDF fonts are Latin-1 only and
+# cannot draw names like Ɗanladi Ƙasimu
+FONTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'fonts')
+RECEIPT_FONT = 'DejaVu'
+RECEIPT_FONT_FILES = {'': 'DejaVuSans.ttf', 'B': 'DejaVuSans-Bold.ttf'}
+
+# Who the payment was made to, by payment type
+RECEIPT_PAYEES = {
+    'Cash': {
+        'name': 'Abubakr Umar Cashier',
+        'lines': ['PMB: 28890 Center For Entrepreneurship Development', 'Usman Danfodiyo University Sokoto'],
+    },
+    'Transfer': {
+        'name': 'CED UDUS',
+        'lines': ['Bank: GT Bank', 'Account: 0198608849'],
+    },
+    'Online Payment': {
+        'name': 'Barter Online Payment',
+        'lines': ['Bank: Barter', 'Account: 8878960805'],
+    },
+}
+PAYEE_CONTACT = ['Email: cedudus@udus.com', 'Phone: 08038659891']
+
+
+# Fee, trainee and course columns of a receipt in one query, joined on the foreign keys
+def receipt_query():
+    return (
+        db.session.query(Fee.id, Fee.invoice_number, Fee.trainee_name,
+                         func.coalesce(Department.department_name, Fee.department).label('department'),
+                         func.coalesce(Course.course_name, Fee.course).label('course'),
+                         Fee.payment_type, Fee.payment_status, Fee.payment_date, Fee.amount,
+                         Trainee.address, Trainee.email, Trainee.mobile_number)
+        .outerjoin(Fee.trainee)
+        .outerjoin(Fee.course_ref)
+        .outerjoin(Fee.department_ref)
+    )
+
+
+# Plain dict of everything a receipt shows, safe to send to another process
+def _receipt(row):
+    receipt = row._asdict()
+    amount = receipt['amount'] or 0
+    receipt['payee'] = RECEIPT_PAYEES.get(receipt['payment_type'])
+    receipt['payee_contact'] = PAYEE_CONTACT
+    receipt['subtotal'] = amount + RECEIPT_DISCOUNT
+    receipt['discount'] = RECEIPT_DISCOUNT
+    receipt['vat'] = amount * RECEIPT_VAT_RATE
+    receipt['total'] = amount
+    return receipt
+
+
+def receipt_for(fee_id):
+    row = receipt_query().filter(Fee.id == fee_id).first()
+    return _receipt(row) if row else None
+
+
+# Receipts of every fee paid in [start, end], optionally for one department / course
+def select_receipts(start=None, end=None, department=None, course=None):
+    query = receipt_query()
+    if start is not None:
+        query = query.filter(Fee.payment_date >= start)
+    if end is not None:
+        query = query.filter(Fee.payment_date <= end)
+    if department:
+        query = query.filter(name_filter(Fee.department_id, Fee.department, 'departments', department))
+    if course:
+        query = query.filter(name_filter(Fee.course_id, Fee.course, 'courses', course))
+    return [_receipt(row) for row in query.order_by(Fee.payment_date, Fee.id)]
+
+
+def receipt_label(receipt):
+    return str(receipt['invoice_number'] or receipt['id'])
+
+
+def receipt_filename(receipt, extension):
+    return f"receipt-{receipt_label(receipt)}.{extension}"
+
+
+# How a receipt that could not be rendered is reported
+def _failure(error):
+    return f'{type(error).__name__}: {error}'
+
+
+def _image_data_uri(name):
+    with open(os.path.join(IMAGES_FOLDER, name), 'rb') as image:
+        return 'data:image/png;base64,' + base64.b64encode(image.read()).decode('ascii')
+
+
+# Standalone HTML receipts with the images inlined, so they open offline
+def _render_html_chunk(receipts):
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+    environment = Environment(loader=FileSystemLoader(TEMPLATES_FOLDER), autoescape=select_autoescape(['html']))
+    template = environment.get_template('receipt-document.html')
+    images = {'logo': _image_data_uri('logo.png'), 'paid': _image_data_uri('paid-large.png')}
+    files, failed = [], {}
+    for receipt in receipts:
+        try:
+            files.append((receipt_filename(receipt, 'html'),
+                          template.render(receipt=receipt, images=images).encode('utf-8')))
+        except Exception as error:
+            failed[receipt_label(receipt)] = _failure(error)
+    return files, failed
+
+
+def _money(value):
+    return f'NGN {value:,.2f}'
+
+
+def _draw_receipt(pdf, receipt):
+    pdf.add_page()
+    pdf.image(os.path.join(IMAGES_FOLDER, 'paid-large.png'), x=130, y=20, w=60)
+    pdf.image(os.path.join(IMAGES_FOLDER, 'logo.png'), x=15, y=15, w=18)
+    pdf.set_font(RECEIPT_FONT, 'B', 16)
+    pdf.set_xy(38, 18)
+    pdf.cell(0, 8, 'Receipt')
+    pdf.set_font(RECEIPT_FONT, '', 10)
+    pdf.set_xy(38, 26)
+    pdf.cell(0, 6, f"Status: {receipt['payment_status'] or ''}")
+
+    pdf.set_xy(15, 45)
+    pdf.set_font(RECEIPT_FONT, 'B', 11)
+    pdf.cell(90, 6, 'From:', new_x='LEFT', new_y='NEXT')
+    pdf.set_font(RECEIPT_FONT, '', 10)
+    for line in (receipt['trainee_name'], receipt['address'], f"Email: {receipt['email'] or ''}",
+                 f"Phone: {receipt['mobile_number'] or ''}"):
+        pdf.cell(90, 6, str(line or ''), new_x='LEFT', new_y='NEXT')
+
+    if receipt['payee']:
+        pdf.set_xy(110, 45)
+        pdf.set_font(RECEIPT_FONT, 'B', 11)
+        pdf.cell(85, 6, 'To:', align='R', new_x='LEFT', new_y='NEXT')
+        pdf.set_font(RECEIPT_FONT, '', 10)
+        for line in [receipt['payee']['name']] + receipt['payee']['lines'] + receipt['payee_contact']:
+            pdf.cell(85, 6, line, align='R', new_x='LEFT', new_y='NEXT')
+
+    pdf.set_xy(15, 100)
+    pdf.set_font(RECEIPT_FONT, 'B', 10)
+    widths = (35, 55, 35, 25, 30)
+    for width, heading in zip(widths, ('Payment Type', 'Course', 'Invoice number', 'Date', 'Amount')):
+        pdf.cell(width, 8, heading, border='B')
+    pdf.ln()
+    pdf.set_font(RECEIPT_FONT, '', 10)
+    values = (receipt['payment_type'], receipt['course'], f"#{receipt['invoice_number'] or ''}",
+              str(receipt['payment_date'] or ''), _money(receipt['total']))
+    for width, value in zip(widths, values):
+        pdf.cell(width, 8, str(value or ''))
+    pdf.ln(16)
+
+    for label, value in (('Subtotal', receipt['subtotal']), ('Discount', receipt['discount']),
+                         ('VAT (10%)', receipt['vat']), ('Total', receipt['total'])):
+        pdf.set_x(120)
+        pdf.set_font(RECEIPT_FONT, 'B' if label == 'Total' else '', 10)
+        pdf.cell(35, 7, label)
+        pdf.cell(40, 7, _money(value), align='R', new_x='LMARGIN', new_y='NEXT')
+
+
+def _receipt_pdf():
+    from fpdf import FPDF
+
+    pdf = FPDF(format='A4')
+    pdf.set_auto_page_break(False)
+    for style, filename in RECEIPT_FONT_FILES.items():
+        pdf.add_font(RECEIPT_FONT, style, os.path.join(FONTS_FOLDER, filename))
+    return pdf
+
+
+# One PDF holding a page per receipt, and {label: error} of those that failed.
+# A failed receipt leaves a half drawn page that fpdf cannot take back, so the
+# chunk is drawn again without it.
+def _render_pdf_chunk(receipts):
+    failed = {}
+    while True:
+        pdf = _receipt_pdf()
+        for receipt in receipts:
+            if receipt_label(receipt) in failed:
+                continue
+            try:
+                _draw_receipt(pdf, receipt)
+            except Exception as error:
+                failed[receipt_label(receipt)] = _failure(error)
+                break
+        else:
+            return bytes(pdf.output()), failed
+
+
+# Worker process entry point; returns what the parent writes into the archive
+# and {label: error} of the receipts left out of it
+def render_receipt_chunk(output_format, receipts):
+    if output_format == 'pdf':
+        return _render_pdf_chunk(receipts)
+    return _render_html_chunk(receipts)
+
+
+# Render receipts across a process pool into one PDF or a ZIP of HTML receipts.
+# on_progress(count) is called in the parent with the size of every finished chunk.
+# A receipt that cannot be rendered is left out rather than failing the batch;
+# returns {label: error} of those.
+def write_receipts(receipts, output_format, output_path, workers=None, chunk_size=RECEIPT_CHUNK_SIZE,
+                   on_progress=None):
+    chunks = [receipts[index:index + chunk_size] for index in range(0, len(receipts), chunk_size)]
+    rendered = {}
+    failed = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(render_receipt_chunk, output_format, chunk): number
+                   for number, chunk in enumerate(chunks)}
+        if output_format == 'zip':
+            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for future in as_completed(futures):
+                    files, chunk_failed = future.result()
+                    for filename, data in files:
+                        archive.writestr(filename, data)
+                    failed.update(chunk_failed)
+                    if on_progress:
+                        on_progress(len(chunks[futures[future]]))
+            return failed
+
+        for future in as_completed(futures):
+            rendered[futures[future]], chunk_failed = future.result()
+            failed.update(chunk_failed)
+            if on_progress:
+                on_progress(len(chunks[futures[future]]))
+
+    # pypdf is only needed to stitch the per-chunk PDFs together, in order
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for number in range(len(chunks)):
+        writer.append(io.BytesIO(rendered[number]))
+    with open(output_path, 'wb') as output:
+        writer.write(output)
+    return failed
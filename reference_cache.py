@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+from sqlalchemy import event
+from models import db, Facilitator, Course, Department
+
+
+DEFAULT_REFERENCE_CACHE_TTL = 300
+
+# Reference tables used to fill form dropdowns, by cache name
+REFERENCE_MODELS = {
+    'departments': Department,
+    'courses': Course,
+    'facilitators': Facilitator,
+}
+_NAME_BY_MODEL = {model: name for name, model in REFERENCE_MODELS.items()}
+
+
+# Versions kept in this process only
+class LocalVersionStore:
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        return self._versions.get(name, 0)
+
+    def bump(self, name):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+
+# Versions shared by every worker on the machine through a small sqlite file
+class SqliteVersionStore:
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS cache_versions (name TEXT PRIMARY KEY, version INTEGER)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, name):
+        with self._connect() as connection:
+            row = connection.execute('SELECT version FROM cache_versions WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, name):
+        with self._connect() as connection:
+            connection.execute('INSERT OR IGNORE INTO cache_versions (name, version) VALUES (?, 0)', (name,))
+            connection.execute('UPDATE cache_versions SET version = version + 1 WHERE name = ?', (name,))
+
+
+# Read-only copy of a row, safe to share between requests and sessions
+def _snapshot(instance):
+    return SimpleNamespace(**{column.name: getattr(instance, column.name)
+                              for column in instance.__table__.columns})
+
+
+# Process-local cache of the reference tables.
+# An entry is reused while its version matches the store and it is younger than the TTL.
+class ReferenceDataCache:
+    def __init__(self, ttl=DEFAULT_REFERENCE_CACHE_TTL, store=None):
+        self.ttl = ttl
+        self.store = store or LocalVersionStore()
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get('REFERENCE_CACHE_TTL', self.ttl)
+        version_file = app.config.get('REFERENCE_CACHE_VERSION_FILE')
+        if version_file:
+            self.store = SqliteVersionStore(version_file)
+
+    def get(self, name):
+        version = self.store.get(name)
+        entry = self._entries.get(name)
+        if entry and entry['version'] == version and time.monotonic() - entry['loaded_at'] < self.ttl:
+            self.hits += 1
+            return entry['rows']
+
+        with self._lock:
+            self.misses += 1
+            model = REFERENCE_MODELS[name]
+            rows = [_snapshot(instance) for instance in model.query.order_by(model.id).all()]
+            self._entries[name] = {'version': version, 'loaded_at': time.monotonic(), 'rows': rows}
+        return rows
+
+    def invalidate(self, name):
+        self._entries.pop(name, None)
+        self.store.bump(name)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'entries': {name: {'version': entry['version'], 'rows': len(entry['rows'])}
+                        for name, entry in self._entries.items()},
+        }
+
+
+reference_data = ReferenceDataCache()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reference_data.clear)
+
+
+# remember which reference tables a flush touched ...
+@event.listens_for(db.session, 'after_flush')
+def collect_reference_changes(session, flush_context):
+    changed = session.info.setdefault('changed_reference_data', set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        name = _NAME_BY_MODEL.get(type(instance))
+        if name:
+            changed.add(name)
+
+
+# ... and drop their cached copies once the transaction is committed
+@event.listens_for(db.session, 'after_commit')
+def invalidate_reference_data(session):
+    for name in session.info.pop('changed_reference_data', ()):
+        reference_data.invalidate(name)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_reference_changes(session):
+    session.info.pop('changed_reference_data', None)
@@ -0,0 +1,164 @@
+from sqlalchemy import event, inspect, text, func, Integer
+from models import db, Trainee, Course, InventoryItem, Fee, Department, Facilitator
+from reference_cache import reference_data
+
+
+# Name columns that point at another table, by model:
+# (name attribute, integer foreign key attribute, reference cache it resolves against)
+NAMED_FOREIGN_KEYS = {
+    Trainee: [('course', 'course_id', 'courses'), ('department', 'department_id', 'departments')],
+    Fee: [('course', 'course_id', 'courses'), ('department', 'department_id', 'departments')],
+    InventoryItem: [('course_for', 'course_id', 'courses'), ('department_for', 'department_id', 'departments')],
+    Course: [('facilitator_name', 'facilitator_id', 'facilitators')],
+}
+
+# How a reference row is named in the free-text columns
+REFERENCE_NAMES = {
+    'courses': lambda row: row.course_name,
+    'departments': lambda row: row.department_name,
+    'facilitators': lambda row: f'{row.first_name} {row.last_name}',
+}
+
+# (id column, name expression) used when a name is missing from the cached snapshot
+REFERENCE_LOOKUPS = {
+    'courses': (Course.id, Course.course_name),
+    'departments': (Department.id, Department.department_name),
+    'facilitators': (Facilitator.id, Facilitator.first_name + ' ' + Facilitator.last_name),
+}
+
+
+# name -> id of a reference table, from the cached snapshot (first row wins on duplicates)
+def reference_ids(reference):
+    ids = {}
+    for row in reference_data.get(reference):
+        ids.setdefault(REFERENCE_NAMES[reference](row), row.id)
+    return ids
+
+
+# Filter rows by the name of a related row: an indexed foreign key match when the
+# name is known, otherwise the stored text (rows that were never linked)
+def name_filter(key_column, name_column, reference, name):
+    reference_id = reference_ids(reference).get(name)
+    if reference_id is None:
+        return name_column == name
+    return key_column == reference_id
+
+
+# Display name of a related row, falling back to the stored text for rows that could not be linked
+def related_name(instance, relationship, fallback_attribute):
+    related = getattr(instance, relationship)
+    if related is None:
+        return getattr(instance, fallback_attribute)
+    return REFERENCE_NAMES[related.__tablename__](related)
+
+
+# keep the foreign keys in step with the names the forms submit
+@event.listens_for(db.session, 'before_flush')
+def fill_foreign_keys(session, flush_context, instances):
+    lookups = {}
+    for instance in list(session.new) + list(session.dirty):
+        relations = NAMED_FOREIGN_KEYS.get(type(instance), ())
+        if not relations:
+            continue
+        state = inspect(instance)
+        for name_attribute, key_attribute, reference in relations:
+            if not state.pending and not state.attrs[name_attribute].history.has_changes():
+                continue
+            setattr(instance, key_attribute, _resolve(lookups, reference, getattr(instance, name_attribute)))
+
+
+# id for a name, from the cache; a name added by another worker since the
+# snapshot was taken is looked up directly
+def _resolve(lookups, reference, name):
+    if name is None:
+        return None
+    if reference not in lookups:
+        lookups[reference] = reference_ids(reference)
+    ids = lookups[reference]
+    if name not in ids:
+        id_column, name_expression = REFERENCE_LOOKUPS[reference]
+        ids[name] = db.session.query(func.min(id_column)).filter(name_expression == name).scalar()
+    return ids[name]
+
+
+# (table, foreign key column, referenced table, SQL giving the id for a row's name)
+FOREIGN_KEY_BACKFILLS = [
+    ('trainees', 'course_id', 'courses',
+     'SELECT MIN(id) FROM courses WHERE courses.course_name = trainees.course'),
+    ('trainees', 'department_id', 'departments',
+     'SELECT MIN(id) FROM departments WHERE departments.department_name = trainees.department'),
+    ('fees', 'course_id', 'courses',
+     'SELECT MIN(id) FROM courses WHERE courses.course_name = fees.course'),
+    ('fees', 'department_id', 'departments',
+     'SELECT MIN(id) FROM departments WHERE departments.department_name = fees.department'),
+    ('inventory_items', 'course_id', 'courses',
+     'SELECT MIN(id) FROM courses WHERE courses.course_name = inventory_items.course_for'),
+    ('inventory_items', 'department_id', 'departments',
+     'SELECT MIN(id) FROM departments WHERE departments.department_name = inventory_items.department_for'),
+    ('courses', 'facilitator_id', 'facilitators',
+     "SELECT MIN(id) FROM facilitators "
+     "WHERE facilitators.first_name || ' ' || facilitators.last_name = courses.facilitator_name"),
+]
+
+
+# SQLite cannot change a column type in place: rebuild fees from the model,
+# copying every row and turning numeric trainee ids into integers
+def _rebuild_sqlite_fees(connection):
+    for index in inspect(connection).get_indexes('fees'):
+        connection.execute(text(f'DROP INDEX IF EXISTS {index["name"]}'))
+    connection.execute(text('ALTER TABLE fees RENAME TO fees_old'))
+    Fee.__table__.create(connection)
+    old_columns = {column['name'] for column in inspect(connection).get_columns('fees_old')}
+    columns = [column.name for column in Fee.__table__.columns if column.name in old_columns]
+    values = [
+        "CASE WHEN trainee_id GLOB '[0-9]*' AND trainee_id NOT GLOB '*[^0-9]*' "
+        "THEN CAST(trainee_id AS INTEGER) END" if column == 'trainee_id' else column
+        for column in columns
+    ]
+    connection.execute(text(f'INSERT INTO fees ({", ".join(columns)}) SELECT {", ".join(values)} FROM fees_old'))
+    connection.execute(text('DROP TABLE fees_old'))
+
+
+def _retype_postgres_fee_trainee_id(connection):
+    connection.execute(text(
+        "ALTER TABLE fees ALTER COLUMN trainee_id TYPE INTEGER "
+        "USING (CASE WHEN trainee_id ~ '^[0-9]+$' THEN trainee_id::integer END)"
+    ))
+    # fees of trainees deleted long ago keep their trainee_name but lose the link
+    connection.execute(text(
+        'UPDATE fees SET trainee_id = NULL '
+        'WHERE trainee_id IS NOT NULL AND trainee_id NOT IN (SELECT id FROM trainees)'
+    ))
+    connection.execute(text(
+        'ALTER TABLE fees ADD CONSTRAINT fk_fees_trainee_id '
+        'FOREIGN KEY (trainee_id) REFERENCES trainees (id) ON DELETE SET NULL'
+    ))
+
+
+# Migration step: add the integer foreign keys next to the name columns,
+# link existing rows by name and index the new columns
+def normalize_foreign_keys():
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+
+    trainee_id = next(column for column in inspect(connection).get_columns('fees') if column['name'] == 'trainee_id')
+    if not isinstance(trainee_id['type'], Integer):
+        if dialect == 'sqlite':
+            _rebuild_sqlite_fees(connection)
+        else:
+            _retype_postgres_fee_trainee_id(connection)
+
+    for table, column, referenced, _ in FOREIGN_KEY_BACKFILLS:
+        existing = {found['name'] for found in inspect(connection).get_columns(table)}
+        if column not in existing:
+            connection.execute(text(
+                f'ALTER TABLE {table} ADD COLUMN {column} INTEGER REFERENCES {referenced} (id) ON DELETE SET NULL'
+            ))
+
+    for table, column, _, lookup in FOREIGN_KEY_BACKFILLS:
+        connection.execute(text(f'UPDATE {table} SET {column} = ({lookup}) WHERE {column} IS NULL'))
+        connection.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} ({column})'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_fees_trainee_id ON fees (trainee_id)'))
+    connection.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_departments_department_name ON departments (department_name)'
+    ))
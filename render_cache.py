@@ -0,0 +1,134 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from flask import request, session, Response
+from flask_login import current_user
+from markupsafe import Markup
+from table_versions import current_table_versions
+from assets import build_version
+
+
+# bytes of rendered HTML kept per process; 0 turns the cache off
+DEFAULT_RENDER_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+# LRU of rendered pages and template fragments, bounded by their total size.
+# Keys carry the versions of the tables the output was built from, so a write
+# anywhere makes the old entries unreachable and they age out of the LRU.
+class RenderCache:
+    def __init__(self, max_bytes=DEFAULT_RENDER_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_bytes = app.config.get('RENDER_CACHE_MAX_BYTES', self.max_bytes)
+        app.jinja_env.globals['cache_fragment'] = cache_fragment
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[0]
+            self._entries[key] = (size, value)
+            self._size += size
+            while self._size > self.max_bytes:
+                evicted_size, _ = self._entries.popitem(last=False)[1]
+                self._size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'entries': len(self._entries),
+            'bytes': self._size,
+            'max_bytes': self.max_bytes,
+        }
+
+
+render_cache = RenderCache()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=render_cache.clear)
+
+
+# Versions of the given tables, read once per request however many
+# pages and fragments ask
+def _versions(names):
+    versions = current_table_versions()
+    return tuple(versions.get(name, (0, None))[0] for name in names)
+
+
+def _user_key():
+    return current_user.get_id() if current_user.is_authenticated else None
+
+
+# Serve a GET page from the render cache while none of the tables it reads
+# (nor the users table, for the header) has changed. Keyed per user, per
+# day, so "this month" figures roll over on their own, and per build, so
+# pages never link to asset bundles a rebuild has deleted. Pages with a
+# pending flash message are rendered fresh, the message is part of them.
+def cached_page(*tables):
+    names = tuple(sorted(set(tables) | {'users'}))
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not render_cache.max_bytes or request.method != 'GET' or '_flashes' in session:
+                return f(*args, **kwargs)
+            key = ('page', request.endpoint, request.full_path, _user_key(), date.today(), build_version(),
+                   _versions(names))
+            cached = render_cache.get(key)
+            if cached is not None:
+                body, mimetype = cached
+                return Response(body, mimetype=mimetype)
+
+            response = f(*args, **kwargs)
+            if isinstance(response, str):
+                response = Response(response)
+            if isinstance(response, Response) and response.status_code == 200 and not response.direct_passthrough \
+                    and '_flashes' not in session:
+                body = response.get_data()
+                render_cache.set(key, (body, response.mimetype), len(body))
+            return response
+        return decorated_function
+    return decorator
+
+
+# Jinja global: {% call cache_fragment('sidebar') %}...{% endcall %} renders the
+# block once per combination of vary values and table versions
+def cache_fragment(name, tables=(), vary=(), caller=None):
+    if not render_cache.max_bytes:
+        return caller()
+    names = tuple(sorted(tables))
+    key = ('fragment', name, request.script_root, tuple(vary), _versions(names))
+    cached = render_cache.get(key)
+    if cached is not None:
+        return cached
+    html = Markup(caller())
+    render_cache.set(key, html, len(html.encode('utf-8')))
+    return html
@@ -0,0 +1,17 @@
+from flask import request, jsonify
+from models import Fee, InventoryItem, MonthlyFinanceRollup
+from decorators import login_is_required
+from reports import report_options, finance_report
+from timestamps import conditional_list
+
+
+# Income vs expense crosstab, e.g.
+# /reports/finance?rows=year,quarter&columns=department&measures=income,net&start=2024-01-01
+@login_is_required
+@conditional_list(Fee, InventoryItem, MonthlyFinanceRollup)
+def finance_report_json():
+    try:
+        report = finance_report(**report_options(request.args))
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    return jsonify(report)
@@ -0,0 +1,345 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from itertools import chain
+from sqlalchemy import Integer, cast, event, extract, func, literal, null, select, union_all
+from sqlalchemy.orm.attributes import get_history
+from models import db, Fee, InventoryItem, MonthlyFinanceRollup
+from helpers import to_date_obj, month_bounds, number_to_month_name
+from table_versions import FINANCE_HISTORY, bump_table_version, table_version
+
+
+# What a finance report can be broken down by and what it can sum
+REPORT_DIMENSIONS = ('year', 'quarter', 'month', 'department', 'course', 'payment_type', 'payment_status')
+REPORT_MEASURES = ('income', 'expense', 'net', 'fee_count', 'item_count')
+# what monthly_finance_rollup is keyed by, so reports on only these can be read from it
+ROLLUP_DIMENSIONS = ('year', 'quarter', 'month', 'department', 'course')
+DEFAULT_REPORT_MEASURES = ('income', 'expense')
+# closed-period reports kept per process
+REPORT_MEMO_SIZE = 256
+
+
+# Fees and inventory items as one ledger of (day, department, course,
+# payment type/status, income, expense, counts), inside [start, end]
+def _ledger(start=None, end=None, department=None, course=None, payment_type=None, payment_status=None):
+    fees = select([
+        Fee.payment_date.label('day'), Fee.department.label('department'), Fee.course.label('course'),
+        Fee.payment_type.label('payment_type'), Fee.payment_status.label('payment_status'),
+        func.coalesce(Fee.amount, 0).label('income'), literal(0).label('expense'),
+        literal(1).label('fee_count'), literal(0).label('item_count'),
+    ]).where(Fee.payment_date.isnot(None))
+    items = select([
+        InventoryItem.purchase_date.label('day'), InventoryItem.department_for.label('department'),
+        InventoryItem.course_for.label('course'), null().label('payment_type'), null().label('payment_status'),
+        literal(0).label('income'), func.coalesce(InventoryItem.price, 0).label('expense'),
+        literal(0).label('fee_count'), literal(1).label('item_count'),
+    ])
+
+    if payment_type:
+        fees = fees.where(Fee.payment_type == payment_type)
+    if payment_status:
+        fees = fees.where(Fee.payment_status == payment_status)
+    if start is not None:
+        fees = fees.where(Fee.payment_date >= start)
+        items = items.where(InventoryItem.purchase_date >= start)
+    if end is not None:
+        fees = fees.where(Fee.payment_date <= end)
+        items = items.where(InventoryItem.purchase_date <= end)
+    if department:
+        fees = fees.where(Fee.department == department)
+        items = items.where(InventoryItem.department_for == department)
+    if course:
+        fees = fees.where(Fee.course == course)
+        items = items.where(InventoryItem.course_for == course)
+
+    # items have no payment type or status, so they drop out once one is filtered on
+    legs = [fees] if payment_type or payment_status else [fees, items]
+    return union_all(*legs).alias('ledger')
+
+
+def _dimension_columns(ledger):
+    month = cast(extract('month', ledger.c.day), Integer)
+    return {
+        'year': cast(extract('year', ledger.c.day), Integer),
+        'quarter': (month + 2) / 3,
+        'month': month,
+        'department': ledger.c.department,
+        'course': ledger.c.course,
+        'payment_type': ledger.c.payment_type,
+        'payment_status': ledger.c.payment_status,
+    }
+
+
+# The monthly rollup shaped like the ledger: a row per (month, department, course),
+# for the whole months from start through end
+def _rollup_ledger(start=None, end=None, department=None, course=None):
+    rollup = MonthlyFinanceRollup.__table__
+    month_key = rollup.c.year * 12 + rollup.c.month
+    query = select([
+        rollup.c.year.label('year'), rollup.c.month.label('month'),
+        # the rollup keys a missing department / course as ''
+        func.nullif(rollup.c.department, '').label('department'),
+        func.nullif(rollup.c.course, '').label('course'),
+        rollup.c.income.label('income'), rollup.c.expense.label('expense'),
+        rollup.c.fee_count.label('fee_count'), rollup.c.item_count.label('item_count'),
+    ]).where((rollup.c.fee_count != 0) | (rollup.c.item_count != 0))
+    if start is not None:
+        query = query.where(month_key >= start.year * 12 + start.month)
+    if end is not None:
+        query = query.where(month_key <= end.year * 12 + end.month)
+    if department:
+        query = query.where(rollup.c.department == department)
+    if course:
+        query = query.where(rollup.c.course == course)
+    return query.alias('ledger')
+
+
+def _rollup_dimension_columns(ledger):
+    return {
+        'year': ledger.c.year,
+        'quarter': (ledger.c.month + 2) / 3,
+        'month': ledger.c.month,
+        'department': ledger.c.department,
+        'course': ledger.c.course,
+    }
+
+
+# Whether the rollup holds the answer: only its own dimensions and filters, and a
+# range of whole months. An open range is left to the ledger, which also counts
+# inventory items without a purchase date.
+def _rollup_answers(dimensions, start, end, filters):
+    if any(name not in ROLLUP_DIMENSIONS for name in dimensions):
+        return False
+    if filters.get('payment_type') or filters.get('payment_status'):
+        return False
+    if start is None and end is None:
+        return False
+    if start is not None and start.day != 1:
+        return False
+    return end is None or (end + timedelta(days=1)).day == 1
+
+
+# None sorts after every value, numbers and names sort naturally
+def _sort_key(key):
+    return tuple((value is None, value if value is not None else '') for value in key)
+
+
+# Lay grouped records out as a rows x columns grid per measure. Every distinct
+# key gets an index once, then each record is added into its cell.
+def _pivot(records, rows, columns, measures):
+    width = len(rows)
+    row_keys = sorted({record[:width] for record in records}, key=_sort_key)
+    column_keys = sorted({record[width:width + len(columns)] for record in records}, key=_sort_key) or [()]
+    row_index = {key: index for index, key in enumerate(row_keys)}
+    column_index = {key: index for index, key in enumerate(column_keys)}
+    sums = ('income', 'expense', 'fee_count', 'item_count')
+    cells = {name: [[0] * len(column_keys) for _ in row_keys] for name in sums}
+
+    offset = width + len(columns)
+    for record in records:
+        row = row_index[record[:width]]
+        column = column_index[record[width:offset]]
+        for position, name in enumerate(sums):
+            cells[name][row][column] += int(record[offset + position] or 0)
+
+    cells['net'] = [[income - expense for income, expense in zip(income_row, expense_row)]
+                    for income_row, expense_row in zip(cells['income'], cells['expense'])]
+    values = {name: cells[name] for name in measures}
+    return {
+        'row_keys': [list(key) for key in row_keys],
+        'column_keys': [list(key) for key in column_keys],
+        'values': values,
+        'row_totals': {name: [sum(row) for row in grid] for name, grid in values.items()},
+        'column_totals': {name: [sum(column) for column in zip(*grid)] if grid else [0] * len(column_keys)
+                          for name, grid in values.items()},
+        'totals': {name: sum(map(sum, grid)) for name, grid in values.items()},
+    }
+
+
+# Income vs expense crosstab: one grouped query over the monthly rollup when it
+# holds the answer, otherwise over the fees and inventory items themselves;
+# rows and columns are lists of REPORT_DIMENSIONS
+def finance_crosstab(rows=('month',), columns=(), measures=DEFAULT_REPORT_MEASURES, start=None, end=None,
+                     **filters):
+    rows, columns, measures = list(rows), list(columns), list(measures or DEFAULT_REPORT_MEASURES)
+    unknown = [name for name in rows + columns if name not in REPORT_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown dimension {', '.join(unknown)}")
+    unknown = [name for name in measures if name not in REPORT_MEASURES]
+    if unknown:
+        raise ValueError(f"Unknown measure {', '.join(unknown)}")
+    if len(set(rows + columns)) != len(rows + columns):
+        raise ValueError('A dimension can only be used once')
+    if start is not None and end is not None and start > end:
+        raise ValueError('start must not be after end')
+
+    if _rollup_answers(rows + columns, start, end, filters):
+        ledger = _rollup_ledger(start, end, filters.get('department'), filters.get('course'))
+        dimensions = _rollup_dimension_columns(ledger)
+    else:
+        ledger = _ledger(start, end, **filters)
+        dimensions = _dimension_columns(ledger)
+    grouped = [dimensions[name] for name in rows + columns]
+    query = select(grouped + [
+        func.sum(ledger.c.income), func.sum(ledger.c.expense),
+        func.sum(ledger.c.fee_count), func.sum(ledger.c.item_count),
+    ])
+    if grouped:
+        query = query.group_by(*grouped)
+    records = [tuple(record) for record in db.session.execute(query)]
+    # a grand total over no rows still comes back as one row of NULLs
+    if not grouped and not (records[0][2] or records[0][3]):
+        records = []
+
+    report = {
+        'rows': rows,
+        'columns': columns,
+        'measures': measures,
+        'start': start.isoformat() if start else None,
+        'end': end.isoformat() if end else None,
+        'filters': {name: value for name, value in filters.items() if value},
+    }
+    report.update(_pivot(records, rows, columns, measures))
+    return report
+
+
+# Reports that end before the current month only change when a backdated
+# fee or item is written, which bumps FINANCE_HISTORY; keep those per process.
+class ClosedPeriodMemo:
+    def __init__(self, maxsize=REPORT_MEMO_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, report):
+        with self._lock:
+            self._entries[key] = report
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'size': len(self._entries),
+        }
+
+
+closed_reports = ClosedPeriodMemo()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=closed_reports.clear)
+
+
+# finance_crosstab, served from the memo when the whole range is closed
+def finance_report(rows=('month',), columns=(), measures=DEFAULT_REPORT_MEASURES, start=None, end=None,
+                   **filters):
+    current_month_start = month_bounds()[1]
+    if end is None or end >= current_month_start:
+        return finance_crosstab(rows, columns, measures, start, end, **filters)
+
+    key = (tuple(rows), tuple(columns), tuple(measures or DEFAULT_REPORT_MEASURES), start, end,
+           tuple(sorted((name, value) for name, value in filters.items() if value)),
+           table_version(FINANCE_HISTORY)[0])
+    report = closed_reports.get(key)
+    if report is None:
+        report = finance_crosstab(rows, columns, measures, start, end, **filters)
+        closed_reports.set(key, report)
+    return report
+
+
+def _names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+# Read a report's options from request args or CLI options: comma separated
+# rows / columns / measures, a YYYY-MM-DD start / end and the filters
+def report_options(args):
+    try:
+        start = to_date_obj(args['start']) if args.get('start') else None
+        end = to_date_obj(args['end']) if args.get('end') else None
+    except ValueError:
+        raise ValueError('start and end must be YYYY-MM-DD')
+    return {
+        'rows': _names(args.get('rows')) or ['month'],
+        'columns': _names(args.get('columns')),
+        'measures': _names(args.get('measures')) or list(DEFAULT_REPORT_MEASURES),
+        'start': start,
+        'end': end,
+        'department': args.get('department') or None,
+        'course': args.get('course') or None,
+        'payment_type': args.get('payment_type') or None,
+        'payment_status': args.get('payment_status') or None,
+    }
+
+
+def _label(dimension, value):
+    if value is None:
+        return ''
+    if dimension == 'month':
+        return number_to_month_name(value)
+    if dimension == 'quarter':
+        return f'Q{value}'
+    return str(value)
+
+
+# A report as a flat header + rows table, one column per (column key, measure)
+def report_table(report):
+    measures = report['measures']
+    column_labels = [' '.join(_label(dimension, value) for dimension, value in zip(report['columns'], key))
+                     for key in report['column_keys']]
+    header = list(report['rows'])
+    for label in column_labels:
+        header += [f'{label} {measure}' if label else measure for measure in measures]
+    if report['columns']:
+        header += [f'total {measure}' for measure in measures]
+
+    lines = []
+    for index, key in enumerate(report['row_keys']):
+        line = [_label(dimension, value) for dimension, value in zip(report['rows'], key)]
+        for column in range(len(column_labels)):
+            line += [report['values'][measure][index][column] for measure in measures]
+        if report['columns']:
+            line += [report['row_totals'][measure][index] for measure in measures]
+        lines.append(line)
+    return header, lines
+
+
+# bump FINANCE_HISTORY when a flush adds, changes or removes a fee or item
+# dated before the current month, before or after the change
+@event.listens_for(db.session, 'after_flush')
+def bump_finance_history(session, flush_context):
+    current_month_start = month_bounds()[1]
+    for instance in chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, Fee):
+            attribute = 'payment_date'
+        elif isinstance(instance, InventoryItem):
+            attribute = 'purchase_date'
+        else:
+            continue
+        if instance in session.dirty and not session.is_modified(instance, include_collections=False):
+            continue
+        history = get_history(instance, attribute)
+        days = chain(history.added or (), history.unchanged or (), history.deleted or ())
+        if any(day is not None and day < current_month_start for day in days):
+            bump_table_version(session.connection(), FINANCE_HISTORY)
+            return
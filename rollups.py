@@ -0,0 +1,160 @@
+from sqlalchemy import Integer, and_, cast, exists, extract, func, select
+from sqlalchemy.dialects import postgresql
+from models import db, Fee, InventoryItem, MonthlyFinanceRollup
+from table_versions import FINANCE_HISTORY, bump_table_versions
+
+
+rollup_table = MonthlyFinanceRollup.__table__
+
+
+# Turn a possibly missing form value into an int amount
+def _amount(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+# The rollup key and deltas a single fee contributes
+def fee_contribution(payment_date, department, course, amount):
+    if payment_date is None:
+        return None
+    key = (payment_date.year, payment_date.month, department or '', course or '')
+    return key, {'income': _amount(amount), 'fee_count': 1}
+
+
+# The rollup key and deltas a single inventory item contributes
+def item_contribution(purchase_date, department_for, course_for, price):
+    if purchase_date is None:
+        return None
+    key = (purchase_date.year, purchase_date.month, department_for or '', course_for or '')
+    return key, {'expense': _amount(price), 'item_count': 1}
+
+
+# Add (sign=1) or remove (sign=-1) one contribution using the flush connection
+def apply_contribution(connection, contribution, sign=1):
+    if contribution is None:
+        return
+    (year, month, department, course), deltas = contribution
+    deltas = {name: sign * value for name, value in deltas.items()}
+
+    if connection.dialect.name == 'postgresql':
+        insert = postgresql.insert(rollup_table).values(year=year, month=month, department=department,
+                                                        course=course, **deltas)
+        connection.execute(insert.on_conflict_do_update(
+            constraint='uq_monthly_finance_rollup_key',
+            set_={name: rollup_table.c[name] + insert.excluded[name] for name in deltas},
+        ))
+        return
+
+    # SQLite serialises writers, so update-then-insert cannot race here
+    key_filter = and_(rollup_table.c.year == year, rollup_table.c.month == month,
+                      rollup_table.c.department == department, rollup_table.c.course == course)
+    result = connection.execute(
+        rollup_table.update()
+        .where(key_filter)
+        .values({name: rollup_table.c[name] + value for name, value in deltas.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(rollup_table.insert().values(year=year, month=month, department=department,
+                                                        course=course, **deltas))
+
+
+# Take every row matching where out of the rollup in one statement. The rows are
+# grouped into their (year, month, department, course) cells, and the totals and
+# counts subtracted from the (total, count) rollup columns they feed, e.g.
+# ('income', 'fee_count'). Cells only exist for rows the listeners added, so no
+# insert is needed.
+def remove_contributions(connection, columns, day, department, course, amount, where):
+    total_name, count_name = columns
+    year = cast(extract('year', day), Integer)
+    month = cast(extract('month', day), Integer)
+    department = func.coalesce(department, '')
+    course = func.coalesce(course, '')
+    removed = (
+        select([year.label('year'), month.label('month'), department.label('department'),
+                course.label('course'), func.coalesce(func.sum(amount), 0).label('total'),
+                func.count().label('count')])
+        .where(where).where(day.isnot(None))
+        .group_by(year, month, department, course)
+        .alias('removed')
+    )
+    same_cell = and_(rollup_table.c.year == removed.c.year, rollup_table.c.month == removed.c.month,
+                     rollup_table.c.department == removed.c.department,
+                     rollup_table.c.course == removed.c.course)
+
+    if connection.dialect.name == 'postgresql':
+        connection.execute(
+            rollup_table.update()
+            .where(same_cell)
+            .values({total_name: rollup_table.c[total_name] - removed.c.total,
+                     count_name: rollup_table.c[count_name] - removed.c.count})
+        )
+        return
+
+    # SQLAlchemy 1.3 cannot render UPDATE ... FROM for SQLite; correlated
+    # subqueries against the same grouped select are still one statement
+    connection.execute(
+        rollup_table.update()
+        .where(exists(select([removed.c.year]).where(same_cell)))
+        .values({total_name: rollup_table.c[total_name] - select([removed.c.total]).where(same_cell).as_scalar(),
+                 count_name: rollup_table.c[count_name] - select([removed.c.count]).where(same_cell).as_scalar()})
+    )
+
+
+# Full recompute of the rollup from the fees and inventory_items tables
+def rebuild_rollups():
+    year = func.extract('year', Fee.payment_date)
+    month = func.extract('month', Fee.payment_date)
+    income_rows = (
+        db.session.query(year, month, Fee.department, Fee.course,
+                         func.coalesce(func.sum(Fee.amount), 0), func.count(Fee.id))
+        .filter(Fee.payment_date.isnot(None))
+        .group_by(year, month, Fee.department, Fee.course)
+        .all()
+    )
+
+    year = func.extract('year', InventoryItem.purchase_date)
+    month = func.extract('month', InventoryItem.purchase_date)
+    expense_rows = (
+        db.session.query(year, month, InventoryItem.department_for, InventoryItem.course_for,
+                         func.coalesce(func.sum(InventoryItem.price), 0), func.count(InventoryItem.id))
+        .group_by(year, month, InventoryItem.department_for, InventoryItem.course_for)
+        .all()
+    )
+
+    rollups = {}
+    for row_year, row_month, department, course, total, count in income_rows:
+        key = (int(row_year), int(row_month), department or '', course or '')
+        entry = rollups.setdefault(key, {'income': 0, 'expense': 0, 'fee_count': 0, 'item_count': 0})
+        entry['income'] += int(total)
+        entry['fee_count'] += count
+    for row_year, row_month, department, course, total, count in expense_rows:
+        key = (int(row_year), int(row_month), department or '', course or '')
+        entry = rollups.setdefault(key, {'income': 0, 'expense': 0, 'fee_count': 0, 'item_count': 0})
+        entry['expense'] += int(total)
+        entry['item_count'] += count
+
+    db.session.query(MonthlyFinanceRollup).delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(MonthlyFinanceRollup, [
+        dict(year=year, month=month, department=department, course=course, **totals)
+        for (year, month, department, course), totals in rollups.items()
+    ])
+    # the closed-period report memo may hold figures the rebuild corrected
+    bump_table_versions(db.session.connection(), ['monthly_finance_rollup', FINANCE_HISTORY])
+    db.session.commit()
+    return len(rollups)
+
+
+# Income and expense totals for a half-open range of months, read from the rollup
+def rollup_totals(start, end):
+    start_key = start.year * 12 + start.month
+    end_key = end.year * 12 + end.month
+    month_key = MonthlyFinanceRollup.year * 12 + MonthlyFinanceRollup.month
+    income, expense = (
+        db.session.query(func.coalesce(func.sum(MonthlyFinanceRollup.income), 0),
+                         func.coalesce(func.sum(MonthlyFinanceRollup.expense), 0))
+        .filter(month_key >= start_key, month_key < end_key)
+        .one()
+    )
+    return int(income), int(expense)
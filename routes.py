@@ -0,0 +1,117 @@
+from werkzeug.utils import cached_property, import_string
+import views
+
+
+# (rule, view name[, methods]) of the views every request path needs; served from views.py
+CORE_ROUTES = [
+    ('/', 'login_or_dashboard'),
+    ('/dashboard', 'home'),
+    ('/register', 'register', ['GET', 'POST']),
+    ('/login', 'login', ['GET', 'POST']),
+    ('/logout', 'logout'),
+    ('/assets/<filename>', 'asset_file'),
+    ('/metrics', 'metrics'),
+    ('/cache-stats', 'cache_stats'),
+    ('/error-404', 'error_404'),
+    ('/api/<entity>', 'list_api'),
+    ('/export/<entity>', 'export_entity'),
+]
+
+# Entity CRUD pages by module. A module is only imported on the first request
+# to one of its URLs, so a worker starts without loading every group.
+VIEW_GROUPS = {
+    'facilitator_views': [
+        ('/all-facilitators', 'all_facilitators'),
+        ('/add-facilitator', 'add_facilitator', ['GET', 'POST']),
+        ('/edit-facilitator', 'edit_facilitator', ['GET', 'POST']),
+        ('/delete-facilitator', 'delete_facilitator'),
+        ('/facilitator-profile', 'facilitator_profile'),
+    ],
+    'trainee_views': [
+        ('/all-trainees', 'all_trainees'),
+        ('/add-trainee', 'add_trainee', ['GET', 'POST']),
+        ('/import-trainees', 'import_trainees_upload', ['GET', 'POST']),
+        ('/edit-trainee', 'edit_trainee', ['GET', 'POST']),
+        ('/delete-trainee', 'delete_trainee'),
+        ('/about-trainee', 'about_trainee'),
+        ('/search/trainees', 'search_trainees_json'),
+    ],
+    'search_views': [
+        ('/search', 'search_page'),
+        ('/search/all', 'search_json'),
+    ],
+    'course_views': [
+        ('/all-courses', 'all_courses'),
+        ('/add-course', 'add_course', ['GET', 'POST']),
+        ('/edit-course', 'edit_course', ['GET', 'POST']),
+        ('/about-course', 'about_course'),
+        ('/course-images/<path:image_name>', 'course_image'),
+    ],
+    'inventory_views': [
+        ('/inventory', 'inventory'),
+        ('/add-to-inventory', 'add_to_inventory', ['GET', 'POST']),
+        ('/edit-inventory-item', 'edit_inventory_item', ['GET', 'POST']),
+        ('/delete-inventory-item', 'delete_inventory_item'),
+    ],
+    'department_views': [
+        ('/departments', 'departments'),
+        ('/add-department', 'add_department', ['GET', 'POST']),
+        ('/edit-department', 'edit_department', ['GET', 'POST']),
+        ('/delete-department', 'delete_department'),
+    ],
+    'staff_views': [
+        ('/staff', 'staff'),
+        ('/add-staff', 'add_staff', ['GET', 'POST']),
+        ('/edit-staff', 'edit_staff', ['GET', 'POST']),
+        ('/delete-staff', 'delete_staff'),
+        ('/staff-profile', 'staff_profile'),
+    ],
+    'fee_views': [
+        ('/fees-collection', 'fees_collection'),
+        ('/add-fees', 'add_fees', ['GET', 'POST']),
+        ('/fees-receipt', 'fees_receipt'),
+        ('/edit-fee', 'edit_fee', ['GET', 'POST']),
+    ],
+    'event_views': [
+        ('/event-management', 'event_management', ['GET', 'POST']),
+        ('/get_events', 'get_events'),
+    ],
+    'report_views': [
+        ('/reports/finance', 'finance_report_json'),
+    ],
+    'bulk_views': [
+        ('/bulk/<entity>/delete', 'bulk_delete_records', ['POST']),
+        ('/bulk/<entity>/update', 'bulk_update_records', ['POST']),
+    ],
+    'job_views': [
+        ('/jobs/<kind>', 'create_job', ['POST']),
+        ('/jobs/<int:job_id>', 'job_detail'),
+        ('/jobs/<int:job_id>/download', 'job_download'),
+    ],
+}
+
+
+# Stands in for a view function until it is first called
+class LazyView:
+    def __init__(self, import_name):
+        self.__module__, self.__name__ = import_name.rsplit('.', 1)
+        self.import_name = import_name
+
+    @cached_property
+    def view(self):
+        return import_string(self.import_name)
+
+    def __call__(self, *args, **kwargs):
+        return self.view(*args, **kwargs)
+
+
+def _add_routes(app, routes, view_for):
+    for rule, name, *methods in routes:
+        app.add_url_rule(rule, endpoint=name, view_func=view_for(name), methods=methods[0] if methods else None)
+
+
+# Register every URL on the app; endpoint names are the view function names
+def register_routes(app):
+    _add_routes(app, CORE_ROUTES, lambda name: getattr(views, name))
+    for module, routes in VIEW_GROUPS.items():
+        _add_routes(app, routes, lambda name, module=module: LazyView(f'{module}.{name}'))
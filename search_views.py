@@ -0,0 +1,18 @@
+from flask import request, render_template, jsonify
+from decorators import login_is_required
+from site_search import site_search, DEFAULT_SITE_SEARCH_LIMIT, DEFAULT_RESULTS_PER_TYPE
+
+
+# Results page of the header search box
+@login_is_required
+def search_page():
+    term = request.args.get('q', '').strip()
+    groups = site_search(term, per_type=DEFAULT_SITE_SEARCH_LIMIT)
+    return render_template('search-results.html', term=term, groups=groups)
+
+
+# Same search as JSON, grouped by type: [{type, label, total, results: [{id, title, detail, url}]}]
+@login_is_required
+def search_json():
+    per_type = request.args.get('per_type', DEFAULT_RESULTS_PER_TYPE, type=int)
+    return jsonify(site_search(request.args.get('q'), per_type=max(1, per_type)))
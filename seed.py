@@ -0,0 +1,201 @@
+import random
+from collections import Counter
+from datetime import date, timedelta
+from models import db, User, Facilitator, Trainee, Course, InventoryItem, Staff, Department, Fee, Event
+from enrollment import adjust_enrollments
+from invoice_numbers import invoice_allocator
+from reference_cache import reference_data
+from rollups import rebuild_rollups
+from table_versions import VERSIONED_MODELS, bump_table_versions
+from reports import FINANCE_HISTORY
+from site_search import rebuild_site_search
+
+
+# rows inserted per bulk statement
+SEED_CHUNK_SIZE = 1000
+SEED_USER_PASSWORD = 'password'
+
+FIRST_NAMES = ['Abubakar', 'Aisha', 'Musa', 'Fatima', 'Ibrahim', 'Zainab', 'Usman', 'Hauwa', 'Sani', 'Maryam',
+               'Aliyu', 'Khadija', 'Bello', 'Amina', 'Yusuf', 'Hadiza', 'Emeka', 'Ngozi', 'Tunde', 'Funmilayo',
+               'Chinedu', 'Blessing', 'Umar', 'Safiya', 'Danladi', 'Rukayya', 'Kabiru', 'Halima', 'Nasiru', 'Asmau']
+LAST_NAMES = ['Abdullahi', 'Bello', 'Danfodiyo', 'Garba', 'Ibrahim', 'Lawal', 'Mohammed', 'Sokoto', 'Tambuwal',
+              'Usman', 'Yakubu', 'Okafor', 'Adeyemi', 'Bakare', 'Eze', 'Nwosu', 'Shehu', 'Aliyu', 'Maikudi', 'Gusau']
+# department -> courses it runs
+DEPARTMENT_COURSES = {
+    'ICT': ['Web Development', 'Computer Appreciation', 'Graphic Design', 'Data Analysis'],
+    'Fashion Design': ['Tailoring', 'Embroidery', 'Pattern Drafting'],
+    'Agriculture': ['Poultry Farming', 'Fish Farming', 'Crop Production'],
+    'Catering': ['Baking', 'Confectionery', 'Event Catering'],
+    'Crafts': ['Leather Works', 'Soap Making', 'Tie and Dye', 'Shoe Making'],
+    'Electrical': ['Electrical Installation', 'Solar Installation', 'Phone Repairs'],
+}
+DESIGNATIONS = ['Coordinator', 'Administrative Officer', 'Accountant', 'Secretary', 'Technician', 'Cleaner']
+ITEM_NAMES = ['Laptop', 'Projector', 'Sewing Machine', 'Oven', 'Generator', 'Printer', 'Whiteboard',
+              'Incubator', 'Multimeter', 'Fabric Roll', 'Chairs', 'Solar Panel']
+EVENT_NAMES = ['Orientation', 'Graduation', 'Exhibition', 'Workshop', 'Stakeholders Meeting', 'Entrepreneurship Talk']
+PAYMENT_TYPES = ['Cash', 'Transfer', 'Online Payment']
+PAYMENT_STATUSES = ['Paid', 'Paid', 'Paid', 'Pending', 'Unpaid']
+GENDERS = ['Male', 'Female']
+
+
+def _person(rng):
+    return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+
+def _phone(rng):
+    return '0' + rng.choice('789') + rng.choice('01') + ''.join(rng.choice('0123456789') for _ in range(8))
+
+
+def _day(rng, start, end):
+    return start + timedelta(days=rng.randrange((end - start).days + 1))
+
+
+def _insert(model, mappings, chunk_size):
+    for index in range(0, len(mappings), chunk_size):
+        db.session.bulk_insert_mappings(model, mappings[index:index + chunk_size])
+        db.session.commit()
+
+
+# Bulk-generate related rows for every table. Names and foreign keys agree
+# (a trainee's department runs their course, a fee belongs to a real trainee),
+# and the same seed gives the same data. Bulk inserts skip the mapper hooks,
+# so enrollment counters, rollups, invoice numbers, table versions and the search index are
+# brought up to date here. Returns the number of rows added per table.
+def seed_database(users=1, departments=None, facilitators=20, trainees=1000, fees=2000, inventory=300, staff=30,
+                  events=50, seed=0, years=2, chunk_size=SEED_CHUNK_SIZE):
+    rng = random.Random(seed)
+    today = date.today()
+    first_day = today.replace(year=today.year - years)
+    added = Counter()
+    # keeps emails and names unique when seeding on top of existing data
+    run = db.session.query(db.func.count(Trainee.id)).scalar() + db.session.query(db.func.count(User.id)).scalar()
+
+    db.session.bulk_insert_mappings(User, [
+        dict(first_name=first_name, last_name=last_name, email=f'user{run + number}@example.com',
+             password=SEED_USER_PASSWORD, avatar_location='../static/images/profile-photo.png')
+        for number, (first_name, last_name) in enumerate(_person(rng) for _ in range(users))
+    ])
+    added['users'] = users
+
+    department_names = list(DEPARTMENT_COURSES)[:departments] if departments else list(DEPARTMENT_COURSES)
+    existing = {name for name, in db.session.query(Department.department_name)}
+    new_departments = [name for name in department_names if name not in existing]
+    db.session.bulk_insert_mappings(Department, [
+        dict(department_name=name, department_head=' '.join(_person(rng)), mobile_number=_phone(rng),
+             email=f"{name.lower().replace(' ', '.')}@cedudus.com")
+        for name in new_departments
+    ])
+    added['departments'] = len(new_departments)
+    db.session.commit()
+    department_ids = dict(db.session.query(Department.department_name, Department.id)
+                          .filter(Department.department_name.in_(department_names)))
+
+    facilitator_rows = []
+    for _ in range(facilitators):
+        first_name, last_name = _person(rng)
+        department = rng.choice(department_names)
+        facilitator_rows.append(dict(
+            first_name=first_name, last_name=last_name, email=f'{first_name}.{last_name}@cedudus.com'.lower(),
+            joining_date=_day(rng, first_day, today), mobile_number=_phone(rng), gender=rng.choice(GENDERS),
+            course=rng.choice(DEPARTMENT_COURSES[department]), department=department,
+        ))
+    _insert(Facilitator, facilitator_rows, chunk_size)
+    added['facilitators'] = facilitators
+    facilitator_names = {f'{first_name} {last_name}': facilitator_id for facilitator_id, first_name, last_name
+                         in db.session.query(Facilitator.id, Facilitator.first_name, Facilitator.last_name)}
+
+    existing = {name for name, in db.session.query(Course.course_name)}
+    course_rows = []
+    for department in department_names:
+        for name in DEPARTMENT_COURSES[department]:
+            if name in existing:
+                continue
+            facilitator = rng.choice(list(facilitator_names)) if facilitator_names else ''
+            course_rows.append(dict(
+                course_name=name, course_code=''.join(word[0] for word in name.split()).upper() + str(rng.randint(100, 399)),
+                course_details=f'Hands-on training in {name.lower()}.', course_duration=f'{rng.choice([3, 6, 9, 12])} Weeks',
+                course_price=rng.choice([15000, 20000, 25000, 30000, 50000]), facilitator_name=facilitator,
+                facilitator_id=facilitator_names.get(facilitator), students_enrolled=0,
+            ))
+    _insert(Course, course_rows, chunk_size)
+    added['courses'] = len(course_rows)
+    courses = {name: (course_id, price) for course_id, name, price
+               in db.session.query(Course.id, Course.course_name, Course.course_price)}
+    offered = [(department, name) for department in department_names
+               for name in DEPARTMENT_COURSES[department] if name in courses]
+
+    trainee_rows = []
+    for number in range(trainees):
+        first_name, last_name = _person(rng)
+        department, course = rng.choice(offered)
+        trainee_rows.append(dict(
+            first_name=first_name, last_name=last_name, email=f'{first_name}.{last_name}{run + number}@example.com'.lower(),
+            registration_date=_day(rng, first_day, today), department=department, department_id=department_ids[department],
+            gender=rng.choice(GENDERS), mobile_number=_phone(rng), course=course, course_id=courses[course][0],
+            address=f'{rng.randint(1, 200)} {rng.choice(LAST_NAMES)} Road, Sokoto',
+        ))
+    for index in range(0, len(trainee_rows), chunk_size):
+        chunk = trainee_rows[index:index + chunk_size]
+        db.session.bulk_insert_mappings(Trainee, chunk)
+        adjust_enrollments(db.session.connection(), Counter(row['course_id'] for row in chunk))
+        db.session.commit()
+    added['trainees'] = trainees
+
+    fee_payers = db.session.query(Trainee.id, Trainee.first_name, Trainee.last_name, Trainee.registration_date,
+                                  Trainee.department, Trainee.department_id, Trainee.course,
+                                  Trainee.course_id).all() if fees else []
+    fee_rows = []
+    for _ in range(fees if fee_payers else 0):
+        payer = rng.choice(fee_payers)
+        price = courses.get(payer.course, (None, 20000))[1]
+        fee_rows.append(dict(
+            trainee_name=f'{payer.first_name} {payer.last_name}', trainee_id=payer.id,
+            department=payer.department, department_id=payer.department_id, course=payer.course,
+            course_id=payer.course_id, payment_type=rng.choice(PAYMENT_TYPES),
+            payment_status=rng.choice(PAYMENT_STATUSES), payment_date=_day(rng, payer.registration_date, today),
+            amount=rng.choice([price, price // 2, price // 4]),
+        ))
+    for index in range(0, len(fee_rows), chunk_size):
+        chunk = fee_rows[index:index + chunk_size]
+        connection = db.session.connection()
+        for row in chunk:
+            row['invoice_number'] = invoice_allocator.next_number(connection)
+        db.session.bulk_insert_mappings(Fee, chunk)
+        db.session.commit()
+    added['fees'] = len(fee_rows)
+
+    item_rows = []
+    for _ in range(inventory):
+        department, course = rng.choice(offered)
+        item_rows.append(dict(
+            item_name=rng.choice(ITEM_NAMES), course_for=course, course_id=courses[course][0],
+            department_for=department, department_id=department_ids[department],
+            price=rng.randrange(5000, 500000, 500), purchase_date=_day(rng, first_day, today),
+            status=rng.choice(['In Stock', 'In Stock', 'Out Of Stock']), item_details=f'For {course.lower()} classes.',
+        ))
+    _insert(InventoryItem, item_rows, chunk_size)
+    added['inventory_items'] = inventory
+
+    staff_rows = []
+    for _ in range(staff):
+        first_name, last_name = _person(rng)
+        staff_rows.append(dict(
+            first_name=first_name, last_name=last_name, email=f'{first_name}.{last_name}@cedudus.com'.lower(),
+            joining_date=_day(rng, first_day, today), mobile_number=_phone(rng), gender=rng.choice(GENDERS),
+            designation=rng.choice(DESIGNATIONS), department=rng.choice(department_names),
+            address=f'{rng.randint(1, 200)} {rng.choice(LAST_NAMES)} Road, Sokoto',
+        ))
+    _insert(Staff, staff_rows, chunk_size)
+    added['staff'] = staff
+
+    _insert(Event, [dict(event_name=rng.choice(EVENT_NAMES), event_date=_day(rng, first_day, today + timedelta(days=180)))
+                    for _ in range(events)], chunk_size)
+    added['events'] = events
+    bump_table_versions(db.session.connection(), list(VERSIONED_MODELS) + [FINANCE_HISTORY])
+    db.session.commit()
+
+    rebuild_rollups()
+    rebuild_site_search()
+    for name in ('departments', 'courses', 'facilitators'):
+        reference_data.invalidate(name)
+    return added
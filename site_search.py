@@ -0,0 +1,281 @@
+import re
+from flask import url_for
+from sqlalchemy import event, select, text
+from sqlalchemy.sql import table, column
+from sqlalchemy.exc import OperationalError
+from models import db, Facilitator, Trainee, Course, InventoryItem, Staff, Department
+from trainee_search import fts_prefix_query
+
+
+DEFAULT_SITE_SEARCH_LIMIT = 50
+# results shown per type of record
+DEFAULT_RESULTS_PER_TYPE = 5
+# rows read and indexed per statement by a reindex
+REINDEX_BATCH_SIZE = 1000
+# characters of the indexed text shown under a result
+DETAIL_LENGTH = 120
+
+# What the global search covers: title columns rank above body columns. code
+# keeps each record's index row id unique (record id * 16 + code) on SQLite.
+SEARCH_SOURCES = {
+    'trainees': {
+        'model': Trainee, 'code': 1, 'label': 'Trainees', 'endpoint': 'edit_trainee', 'id_arg': 'trainee_id',
+        'title': [Trainee.first_name, Trainee.last_name],
+        'body': [Trainee.email, Trainee.mobile_number, Trainee.course, Trainee.department, Trainee.address],
+    },
+    'staff': {
+        'model': Staff, 'code': 2, 'label': 'Staff', 'endpoint': 'edit_staff', 'id_arg': 'staff_id',
+        'title': [Staff.first_name, Staff.last_name],
+        'body': [Staff.designation, Staff.department, Staff.email, Staff.mobile_number, Staff.address],
+    },
+    'facilitators': {
+        'model': Facilitator, 'code': 3, 'label': 'Facilitators', 'endpoint': 'edit_facilitator',
+        'id_arg': 'facilitator_id',
+        'title': [Facilitator.first_name, Facilitator.last_name],
+        'body': [Facilitator.course, Facilitator.department, Facilitator.email, Facilitator.mobile_number],
+    },
+    'courses': {
+        'model': Course, 'code': 4, 'label': 'Courses', 'endpoint': 'about_course', 'id_arg': 'course_id',
+        'title': [Course.course_name, Course.course_code],
+        'body': [Course.course_details, Course.facilitator_name, Course.course_duration],
+    },
+    'inventory_items': {
+        'model': InventoryItem, 'code': 5, 'label': 'Inventory', 'endpoint': 'edit_inventory_item',
+        'id_arg': 'item_id',
+        'title': [InventoryItem.item_name],
+        'body': [InventoryItem.item_details, InventoryItem.course_for, InventoryItem.department_for,
+                 InventoryItem.status],
+    },
+    'departments': {
+        'model': Department, 'code': 6, 'label': 'Departments', 'endpoint': 'edit_department',
+        'id_arg': 'department_id',
+        'title': [Department.department_name],
+        'body': [Department.department_head, Department.email, Department.mobile_number],
+    },
+}
+_NAME_BY_MODEL = {source['model']: name for name, source in SEARCH_SOURCES.items()}
+
+# SQLite: one FTS5 table for every type, ranked with bm25 (title weighted above body)
+SQLITE_SITE_SEARCH = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS site_search USING fts5("
+    "entity UNINDEXED, record_id UNINDEXED, title, body, tokenize='unicode61 remove_diacritics 2')",
+]
+
+# Postgres: a tsvector per record (title weighted A, body B) behind a GIN index
+POSTGRES_SITE_SEARCH = [
+    "CREATE TABLE IF NOT EXISTS site_search ("
+    "entity VARCHAR(30) NOT NULL, record_id INTEGER NOT NULL, title TEXT NOT NULL, body TEXT NOT NULL, "
+    "document TSVECTOR NOT NULL, PRIMARY KEY (entity, record_id))",
+    "CREATE INDEX IF NOT EXISTS ix_site_search_document ON site_search USING gin (document)",
+]
+
+SQLITE_UPSERT = [
+    'DELETE FROM site_search WHERE rowid = :rowid',
+    'INSERT INTO site_search (rowid, entity, record_id, title, body) '
+    'VALUES (:rowid, :entity, :record_id, :title, :body)',
+]
+POSTGRES_UPSERT = [
+    "INSERT INTO site_search (entity, record_id, title, body, document) VALUES (:entity, :record_id, :title, :body, "
+    "setweight(to_tsvector('simple', :title), 'A') || setweight(to_tsvector('simple', :body), 'B')) "
+    "ON CONFLICT (entity, record_id) DO UPDATE SET title = excluded.title, body = excluded.body, "
+    "document = excluded.document",
+]
+
+# the index as a table construct, for statements built from other queries
+site_search_table = table('site_search', column('rowid'), column('entity'), column('record_id'))
+
+# database urls known to have the site_search table. Only a found table is
+# remembered: `flask migrate` may create it while this process runs, and
+# writes made after that must reach the index.
+_index_available = set()
+
+
+def _index_ready(connection):
+    key = str(connection.engine.url)
+    if key in _index_available:
+        return True
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        found = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'site_search'")
+        ).scalar()
+    elif dialect == 'postgresql':
+        found = connection.execute(text("SELECT to_regclass('site_search')")).scalar()
+    else:
+        found = None
+    if found:
+        _index_available.add(key)
+    return bool(found)
+
+
+def _joined(values):
+    return ' '.join(str(value) for value in values if value not in (None, ''))
+
+
+# Index row parameters of one record; values are in the title + body column order
+def _document(name, record_id, values):
+    source = SEARCH_SOURCES[name]
+    title_count = len(source['title'])
+    return {
+        'rowid': record_id * 16 + source['code'],
+        'entity': name,
+        'record_id': record_id,
+        'title': _joined(values[:title_count]),
+        'body': _joined(values[title_count:]),
+    }
+
+
+def _write_documents(connection, documents):
+    if not documents:
+        return
+    statements = SQLITE_UPSERT if connection.dialect.name == 'sqlite' else POSTGRES_UPSERT
+    for statement in statements:
+        connection.execute(text(statement), documents)
+
+
+# Index the records of one type, all of them, those with an id above after_id
+# (the rows a bulk insert just added) or those matching where (the rows a
+# set-based update just changed). Returns how many were indexed.
+def index_records(connection, name, after_id=None, where=None):
+    if not _index_ready(connection):
+        return 0
+    source = SEARCH_SOURCES[name]
+    model = source['model']
+    query = select([model.id] + source['title'] + source['body']).order_by(model.id)
+    if after_id is not None:
+        query = query.where(model.id > after_id)
+    if where is not None:
+        query = query.where(where)
+
+    count = 0
+    last_id = None
+    while True:
+        batch_query = query if last_id is None else query.where(model.id > last_id)
+        rows = connection.execute(batch_query.limit(REINDEX_BATCH_SIZE)).fetchall()
+        if not rows:
+            return count
+        _write_documents(connection, [_document(name, row[0], list(row[1:])) for row in rows])
+        count += len(rows)
+        last_id = rows[-1][0]
+
+
+# Drop the index rows of the records of one type matching where, in one
+# statement; run it before the records themselves are deleted
+def unindex_records(connection, name, where):
+    if not _index_ready(connection):
+        return
+    source = SEARCH_SOURCES[name]
+    model = source['model']
+    if connection.dialect.name == 'sqlite':
+        rowids = select([model.id * 16 + source['code']]).where(where)
+        statement = site_search_table.delete().where(site_search_table.c.rowid.in_(rowids))
+    else:
+        record_ids = select([model.id]).where(where)
+        statement = site_search_table.delete().where(
+            (site_search_table.c.entity == name) & site_search_table.c.record_id.in_(record_ids)
+        )
+    connection.execute(statement)
+
+
+# Throw the index away and build it again from every table; {type: records indexed}
+def rebuild_site_search():
+    connection = db.session.connection()
+    if not _index_ready(connection):
+        return {}
+    connection.execute(text('DELETE FROM site_search'))
+    counts = {name: index_records(connection, name) for name in SEARCH_SOURCES}
+    db.session.commit()
+    return counts
+
+
+# Migration step: create the index for the current database and fill it
+def create_site_search_index():
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        statements = SQLITE_SITE_SEARCH
+    elif dialect == 'postgresql':
+        statements = POSTGRES_SITE_SEARCH
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+    rebuild_site_search()
+
+
+# "ada lov" -> ada:* & lov:* (every word as a prefix term, tsquery syntax stripped)
+def _tsquery(term):
+    words = [re.sub(r'[^\w]', '', word) for word in re.split(r'\s+', term)]
+    return ' & '.join(f'{word}:*' for word in words if word)
+
+
+def _matches(connection, term, limit):
+    if connection.dialect.name == 'sqlite':
+        try:
+            return connection.execute(text(
+                'SELECT entity, record_id, title, body, bm25(site_search, 0, 0, 10.0, 1.0) AS score '
+                'FROM site_search WHERE site_search MATCH :query ORDER BY score LIMIT :limit'
+            ), {'query': fts_prefix_query(term), 'limit': limit}).fetchall()
+        except OperationalError:
+            # terms made only of punctuation are no valid FTS5 query
+            return []
+    query = _tsquery(term)
+    if not query:
+        return []
+    return connection.execute(text(
+        "SELECT entity, record_id, title, body, ts_rank(document, to_tsquery('simple', :query)) AS score "
+        "FROM site_search WHERE document @@ to_tsquery('simple', :query) ORDER BY score DESC LIMIT :limit"
+    ), {'query': query, 'limit': limit}).fetchall()
+
+
+# Best matches for term across every type, grouped by type; the group holding
+# the best match comes first and each group keeps its rank order
+def site_search(term, limit=DEFAULT_SITE_SEARCH_LIMIT, per_type=DEFAULT_RESULTS_PER_TYPE):
+    term = (term or '').strip()
+    connection = db.session.connection()
+    if not term or not _index_ready(connection):
+        return []
+
+    groups = {}
+    for entity, record_id, title, body, score in _matches(connection, term, limit):
+        source = SEARCH_SOURCES.get(entity)
+        if source is None:
+            continue
+        group = groups.setdefault(entity, {'type': entity, 'label': source['label'], 'total': 0, 'results': []})
+        group['total'] += 1
+        if len(group['results']) < per_type:
+            group['results'].append({
+                'id': record_id,
+                'title': title,
+                'detail': body[:DETAIL_LENGTH],
+                'url': url_for(source['endpoint'], **{source['id_arg']: record_id}),
+            })
+    return list(groups.values())
+
+
+# keep each record's index row in step with ORM writes, in the writing transaction
+def _index_instance(mapper, connection, target):
+    if not _index_ready(connection):
+        return
+    name = _NAME_BY_MODEL[type(target)]
+    source = SEARCH_SOURCES[name]
+    values = [getattr(target, column.key) for column in source['title'] + source['body']]
+    _write_documents(connection, [_document(name, target.id, values)])
+
+
+def _unindex_instance(mapper, connection, target):
+    if not _index_ready(connection):
+        return
+    name = _NAME_BY_MODEL[type(target)]
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text('DELETE FROM site_search WHERE rowid = :rowid'),
+                           {'rowid': target.id * 16 + SEARCH_SOURCES[name]['code']})
+    else:
+        connection.execute(text('DELETE FROM site_search WHERE entity = :entity AND record_id = :record_id'),
+                           {'entity': name, 'record_id': target.id})
+
+
+for _source in SEARCH_SOURCES.values():
+    event.listen(_source['model'], 'after_insert', _index_instance)
+    event.listen(_source['model'], 'after_update', _index_instance)
+    event.listen(_source['model'], 'after_delete', _unindex_instance)
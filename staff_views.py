@@ -0,0 +1,45 @@
+from flask import request, render_template, redirect, url_for
+from models import User, Staff, Department
+from decorators import login_is_required
+from db_helpers import add_a_staff, edit_a_staff, delete_a_staff
+from reference_cache import reference_data
+from render_cache import cached_page
+from timestamps import conditional_list, conditional_record
+
+
+@login_is_required
+@conditional_list(Staff, User)
+@cached_page('staff')
+def staff():
+    return render_template('all-staff.html')
+
+
+@login_is_required
+def add_staff():
+    departments = reference_data.get('departments')
+    if request.method == 'POST':
+        add_a_staff(request.form)
+        return redirect(url_for('staff'))
+    return render_template('add-staff.html', departments=departments)
+
+
+@login_is_required
+@conditional_record(Staff, 'staff_id', Department, User)
+def edit_staff():
+    departments = reference_data.get('departments')
+    staff_to_edit = Staff.query.get(request.args.get('staff_id'))
+    if request.method == 'POST':
+        edit_a_staff(staff_to_edit, request.form)
+        return redirect(url_for('staff'))
+    return render_template('edit-staff.html', staff_to_edit=staff_to_edit, departments=departments)
+
+
+@login_is_required
+def delete_staff():
+    delete_a_staff(request.args)
+    return redirect(url_for('staff'))
+
+
+@login_is_required
+def staff_profile():
+    return render_template('staff-profile.html')
@@ -0,0 +1,28 @@
+// Income vs expenses per month of the current year, read from the finance report API
+(function () {
+    var element = document.getElementById('income-expenses-chart');
+    if (!element) {
+        return;
+    }
+    var monthNames = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+                      'August', 'September', 'October', 'November', 'December'];
+
+    jQuery.getJSON(element.getAttribute('data-source'), function (report) {
+        var data = report.row_keys.map(function (key, index) {
+            return {
+                month: monthNames[key[0] - 1],
+                total_income: report.values.income[index][0],
+                total_expenses: report.values.expense[index][0]
+            };
+        });
+        Morris.Bar({
+            element: 'income-expenses-chart',
+            data: data,
+            xkey: 'month',
+            ykeys: ['total_income', 'total_expenses'],
+            labels: ['Total Income', 'Total Expenses'],
+            parseTime: false,
+            barColors: ['#6fb3e0', '#ef5f5f'],
+        });
+    });
+})();
@@ -91,7 +91,7 @@ let dataSet = [
     });
 	
 	// 
-	var table = $('#example3, #example4, #example5').DataTable();
+	var table = $('#example3, #example4, #example5').not('[data-source]').DataTable();
 	$('#example tbody').on('click', 'tr', function () {
 		var data = table.row( this ).data();
 	});
@@ -0,0 +1,144 @@
+// Server-side DataTables for every list page with a data-source attribute.
+// Column names come from the data-data attribute of each header cell.
+(function($) {
+    "use strict"
+
+    function escapeHtml(value) {
+        if (value === null || value === undefined) {
+            return '';
+        }
+        return $('<div>').text(value).html();
+    }
+
+    var renderers = {
+        text: function(data) {
+            return escapeHtml(data);
+        },
+        invoice: function(data) {
+            return '#' + escapeHtml(data);
+        },
+        select: function(data) {
+            return '<input type="checkbox" class="row-select" value="' + escapeHtml(data) + '">';
+        },
+        naira: function(data) {
+            return '<strong>&#8358;' + escapeHtml(data) + '</strong>';
+        },
+        status: function(data) {
+            var badge = 'badge-danger';
+            if (data === 'Paid') {
+                badge = 'badge-success';
+            } else if (data === 'Unpaid') {
+                badge = 'badge-warning';
+            }
+            return '<span class="badge ' + badge + '">' + escapeHtml(data) + '</span>';
+        },
+        actions: function(data, type, row) {
+            var buttons = '';
+            if (row.receipt_url) {
+                buttons += '<a href="' + row.receipt_url + '" class="btn btn-sm btn-dark"><i class="la la-print"></i></a> ';
+            }
+            if (row.edit_url) {
+                buttons += '<a href="' + row.edit_url + '" class="btn btn-sm btn-primary"><i class="la la-pencil"></i></a> ';
+            }
+            if (row.delete_url) {
+                buttons += '<a href="' + row.delete_url + '" class="btn btn-sm btn-danger"><i class="la la-trash-o"></i></a>';
+            }
+            return buttons;
+        }
+    };
+
+    // Fill the grid view cards from the rows of the current page
+    function renderGrid(gridSelector, rows) {
+        var $grid = $(gridSelector);
+        var template = $grid.children('template').get(0);
+        if (!template) {
+            return;
+        }
+        $grid.children().not('template').remove();
+        rows.forEach(function(row) {
+            var $card = $(document.importNode(template.content, true));
+            $card.find('[data-field]').each(function() {
+                $(this).text(row[$(this).data('field')] || '');
+            });
+            $grid.append($card);
+        });
+    }
+
+    $('table[data-source]').each(function() {
+        var $table = $(this);
+        // boundaries of the last page drawn, used for keyset paging on id
+        var lastPage = {start: null, length: null, lastId: null};
+        var requested = {start: 0, length: 0};
+
+        var columns = $table.find('thead th').map(function() {
+            var $th = $(this);
+            return {
+                data: $th.data('data'),
+                orderable: $th.data('orderable') !== false,
+                className: ($th.attr('class') || '') + ' py-2',
+                render: renderers[$th.data('render') || 'text']
+            };
+        }).get();
+
+        $table.DataTable({
+            serverSide: true,
+            processing: true,
+            // no initial sort: the server returns newest rows first and pages by id
+            order: [],
+            columns: columns,
+            ajax: {
+                url: $table.data('source'),
+                data: function(d) {
+                    requested = {start: d.start, length: d.length};
+                    if (d.order.length === 0 && lastPage.lastId !== null &&
+                        d.start === lastPage.start + lastPage.length && d.length === lastPage.length) {
+                        d.after_id = lastPage.lastId;
+                    }
+                },
+                dataSrc: function(json) {
+                    lastPage.start = requested.start;
+                    lastPage.length = requested.length;
+                    lastPage.lastId = json.data.length ? json.data[json.data.length - 1].id : null;
+                    if ($table.data('grid')) {
+                        renderGrid($table.data('grid'), json.data);
+                    }
+                    return json.data;
+                }
+            }
+        });
+
+        // the header checkbox ticks every row of the page; a redraw starts unticked
+        $table.on('change', 'thead .select-all', function() {
+            $table.find('tbody .row-select').prop('checked', this.checked);
+        });
+        $table.on('draw.dt', function() {
+            $table.find('thead .select-all').prop('checked', false);
+        });
+    });
+
+    // Bulk action buttons post the ids of the ticked rows of their table
+    // (data-table) to data-bulk-url, with data-field / data-value for updates
+    $(document).on('click', '[data-bulk-url]', function() {
+        var $button = $(this);
+        var $table = $($button.data('table'));
+        var ids = $table.find('tbody .row-select:checked').map(function() {
+            return this.value;
+        }).get();
+        if (!ids.length || ($button.data('confirm') && !window.confirm($button.data('confirm')))) {
+            return;
+        }
+        var form = {ids: ids.join(',')};
+        if ($button.data('field')) {
+            form.field = $button.data('field');
+            form.value = $button.data('value');
+        }
+        $.post($button.data('bulk-url'), form)
+            .done(function() {
+                $table.DataTable().ajax.reload(null, false);
+            })
+            .fail(function(xhr) {
+                window.alert((xhr.responseJSON && xhr.responseJSON.error) || 'The selected records could not be changed');
+            });
+    });
+
+})(jQuery);
@@ -0,0 +1,75 @@
+// Trainee typeahead for the fee forms: asks the server for the top matches
+// instead of rendering every trainee as an <option>.
+(function() {
+    "use strict"
+
+    var input = document.getElementById("traineeSearch");
+    if (!input) {
+        return;
+    }
+    var suggestions = document.getElementById("traineeSuggestions");
+    var selectedId = document.getElementById("selectedTraineeId");
+    var timer = null;
+    var lastTerm = null;
+
+    function clearSuggestions() {
+        suggestions.innerHTML = "";
+    }
+
+    function selectOption(form, name, value) {
+        var select = form.querySelector('select[name="' + name + '"]');
+        if (select && value) {
+            select.value = value;
+        }
+    }
+
+    function choose(trainee) {
+        input.value = trainee.name;
+        selectedId.value = trainee.id;
+        selectOption(input.form, "department", trainee.department);
+        selectOption(input.form, "course", trainee.course);
+        clearSuggestions();
+    }
+
+    function render(trainees) {
+        clearSuggestions();
+        trainees.forEach(function(trainee) {
+            var item = document.createElement("button");
+            item.type = "button";
+            item.className = "list-group-item list-group-item-action";
+            item.textContent = trainee.name + (trainee.email ? " (" + trainee.email + ")" : "");
+            item.addEventListener("mousedown", function(event) {
+                event.preventDefault();
+                choose(trainee);
+            });
+            suggestions.appendChild(item);
+        });
+    }
+
+    function search() {
+        var term = input.value.trim();
+        if (term === lastTerm) {
+            return;
+        }
+        lastTerm = term;
+        if (term.length < 2) {
+            clearSuggestions();
+            return;
+        }
+        fetch(input.dataset.searchUrl + "?q=" + encodeURIComponent(term), {credentials: "same-origin"})
+            .then(function(response) { return response.json(); })
+            .then(function(trainees) {
+                if (term === lastTerm) {
+                    render(trainees);
+                }
+            });
+    }
+
+    input.addEventListener("input", function() {
+        // typing again invalidates the previous pick
+        selectedId.value = "";
+        clearTimeout(timer);
+        timer = setTimeout(search, 200);
+    });
+    input.addEventListener("blur", clearSuggestions);
+})();
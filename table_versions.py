@@ -0,0 +1,98 @@
+from datetime import datetime
+from itertools import chain
+from flask import g, has_app_context
+from sqlalchemy import event
+from models import db, TableVersion, User, Facilitator, Trainee, Course, InventoryItem, Staff, Department, Fee, Event
+
+
+# Tables whose writes bump a shared version counter, so readers in any worker
+# can tell whether anything changed with one primary key lookup
+VERSIONED_MODELS = {
+    'users': User,
+    'facilitators': Facilitator,
+    'trainees': Trainee,
+    'courses': Course,
+    'inventory_items': InventoryItem,
+    'staff': Staff,
+    'departments': Department,
+    'fees': Fee,
+    'events': Event,
+}
+_NAME_BY_MODEL = {model: name for name, model in VERSIONED_MODELS.items()}
+
+# Tables the mapper listeners change as a side effect of writing another one:
+# enrollment counters and the monthly finance rollup
+DERIVED_TABLES = {
+    'trainees': ('courses',),
+    'fees': ('monthly_finance_rollup',),
+    'inventory_items': ('monthly_finance_rollup',),
+}
+
+# version counter bumped by writes dated before the current month, and by
+# anything else that changes closed-period finance figures (a rollup rebuild)
+FINANCE_HISTORY = 'finance_history'
+
+
+# Bump a table's version inside the writing transaction
+def bump_table_version(connection, name):
+    table = TableVersion.__table__
+    now = datetime.utcnow()
+    updated = connection.execute(
+        table.update().where(table.c.name == name).values(version=table.c.version + 1, updated_at=now)
+    )
+    if updated.rowcount == 0:
+        connection.execute(table.insert().values(name=name, version=1, updated_at=now))
+
+
+# Same for several tables, in a fixed order so concurrent writers lock rows alike;
+# for writes that skip the flush (bulk inserts, set-based updates)
+def bump_table_versions(connection, names):
+    for name in sorted(set(names)):
+        bump_table_version(connection, name)
+
+
+# (version, last change) of a table; (0, None) until it is first written
+def table_version(name):
+    row = (
+        db.session.query(TableVersion.version, TableVersion.updated_at)
+        .filter(TableVersion.name == name)
+        .first()
+    )
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+# {name: (version, last change)} of every versioned table. The table holds a row
+# per table, so one read of all of it is as cheap as a lookup; it is read once per
+# request and shared by the conditional GET validators and the render cache.
+# Tables never written are missing, read them with .get(name, (0, None)).
+def current_table_versions():
+    if has_app_context() and '_table_versions' in g:
+        return g._table_versions
+    versions = {name: (version, updated_at) for name, version, updated_at in
+                db.session.query(TableVersion.name, TableVersion.version, TableVersion.updated_at)}
+    if has_app_context():
+        g._table_versions = versions
+    return versions
+
+
+# a write in this request makes the versions read so far stale
+@event.listens_for(db.session, 'after_flush')
+def forget_request_versions(session, flush_context):
+    if has_app_context():
+        g.pop('_table_versions', None)
+
+
+# one bump per written table per flush, whatever the number of rows
+@event.listens_for(db.session, 'after_flush')
+def bump_flushed_tables(session, flush_context):
+    changed = chain(session.new, session.deleted,
+                    (instance for instance in session.dirty
+                     if session.is_modified(instance, include_collections=False)))
+    names = set()
+    for instance in changed:
+        name = _NAME_BY_MODEL.get(type(instance))
+        if name is not None:
+            names.add(name)
+            names.update(DERIVED_TABLES.get(name, ()))
+    if names:
+        bump_table_versions(session.connection(), names)
@@ -0,0 +1,73 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from models import db  # noqa: E402
+from migrations import hot_queries, explain_query, run_migrations  # noqa: E402
+
+
+# The index each hot query should be served from once the migrations ran
+EXPECTED_INDEXES = {
+    'new trainees this month': 'ix_trainees_registration_date',
+    'fees this month': 'ix_fees_payment_date',
+    'expenses this month': 'ix_inventory_items_purchase_date',
+    'events this month': 'ix_events_event_date',
+    'fees of a trainee': 'ix_fees_trainee_id',
+    'trainees of a course': 'ix_trainees_course_id',
+    'user by email': 'ix_users_email',
+}
+
+
+# A database from before the index migrations (db.create_all() minus its ix_*
+# indexes): every hot query scans its table, and uses its index after run_migrations()
+class HotQueryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.app = create_app({
+            'SECRET_KEY': 'test',
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.folder, 'hot.db')}",
+        })
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        indexes = [name for name, in db.session.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix\\_%' ESCAPE '\\'")
+        )]
+        for name in indexes:
+            db.session.execute(text(f'DROP INDEX {name}'))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.context.pop()
+        shutil.rmtree(self.folder)
+
+    def _plans(self):
+        return {name: ' '.join(explain_query(query)) for name, query in hot_queries().items()}
+
+    def test_migrations_turn_table_scans_into_index_searches(self):
+        self.assertEqual(set(hot_queries()), set(EXPECTED_INDEXES))
+
+        before = self._plans()
+        for name, index in EXPECTED_INDEXES.items():
+            self.assertIn('SCAN', before[name], name)
+            self.assertNotIn(index, before[name], name)
+
+        run_migrations()
+
+        after = self._plans()
+        for name, index in EXPECTED_INDEXES.items():
+            self.assertIn(f'INDEX {index}', after[name], name)
+            self.assertNotIn('SCAN', after[name], name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from models import db, Fee  # noqa: E402
+from invoice_numbers import FIRST_INVOICE_NUMBER, INVOICE_BLOCK_SIZE, invoice_allocator  # noqa: E402
+
+
+THREADS = 12
+ROUNDS_PER_THREAD = 15
+
+
+# Many threads adding fees at once, each with its own session and connection,
+# against a temporary SQLite file
+class InvoiceNumberStressTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.app = create_app({
+            'SECRET_KEY': 'test',
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.folder, 'invoices.db')}",
+            'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 30}},
+        })
+        with self.app.app_context():
+            db.create_all()
+        invoice_allocator.reset()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(self.folder)
+
+    # one transaction of count fees; rolled back instead of committed when asked
+    def _add_fees(self, count, rollback=False):
+        with self.app.app_context():
+            while True:
+                try:
+                    for _ in range(count):
+                        db.session.add(Fee(trainee_name='Stress Test', department='ICT', course='Web',
+                                           payment_type='Cash', payment_status='Paid',
+                                           payment_date=date(2026, 1, 5), amount=100))
+                    db.session.flush()
+                    if rollback:
+                        db.session.rollback()
+                    else:
+                        db.session.commit()
+                    return
+                except OperationalError:
+                    # another writer held the database lock: start the transaction again
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    def _worker(self, thread_number):
+        for round_number in range(ROUNDS_PER_THREAD):
+            # single fees, batches bigger than a block and abandoned transactions
+            count = (1, 3, INVOICE_BLOCK_SIZE + 7)[round_number % 3]
+            self._add_fees(count, rollback=(thread_number + round_number) % 5 == 0)
+
+    def test_concurrent_fees_get_unique_gapless_numbers(self):
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            list(executor.map(self._worker, range(THREADS)))
+
+        with self.app.app_context():
+            numbers = [number for number, in db.session.query(Fee.invoice_number)]
+        self.assertTrue(numbers)
+        self.assertEqual(len(numbers), len(set(numbers)), 'duplicate invoice numbers')
+        # SQLite hands back the unused tail of every block and undoes rolled back
+        # reservations, so committed fees use one unbroken run of numbers
+        self.assertEqual(sorted(numbers), list(range(FIRST_INVOICE_NUMBER, FIRST_INVOICE_NUMBER + len(numbers))))
+
+    def test_numbers_continue_after_existing_fees(self):
+        self._add_fees(2)
+        invoice_allocator.reset()
+        self._add_fees(1)
+        with self.app.app_context():
+            numbers = sorted(number for number, in db.session.query(Fee.invoice_number))
+        self.assertEqual(numbers, [FIRST_INVOICE_NUMBER, FIRST_INVOICE_NUMBER + 1, FIRST_INVOICE_NUMBER + 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import zipfile
+from datetime import date
+
+from pypdf import PdfReader
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from models import db, Fee, Trainee  # noqa: E402
+from receipts import receipt_label, select_receipts, write_receipts  # noqa: E402
+
+
+HAUSA_NAME = 'Ɗanladi Ƙasimu'
+
+
+# Batch receipts for trainees whose names are outside Latin-1, rendered through
+# the process pool into a PDF and a ZIP
+class BatchReceiptTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.app = create_app({
+            'SECRET_KEY': 'test',
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.folder, 'receipts.db')}",
+        })
+        with self.app.app_context():
+            db.create_all()
+            for number, name in enumerate((HAUSA_NAME, 'Aisha Bello', 'Ɓello Ƴusuf')):
+                first_name, last_name = name.split()
+                trainee = Trainee(first_name=first_name, last_name=last_name, email=f'trainee{number}@example.com',
+                                  registration_date=date(2026, 1, 1), gender='Male', department='ICT',
+                                  course='Web', address='Sokoto')
+                db.session.add(trainee)
+                db.session.flush()
+                db.session.add(Fee(trainee_name=name, trainee_id=trainee.id, department='ICT', course='Web',
+                                   payment_type='Cash', payment_status='Paid', payment_date=date(2026, 1, 5 + number),
+                                   amount=100))
+            db.session.commit()
+            self.receipts = select_receipts()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(self.folder)
+
+    def test_pdf_draws_non_latin_names(self):
+        output = os.path.join(self.folder, 'receipts.pdf')
+        failed = write_receipts(self.receipts, 'pdf', output, workers=2, chunk_size=2)
+
+        self.assertEqual(failed, {})
+        pages = PdfReader(output).pages
+        self.assertEqual(len(pages), 3)
+        self.assertIn(HAUSA_NAME, pages[0].extract_text())
+
+    def test_failed_receipt_is_reported_and_left_out(self):
+        broken = dict(self.receipts[1], total=None)
+        receipts = [self.receipts[0], broken, self.receipts[2]]
+        output = os.path.join(self.folder, 'receipts.pdf')
+        failed = write_receipts(receipts, 'pdf', output, workers=1)
+
+        self.assertEqual(list(failed), [receipt_label(broken)])
+        pages = PdfReader(output).pages
+        self.assertEqual(len(pages), 2)
+        self.assertIn(HAUSA_NAME, pages[0].extract_text())
+
+    def test_zip_holds_non_latin_names(self):
+        output = os.path.join(self.folder, 'receipts.zip')
+        failed = write_receipts(self.receipts, 'zip', output, workers=1)
+
+        self.assertEqual(failed, {})
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(len(archive.namelist()), 3)
+            self.assertTrue(any(HAUSA_NAME in archive.read(name).decode('utf-8') for name in archive.namelist()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import hashlib
+from datetime import date, datetime
+from functools import wraps
+from flask import request, session, make_response
+from flask_login import current_user
+from sqlalchemy import inspect, text
+from werkzeug.http import is_resource_modified
+from models import db, User, Facilitator, Trainee, Course, InventoryItem, Staff, Department, Fee, Event, \
+    MonthlyFinanceRollup
+from table_versions import VERSIONED_MODELS, current_table_versions
+from assets import build_version
+
+
+TIMESTAMPED_MODELS = [User, Facilitator, Trainee, Course, InventoryItem, Staff, Department, Fee, Event]
+_NAME_BY_MODEL = {model: name for name, model in VERSIONED_MODELS.items()}
+# derived tables pages read directly; their counters move with the writes feeding them
+# and with rebuilds (`flask rebuild-rollups`) that no list table sees
+_NAME_BY_MODEL[MonthlyFinanceRollup] = 'monthly_finance_rollup'
+
+
+# Migration: add created_at / updated_at to tables created before the columns
+# existed. Old rows get the migration time, which is as good as any.
+def add_row_timestamps():
+    connection = db.session.connection()
+    now = datetime.utcnow()
+    for model in TIMESTAMPED_MODELS:
+        table = model.__tablename__
+        existing = {column['name'] for column in inspect(connection).get_columns(table)}
+        for column in ('created_at', 'updated_at'):
+            if column not in existing:
+                connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} TIMESTAMP'))
+            connection.execute(text(f'UPDATE {table} SET {column} = :now WHERE {column} IS NULL'), {'now': now})
+        connection.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{table}_updated_at ON {table} (updated_at)'))
+
+
+def _validator(parts, last_modified):
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return digest[:20], last_modified
+
+
+# (etag, last modified) of lists of the given models, from the version counters
+# every write bumps (deletes and set-based writes included): the same per request
+# read the render cache keys on, whatever the size of the tables
+def list_validator(*models):
+    names = [_NAME_BY_MODEL[model] for model in models]
+    versions = current_table_versions()
+    stamps = [versions.get(name, (0, None)) for name in names]
+    changes = [updated_at for version, updated_at in stamps if updated_at is not None]
+    return _validator(names + [version for version, updated_at in stamps], max(changes) if changes else None)
+
+
+# Same for one record, plus the lists shown next to it (e.g. the dropdowns of
+# an edit page); None when the record does not exist
+def record_validator(model, record_id, *models):
+    try:
+        record_id = int(record_id)
+    except (TypeError, ValueError):
+        return None
+    updated_at = db.session.query(model.updated_at).filter(model.id == record_id).scalar()
+    if updated_at is None:
+        return None
+    if not models:
+        return _validator((_NAME_BY_MODEL[model], record_id, updated_at), updated_at)
+    etag, last_modified = list_validator(*models)
+    return _validator((_NAME_BY_MODEL[model], record_id, updated_at, etag),
+                      max(value for value in (updated_at, last_modified) if value is not None))
+
+
+# Answer a GET with 304 when the browser's copy (If-None-Match / If-Modified-Since)
+# still matches validator_for(*view_args); otherwise run the view and label its
+# response. The tag is per user, since every page shows who is logged in, and per
+# build, since a deploy or an asset rebuild changes the page without any write.
+# Nothing is labelled while a flash message is pending, as it is part of the page.
+# daily: the page shows figures or dates relative to today, which change at
+# midnight without any write, so the tag carries the date and there is no Last-Modified.
+def conditional_get(validator_for, daily=False):
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'GET' or '_flashes' in session:
+                return f(*args, **kwargs)
+            validator = validator_for(*args, **kwargs)
+            if validator is None:
+                return f(*args, **kwargs)
+            etag, last_modified = validator
+            etag = _validator((etag, current_user.get_id(), date.today() if daily else '', build_version()), None)[0]
+            if daily:
+                last_modified = None
+
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or '_flashes' in session:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+
+# Shorthand for pages and JSON built from whole tables
+def conditional_list(*models, daily=False):
+    return conditional_get(lambda *args, **kwargs: list_validator(*models), daily)
+
+
+# Shorthand for pages about the record whose id is in the query string
+def conditional_record(model, id_arg, *models, daily=False):
+    return conditional_get(lambda *args, **kwargs: record_validator(model, request.args.get(id_arg), *models), daily)
@@ -0,0 +1,143 @@
+import csv
+import io
+from collections import Counter
+from datetime import datetime, date
+from sqlalchemy import func
+from models import db, Trainee
+from reference_cache import reference_data
+from relations import reference_ids
+from enrollment import adjust_enrollments
+from table_versions import bump_table_versions
+from site_search import index_records
+
+
+# rows validated and inserted per transaction
+IMPORT_CHUNK_SIZE = 500
+REQUIRED_FIELDS = ('first_name', 'last_name', 'email', 'registration_date', 'department', 'gender', 'course')
+OPTIONAL_FIELDS = ('mobile_number', 'address')
+
+
+# "First Name" -> "first_name"
+def _normalise_header(name):
+    return str(name or '').strip().lower().replace(' ', '_')
+
+
+def _iter_csv(file_obj):
+    if isinstance(file_obj, io.TextIOBase):
+        text_stream = file_obj
+    else:
+        text_stream = io.TextIOWrapper(file_obj, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text_stream)
+    header = [_normalise_header(name) for name in next(reader, [])]
+    for values in reader:
+        yield dict(zip(header, values))
+
+
+def _iter_xlsx(file_obj):
+    # openpyxl is only needed for spreadsheet uploads
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_obj, read_only=True, data_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+    header = [_normalise_header(name) for name in next(rows, ())]
+    for values in rows:
+        yield dict(zip(header, values))
+    workbook.close()
+
+
+# Stream the rows of an uploaded CSV or XLSX file as dicts keyed by column name
+def iter_import_rows(file_obj, filename):
+    if filename.lower().endswith('.xlsx'):
+        return _iter_xlsx(file_obj)
+    return _iter_csv(file_obj)
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip(), "%Y-%m-%d").date()
+
+
+# Check one row against the known courses and departments; returns (mapping, errors)
+def validate_trainee_row(row, course_names, department_names):
+    errors = []
+    mapping = {}
+    for field in REQUIRED_FIELDS + OPTIONAL_FIELDS:
+        value = row.get(field)
+        value = value.strip() if isinstance(value, str) else value
+        if field in REQUIRED_FIELDS and value in (None, ''):
+            errors.append(f'{field} is required')
+        mapping[field] = value if value != '' else None
+
+    if mapping['registration_date'] is not None:
+        try:
+            mapping['registration_date'] = _parse_date(mapping['registration_date'])
+        except ValueError:
+            errors.append('registration_date must be YYYY-MM-DD')
+    if mapping['course'] and mapping['course'] not in course_names:
+        errors.append(f"unknown course {mapping['course']}")
+    if mapping['department'] and mapping['department'] not in department_names:
+        errors.append(f"unknown department {mapping['department']}")
+    for field in ('mobile_number', 'address'):
+        if mapping[field] is not None:
+            mapping[field] = str(mapping[field])
+    return mapping, errors
+
+
+# Insert one chunk of valid rows and bump students_enrolled once per course;
+# before_commit() runs last inside the chunk's transaction
+def _save_chunk(mappings, before_commit=None):
+    last_id = db.session.query(func.max(Trainee.id)).scalar()
+    db.session.bulk_insert_mappings(Trainee, mappings)
+    adjust_enrollments(db.session.connection(), Counter(mapping['course_id'] for mapping in mappings))
+    bump_table_versions(db.session.connection(), ('trainees', 'courses'))
+    index_records(db.session.connection(), 'trainees', after_id=last_id)
+    if before_commit:
+        before_commit()
+    db.session.commit()
+    # the raw UPDATE is invisible to the flush hooks
+    reference_data.invalidate('courses')
+
+
+# Import trainees from a CSV/XLSX stream; bad rows are reported, good rows are kept.
+# on_progress(imported) is called after every saved chunk. checkpoint(last_row, imported)
+# is called inside every chunk's transaction, so a rerun given the last committed
+# checkpoint as resume_after_row / imported carries on without inserting rows twice.
+def import_trainees(file_obj, filename, chunk_size=IMPORT_CHUNK_SIZE, on_progress=None, checkpoint=None,
+                    resume_after_row=0, imported=0):
+    course_ids = reference_ids('courses')
+    department_ids = reference_ids('departments')
+
+    report = {'imported': imported, 'errors': []}
+    chunk = []
+
+    def save(last_row):
+        report['imported'] += len(chunk)
+        _save_chunk(chunk, checkpoint and (lambda: checkpoint(last_row, report['imported'])))
+
+    # row 1 is the header line
+    for row_number, row in enumerate(iter_import_rows(file_obj, filename), start=2):
+        if not any(value not in (None, '') for value in row.values()):
+            continue
+        mapping, errors = validate_trainee_row(row, course_ids, department_ids)
+        if errors:
+            report['errors'].append({'row': row_number, 'errors': errors})
+            continue
+        # saved by an earlier run; still validated above so the report stays complete
+        if row_number <= resume_after_row:
+            continue
+        # bulk inserts skip the flush hooks that fill the foreign keys
+        mapping['course_id'] = course_ids[mapping['course']]
+        mapping['department_id'] = department_ids[mapping['department']]
+        chunk.append(mapping)
+        if len(chunk) >= chunk_size:
+            save(row_number)
+            chunk = []
+            if on_progress:
+                on_progress(report['imported'])
+
+    if chunk:
+        save(row_number)
+    return report
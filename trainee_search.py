@@ -0,0 +1,124 @@
+import re
+from sqlalchemy import text, or_
+from sqlalchemy.orm import joinedload
+from models import db, Trainee
+from relations import related_name
+from pagination import like_literal
+
+
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+# SQLite: an external-content FTS5 table over trainees, kept current by triggers so
+# bulk inserts and set-based deletes are covered as well as ORM writes.
+SQLITE_SEARCH_INDEX = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS trainee_search USING fts5("
+    "first_name, last_name, email, mobile_number, content='trainees', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS trainee_search_insert AFTER INSERT ON trainees BEGIN "
+    "INSERT INTO trainee_search (rowid, first_name, last_name, email, mobile_number) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email, new.mobile_number); END",
+    "CREATE TRIGGER IF NOT EXISTS trainee_search_delete AFTER DELETE ON trainees BEGIN "
+    "INSERT INTO trainee_search (trainee_search, rowid, first_name, last_name, email, mobile_number) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.mobile_number); END",
+    "CREATE TRIGGER IF NOT EXISTS trainee_search_update AFTER UPDATE ON trainees BEGIN "
+    "INSERT INTO trainee_search (trainee_search, rowid, first_name, last_name, email, mobile_number) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.mobile_number); "
+    "INSERT INTO trainee_search (rowid, first_name, last_name, email, mobile_number) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email, new.mobile_number); END",
+    "INSERT INTO trainee_search (trainee_search) VALUES ('rebuild')",
+]
+
+# Postgres: trigram GIN indexes so ILIKE '%term%' and prefix matches use an index
+POSTGRES_SEARCH_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_trainees_name_trgm ON trainees "
+    "USING gin ((first_name || ' ' || last_name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_trainees_email_trgm ON trainees USING gin (email gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_trainees_mobile_number_trgm ON trainees USING gin (mobile_number gin_trgm_ops)",
+]
+
+# database urls known to have the FTS5 table. Only a found table is remembered:
+# a `flask migrate` run from the CLI creates it under workers already running.
+_fts_available = set()
+
+
+# Migration step: build the search index for the current database
+def create_trainee_search_index():
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        statements = SQLITE_SEARCH_INDEX
+    elif dialect == 'postgresql':
+        statements = POSTGRES_SEARCH_INDEX
+    else:
+        return
+    for statement in statements:
+        db.session.execute(text(statement))
+
+
+def _sqlite_fts_ready():
+    key = str(db.engine.url)
+    if key in _fts_available:
+        return True
+    found = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trainee_search'")
+    ).scalar()
+    if found:
+        _fts_available.add(key)
+    return bool(found)
+
+
+# "ada lov" -> '"ada"* AND "lov"*' (every word as a quoted prefix term)
+def fts_prefix_query(term):
+    words = [word.replace('"', '""') for word in re.split(r'\s+', term) if word]
+    return ' AND '.join(f'"{word}"*' for word in words)
+
+
+# trainees with their course and department rows loaded alongside
+def _trainees_with_names():
+    return Trainee.query.options(joinedload(Trainee.course_ref), joinedload(Trainee.department_ref))
+
+
+def _trainee_result(trainee):
+    return {
+        'id': trainee.id,
+        'name': f"{trainee.first_name} {trainee.last_name}",
+        'email': trainee.email,
+        'mobile_number': trainee.mobile_number,
+        'department': related_name(trainee, 'department_ref', 'department'),
+        'course': related_name(trainee, 'course_ref', 'course'),
+    }
+
+
+# Top matches for a typeahead box, searching name, email and phone number
+def search_trainees(term, limit=DEFAULT_SEARCH_LIMIT):
+    term = (term or '').strip()
+    if not term:
+        return []
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    dialect = db.engine.dialect.name
+
+    if dialect == 'sqlite' and _sqlite_fts_ready():
+        ids = [row[0] for row in db.session.execute(
+            text('SELECT rowid FROM trainee_search WHERE trainee_search MATCH :query ORDER BY rank LIMIT :limit'),
+            {'query': fts_prefix_query(term), 'limit': limit},
+        )]
+        trainees = {trainee.id: trainee for trainee in _trainees_with_names().filter(Trainee.id.in_(ids))} if ids else {}
+        return [_trainee_result(trainees[trainee_id]) for trainee_id in ids if trainee_id in trainees]
+
+    full_name = Trainee.first_name + ' ' + Trainee.last_name
+    if dialect == 'postgresql':
+        # substring match served by the trigram indexes; the full name already
+        # matches last names, and every arm needs its index or the OR scans the table
+        pattern = f'%{like_literal(term)}%'
+        columns = [full_name, Trainee.email, Trainee.mobile_number]
+    else:
+        pattern = f'{like_literal(term)}%'
+        columns = [full_name, Trainee.last_name, Trainee.email, Trainee.mobile_number]
+    trainees = (
+        _trainees_with_names()
+        .filter(or_(*[column.ilike(pattern, escape='\\') for column in columns]))
+        .order_by(Trainee.first_name, Trainee.last_name)
+        .limit(limit)
+        .all()
+    )
+    return [_trainee_result(trainee) for trainee in trainees]
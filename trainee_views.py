@@ -0,0 +1,82 @@
+import json
+from flask import request, render_template, redirect, url_for, flash, jsonify, current_app
+from models import User, Trainee, Course, Department, Job
+from decorators import login_is_required
+from db_helpers import add_a_trainee, edit_a_trainee, delete_a_trainee
+from reference_cache import reference_data
+from trainee_import import import_trainees
+from trainee_search import search_trainees, DEFAULT_SEARCH_LIMIT
+from jobs import enqueue, save_job_upload
+from render_cache import cached_page
+from timestamps import conditional_list, conditional_record
+
+
+@login_is_required
+@conditional_list(Trainee, User)
+@cached_page('trainees')
+def all_trainees():
+    return render_template('all-students.html')
+
+
+@login_is_required
+def add_trainee():
+    courses = reference_data.get('courses')
+    departments = reference_data.get('departments')
+    if request.method == 'POST':
+        add_a_trainee(request.form)
+        return redirect(url_for('all_trainees'))
+    return render_template('add-student.html', courses=courses, departments=departments)
+
+
+@login_is_required
+def import_trainees_upload():
+    report = None
+    job = None
+    if request.method == 'POST':
+        trainees_file = request.files.get('trainees_file')
+        if not trainees_file or not trainees_file.filename:
+            flash('Choose a CSV or XLSX file to import', 'error')
+            return redirect(url_for('import_trainees_upload'))
+        if request.form.get('background'):
+            path = save_job_upload(current_app.config['JOB_OUTPUT_FOLDER'], trainees_file)
+            job_id = enqueue('import_trainees', {'path': path, 'filename': trainees_file.filename})
+            flash(f'Import queued as job #{job_id}', 'success')
+            return redirect(url_for('import_trainees_upload', job_id=job_id))
+        report = import_trainees(trainees_file.stream, trainees_file.filename)
+        flash(f"{report['imported']} Trainees Imported", 'success')
+    elif request.args.get('job_id', type=int):
+        job = Job.query.filter_by(id=request.args.get('job_id', type=int), kind='import_trainees').first()
+        if job is not None and job.status == 'succeeded':
+            result = json.loads(job.result)
+            report = {'imported': result['imported'], 'errors': result['errors']}
+    return render_template('import-trainees.html', report=report, job=job)
+
+
+@login_is_required
+@conditional_record(Trainee, 'trainee_id', Department, Course, User)
+def edit_trainee():
+    departments = reference_data.get('departments')
+    courses = reference_data.get('courses')
+    trainee_to_edit = Trainee.query.get(request.args.get('trainee_id'))
+    if request.method == 'POST':
+        edit_a_trainee(trainee_to_edit, request.form)
+        return redirect(url_for('all_trainees'))
+    return render_template('edit-student.html', trainee_to_edit=trainee_to_edit, departments=departments, courses=courses)
+
+
+@login_is_required
+def delete_trainee():
+    delete_a_trainee(request.args)
+    return redirect(url_for('all_trainees'))
+
+
+@login_is_required
+def about_trainee():
+    return render_template('about-student.html')
+
+
+@login_is_required
+@conditional_list(Trainee, Course, Department)
+def search_trainees_json():
+    limit = request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int)
+    return jsonify(search_trainees(request.args.get('q'), limit))
@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask_login import UserMixin
+from sqlalchemy import event
+from models import db, User
+
+
+DEFAULT_USER_CACHE_SIZE = 1024
+DEFAULT_USER_CACHE_TTL = 300
+
+
+# What the templates need to know about the logged in user
+class CachedUser(UserMixin):
+    def __init__(self, id, first_name, last_name, email, avatar_location):
+        self.id = id
+        self.first_name = first_name
+        self.last_name = last_name
+        self.email = email
+        self.avatar_location = avatar_location
+
+
+# LRU of logged in user identities with a TTL, so most requests need no users query
+class UserIdentityCache:
+    def __init__(self, maxsize=DEFAULT_USER_CACHE_SIZE, ttl=DEFAULT_USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('USER_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+
+    def load(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and now - entry[0] < self.ttl:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        row = (
+            db.session.query(User.id, User.first_name, User.last_name, User.email, User.avatar_location)
+            .filter(User.id == user_id)
+            .first()
+        )
+        if row is None:
+            self.invalidate(user_id)
+            return None
+
+        user = CachedUser(*row)
+        with self._lock:
+            self._entries[user_id] = (now, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'size': len(self._entries),
+        }
+
+
+user_identities = UserIdentityCache()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=user_identities.clear)
+
+
+# any change to a user row drops its cached identity
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_user_identity(mapper, connection, target):
+    user_identities.invalidate(target.id)
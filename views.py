@@ -0,0 +1,139 @@
+import hmac
+from flask import request, render_template, url_for, redirect, flash, jsonify, Response, stream_with_context, \
+    current_app
+from flask_login import login_user, current_user, logout_user
+from models import db, User, Facilitator, Trainee, Course, InventoryItem, Fee, MonthlyFinanceRollup
+from decorators import login_is_required
+from db_helpers import create_new_user
+from dashboard import get_dashboard_stats
+from pagination import LIST_SOURCES, list_source_models, datatables_response
+from reference_cache import reference_data
+from user_cache import user_identities
+from exports import EXPORT_SOURCES, EXPORT_FORMATS, export_filters, generate_export, export_filename
+from assets import serve_asset
+from instrumentation import request_metrics
+from jobs import enqueue
+from render_cache import render_cache, cached_page
+from reports import closed_reports
+from timestamps import list_validator, conditional_get, conditional_list
+
+
+def login_or_dashboard():
+    if current_user.is_authenticated:
+        return redirect(url_for('home'))
+    else:
+        return redirect(url_for('login'))
+
+
+@login_is_required
+@conditional_list(Trainee, Course, Facilitator, Fee, InventoryItem, User, MonthlyFinanceRollup, daily=True)
+@cached_page('trainees', 'courses', 'facilitators', 'monthly_finance_rollup')
+def home():
+    stats = get_dashboard_stats()
+    return render_template('index-2.html', **stats)
+
+
+def register():
+    if request.method == 'POST':
+        new_user = create_new_user(request.form)
+        db.session.add(new_user)
+        db.session.commit()
+        login_user(new_user)
+        flash('Welcome To Center For Entrepreneurship Development UDUSOK')
+        return redirect(url_for('home'))
+    return render_template('page-register.html')
+
+
+def login():
+    if request.method == 'POST':
+        email = request.form.get('email')
+        password = request.form.get('password')
+        user = User.query.filter_by(email=email).first()
+
+        if user is not None:
+            if password == user.password:
+                login_user(user)
+                flash('Login Successful', 'success')
+                return redirect(url_for('home'))
+            else:
+                flash('Invalid Password', 'error')
+                return redirect(url_for('login'))
+        else:
+            flash('User not Found', 'error')
+            return redirect(url_for('login'))
+    return render_template('page-login.html')
+
+
+def logout():
+    first_name = current_user.first_name
+    last_name = current_user.last_name
+    user_identities.invalidate(current_user.id)
+    logout_user()
+    flash(f'{first_name} {last_name} Logout Successful')
+    return redirect(url_for('login'))
+
+
+def asset_file(filename):
+    return serve_asset(filename)
+
+
+# Prometheus scrape endpoint: scrapers send "Authorization: Bearer <metrics_token>";
+# logged in users may look too. Without a metrics_token only they can.
+def metrics():
+    token = current_app.config['METRICS_TOKEN']
+    scraper = bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not scraper and not current_user.is_authenticated:
+        return Response('Unauthorized', status=401)
+    return request_metrics.response()
+
+
+@login_is_required
+def cache_stats():
+    return jsonify({'reference_data': reference_data.stats(), 'users': user_identities.stats(),
+                    'render': render_cache.stats(), 'closed_reports': closed_reports.stats()})
+
+
+def error_404():
+    return render_template('page-error-404.html')
+
+
+def list_api_validator(entity):
+    return list_validator(*list_source_models(entity)) if entity in LIST_SOURCES else None
+
+
+@login_is_required
+@conditional_get(list_api_validator)
+def list_api(entity):
+    if entity not in LIST_SOURCES:
+        return jsonify({'error': f'Unknown list {entity}'}), 404
+    return jsonify(datatables_response(entity, request.args))
+
+
+@login_is_required
+def export_entity(entity):
+    if entity not in EXPORT_SOURCES:
+        return jsonify({'error': f'Unknown export {entity}'}), 404
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unknown format {export_format}'}), 400
+    try:
+        filters = export_filters(request.args)
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+
+    compress = request.args.get('gzip') == '1'
+    # large exports: hand the work to a background job and poll /jobs/<id>
+    if request.args.get('background') == '1':
+        payload = {'entity': entity, 'export_format': export_format, 'compress': compress}
+        payload.update({name: request.args[name] for name in ('start', 'end', 'department', 'course')
+                        if request.args.get(name)})
+        job_id = enqueue('export', payload)
+        return jsonify({'id': job_id, 'status_url': url_for('job_detail', job_id=job_id)}), 202
+
+    chunks = generate_export(entity, export_format, compress, **filters)
+    if compress:
+        mimetype = 'application/gzip'
+    else:
+        mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    headers = {'Content-Disposition': f'attachment; filename={export_filename(entity, export_format, compress)}'}
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)